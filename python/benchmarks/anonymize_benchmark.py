@@ -0,0 +1,138 @@
+# Benchmark of mne_bids.anonymize_dataset on a synthetic multi-subject EDF dataset.
+#
+# usage: python python/benchmarks/anonymize_benchmark.py [--subjects 24] [--runs 2] [--channels 32]
+#            [--records 300] [--n-jobs 1,4] [--repeat 1] [--libs DIR]
+#            [--save-reference DIR | --reference DIR]
+#
+# Synthetic EDF+ recordings (see synthetic.py) are written to a BIDS dataset with write_raw_bids,
+# then the dataset is anonymized with each --n-jobs value. The anonymized datasets must be the
+# same, file for file and byte for byte, whatever the number of jobs: any difference is reported
+# and the script exits with status 1.
+#
+# The anonymized dataset of the first --n-jobs value is saved with --save-reference, and every
+# one is compared with a saved one with --reference, e.g. to check that the output is the same
+# as the one of a previous version of mne_bids, given with --libs (the python/libs directory of
+# a checkout of that version):
+#
+#     git worktree add /tmp/previous <commit>
+#     python python/benchmarks/anonymize_benchmark.py --libs /tmp/previous/python/libs --save-reference /tmp/reference
+#     python python/benchmarks/anonymize_benchmark.py --reference /tmp/reference
+import argparse
+import filecmp
+import inspect
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import synthetic
+
+
+def make_dataset(directory, args):
+    import mne
+    from mne_bids import BIDSPath, write_raw_bids
+
+    root = os.path.join(directory, 'bids')
+    for subject in range(1, args.subjects + 1):
+        path = os.path.join(directory, 'sub-%d.edf' % subject)
+        synthetic.make_recording(path, 'edf+', nchan=args.channels, n_records=args.records,
+                                 annotations_per_record=1, start=(1, 1, 21, 10, subject % 60, 0), seed=subject)
+        raw = mne.io.read_raw_edf(path, verbose='error')
+        raw.set_channel_types({name: 'seeg' for name in raw.ch_names}, verbose='error')
+        for run in range(1, args.runs + 1):
+            bids_path = BIDSPath(root=root, subject='%03d' % subject, session='01', task='rest',
+                                 run=run, datatype='ieeg')
+            write_raw_bids(raw, bids_path, overwrite=True, verbose='error')
+        os.remove(path)
+    return root
+
+
+def files(root):
+    # the files of a dataset, relative to its root.
+    found = set()
+    for directory, _, names in os.walk(root):
+        for name in names:
+            found.add(os.path.relpath(os.path.join(directory, name), root))
+    return found
+
+
+def differences(reference, other):
+    reference_files, other_files = files(reference), files(other)
+    found = sorted(reference_files ^ other_files)
+    for name in sorted(reference_files & other_files):
+        if not filecmp.cmp(os.path.join(reference, name), os.path.join(other, name), shallow=False):
+            found.append(name)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark mne_bids.anonymize_dataset.')
+    parser.add_argument('--subjects', type=int, default=24)
+    parser.add_argument('--runs', type=int, default=2, help='runs per subject')
+    parser.add_argument('--channels', type=int, default=32)
+    parser.add_argument('--records', type=int, default=300, help='number of 1 s data records per file')
+    parser.add_argument('--n-jobs', type=lambda value: [int(n) for n in value.split(',')], default=[1, 4],
+                        help='numbers of jobs to compare, comma separated, the first one is the reference')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--libs', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'libs'),
+                        help='directory of the mne and mne_bids packages to benchmark')
+    reference_group = parser.add_mutually_exclusive_group()
+    reference_group.add_argument('--save-reference', metavar='DIR',
+                                 help='save the anonymized dataset of the first --n-jobs value in DIR')
+    reference_group.add_argument('--reference', metavar='DIR',
+                                 help='compare the anonymized datasets with the one saved in DIR')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.libs))
+    from mne_bids import anonymize_dataset
+    # the versions of mne_bids before n_jobs anonymize the recordings one at a time.
+    jobs = 'n_jobs' in inspect.signature(anonymize_dataset).parameters
+    if not jobs and args.n_jobs != [1]:
+        parser.error('The mne_bids of ' + args.libs + ' has no n_jobs, use --n-jobs 1.')
+
+    directory = tempfile.mkdtemp(prefix='eeg2bids-anonymize-benchmark-')
+    try:
+        start = time.perf_counter()
+        root = make_dataset(directory, args)
+        print('dataset: %d subjects, %d recordings, written in %.1f s'
+              % (args.subjects, args.subjects * args.runs, time.perf_counter() - start))
+
+        reference = None
+        failed = False
+        for n_jobs in args.n_jobs:
+            times = []
+            for repeat in range(args.repeat):
+                output = os.path.join(directory, 'anonymized-%d' % n_jobs)
+                shutil.rmtree(output, ignore_errors=True)
+                start = time.perf_counter()
+                anonymize_dataset(root, output, random_state=0, verbose='error', **({'n_jobs': n_jobs} if jobs else {}))
+                times.append(time.perf_counter() - start)
+
+            print('n_jobs=%-3d %8.3f s (min %.3f s)' % (n_jobs, statistics.median(times), min(times)))
+            if args.reference:
+                found = differences(args.reference, output)
+                if found:
+                    failed = True
+                    print('    differs from the reference: %s' % ', '.join(found[:10]))
+            if reference is None:
+                reference = output
+                if args.save_reference:
+                    shutil.rmtree(args.save_reference, ignore_errors=True)
+                    # the previous versions of mne_bids left the lock files of the tsv files.
+                    shutil.copytree(output, args.save_reference, ignore=shutil.ignore_patterns('.*.tsv.lock'))
+                continue
+            found = differences(reference, output)
+            if found:
+                failed = True
+                print('    differs from n_jobs=%d: %s' % (args.n_jobs[0], ', '.join(found[:10])))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
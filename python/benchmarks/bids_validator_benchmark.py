@@ -0,0 +1,97 @@
+# Benchmark of BIDSValidator on a synthetic large BIDS tree.
+#
+# usage: python python/benchmarks/bids_validator_benchmark.py [--subjects 1000] [--sessions 2] [--runs 4]
+#
+# The tree is generated as a list of paths relative to the BIDS root (no file is written).
+# Each path is checked with the compiled validator, and a sample of the paths is checked the
+# way is_bids worked before rules were compiled once (reading and compiling every rule file
+# per call), to report the speedup and make sure both agree.
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'libs'))
+from bids_validator import BIDSValidator  # noqa: E402
+from bids_validator.bids_validator import _read_regular_expressions  # noqa: E402
+
+
+def synthetic_tree(subjects, sessions, runs, modality='ieeg'):
+    paths = [
+        '/README',
+        '/dataset_description.json',
+        '/participants.tsv',
+        '/participants.json',
+        '/task-rest_' + modality + '.json',
+    ]
+    for sub in range(1, subjects + 1):
+        subject = 'sub-%04d' % sub
+        paths.append('/%s/%s_sessions.tsv' % (subject, subject))
+        for ses in range(1, sessions + 1):
+            session = 'ses-V%d' % ses
+            prefix = '/%s/%s/' % (subject, session)
+            paths.append(prefix + '%s_%s_scans.tsv' % (subject, session))
+            paths.append(prefix + '%s/%s_%s_task-rest_acq-seeg_channels.tsv' % (modality, subject, session))
+            for run in range(1, runs + 1):
+                basename = '%s/%s_%s_task-rest_acq-seeg_run-%d' % (modality, subject, session, run)
+                paths.append(prefix + basename + '_' + modality + '.edf')
+                paths.append(prefix + basename + '_' + modality + '.json')
+                paths.append(prefix + basename + '_events.tsv')
+                # not BIDS, rejected by the validator
+                paths.append(prefix + basename + '_annotations.txt')
+    return paths
+
+
+def is_bids_uncompiled(validator, path):
+    # bypasses the rule cache: every call reads the rule files again, as is_bids used to.
+    read_rules = _read_regular_expressions.__wrapped__
+
+    def search(rules):
+        return any(re.compile(x).search(path) for x in read_rules(validator.dir_rules + rules))
+
+    session_rules = read_rules(validator.dir_rules + 'session_level_rules.json')
+
+    return any([
+        search('top_level_rules.json'),
+        search('associated_data_rules.json'),
+        any(validator.conditional_match(x, path) for x in session_rules),
+        search('subject_level_rules.json'),
+        search('phenotypic_rules.json'),
+        search('file_level_rules.json'),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BIDSValidator on a synthetic BIDS tree.')
+    parser.add_argument('--subjects', type=int, default=1000)
+    parser.add_argument('--sessions', type=int, default=2)
+    parser.add_argument('--runs', type=int, default=2)
+    parser.add_argument('--sample', type=int, default=500,
+                        help='number of paths checked with the uncompiled rules')
+    args = parser.parse_args()
+
+    paths = synthetic_tree(args.subjects, args.sessions, args.runs)
+    validator = BIDSValidator()
+
+    start = time.perf_counter()
+    results = validator.validate_paths(paths)
+    compiled = time.perf_counter() - start
+
+    sample = paths[::max(1, len(paths) // args.sample)]
+    start = time.perf_counter()
+    reference = [is_bids_uncompiled(validator, path) for path in sample]
+    uncompiled = (time.perf_counter() - start) * len(paths) / len(sample)
+
+    expected = [results[paths.index(path)] for path in sample]
+    if reference != expected:
+        sys.exit('compiled and uncompiled rules disagree')
+
+    print('paths:              %d (%d valid)' % (len(paths), sum(results)))
+    print('compiled rules:     %.3f s (%.0f paths/s)' % (compiled, len(paths) / compiled))
+    print('uncompiled (est.):  %.3f s (%.0f paths/s)' % (uncompiled, len(paths) / uncompiled))
+    print('speedup:            %.1fx' % (uncompiled / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+# Benchmark of the EDF to BIDS pipeline on synthetic recordings.
+#
+# usage: python python/benchmarks/pipeline_benchmark.py [--format edf] [--channels 64] [--rates 256,512]
+#            [--records 600] [--annotations 0] [--splits 1] [--repeat 3]
+#            [--output results.json] [--compare baseline.json] [--threshold 0.2]
+#
+# Synthetic recordings (see synthetic.py) are generated in a temporary directory, then each
+# case is timed --repeat times: EDF.EDFReader and EDF.EDFWriter on their own, a copy with
+# iEEG.Anonymize.make_copy, the conversion (iEEG.Converter then Modifier, with the timing of
+# each of their stages), BIDS.Validate and iEEG.TarFile on the converted output, and the
+# validator alone on a synthetic tree (see bids_validator_benchmark.py). A case failing on the
+# files (EDF.EDFReader and the conversion only read 16-bit EDF, not BDF) is reported as such.
+#
+# The results are printed and, with --output, saved as JSON along with the parameters and the
+# git commit, so that runs on different commits can be compared: with --compare, every case
+# whose median time exceeds the one of the baseline by more than --threshold is reported as
+# a regression and the script exits with status 1.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, os.path.join(root, 'python', 'libs'))
+sys.path.insert(0, root)
+import synthetic  # noqa: E402
+from bids_validator_benchmark import synthetic_tree  # noqa: E402
+from bids_validator import BIDSValidator  # noqa: E402
+from python.libs import EDF, iEEG, BIDS  # noqa: E402
+from python.libs.Modifier import Modifier  # noqa: E402
+from python.libs.Timing import Timing  # noqa: E402
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=root, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def conversion_request(bids_directory, files):
+    return {
+        'edfData': {'files': [{'path': f, 'name': os.path.basename(f)} for f in files]},
+        'eegRuns': [{'edfFile': f, 'eventFile': '', 'annotationsTSV': '', 'annotationsJSON': ''} for f in files],
+        'modality': 'ieeg',
+        'bids_directory': bids_directory,
+        'output_time': 'output-benchmark',
+        'read_only': False,
+        'taskName': 'benchmark',
+        'bidsMetadata': {'metadata': {'InstitutionName': 'Benchmark'}, 'ignored_keys': []},
+        'site_id': 'BEN',
+        'project_id': 'Benchmark',
+        'sub_project_id': 'Benchmark',
+        'session': 'V1',
+        'participantID': 'BEN0001',
+        'age': '30',
+        'hand': 'R',
+        'sex': 'M',
+        'preparedBy': 'benchmark',
+        'line_freq': '60',
+        'recording_type': 'continuous',
+        'reference': 'n/a',
+    }
+
+
+# Cases - the timed cases, each one runs once on the synthetic files in directory.
+class Cases:
+    def __init__(self, directory, files, args):
+        self.directory = directory
+        self.files = files
+        self.args = args
+        # per-stage timings of the last conversion.
+        self.stages = []
+
+    def edf_reader(self):
+        for file in self.files:
+            reader = EDF.EDFReader(fname=file)
+            for block in range(reader.meas_info['n_records']):
+                reader.readBlock(block)
+
+    def edf_writer(self):
+        reader = EDF.EDFReader(fname=self.files[0])
+        header = reader.readHeader()
+        blocks = [reader.readBlock(block) for block in range(min(reader.meas_info['n_records'], 60))]
+        writer = EDF.EDFWriter(fname=os.path.join(self.directory, 'writer.edf'))
+        writer.writeHeader(header)
+        for block in blocks:
+            writer.writeBlock(block)
+        writer.close()
+
+    def anonymize_make_copy(self):
+        for i, file in enumerate(self.files):
+            anonymize = iEEG.Anonymize(file)
+            anonymize.set_header('subject_id', 'X X X X')
+            anonymize.make_copy(os.path.join(self.directory, 'anonymized-%d%s' % (i, os.path.splitext(file)[1])))
+
+    def conversion(self):
+        bids_directory = os.path.join(self.directory, 'bids')
+        shutil.rmtree(bids_directory, ignore_errors=True)
+        os.makedirs(bids_directory)
+
+        data = conversion_request(bids_directory, self.files)
+        timing = Timing(profiler='')
+        with timing.stage('converter'):
+            iEEG.Converter(data, None, Modifier.sidecar_metadata(data), timing)
+        data['subject_id'] = iEEG.Converter.m_info['subject_id']
+        with timing.stage('modifier'):
+            Modifier(data, None, timing)
+        self.stages = timing.stages
+
+    def output(self):
+        output = os.path.join(self.directory, 'bids', 'output-benchmark')
+        if not os.path.isdir(output):
+            self.conversion()
+        return output
+
+    def validate(self):
+        BIDS.Validate(self.output(), use_cache=False).run()
+
+    def tarfile(self):
+        iEEG.TarFile(self.output())
+
+    def validator_paths(self):
+        BIDSValidator().validate_paths(synthetic_tree(self.args.subjects, 2, 2))
+
+    names = ['edf_reader', 'edf_writer', 'anonymize_make_copy', 'conversion', 'validate', 'tarfile',
+             'validator_paths']
+
+
+def flatten(stages, prefix=''):
+    # the stages of a Timing report, as 'converter/run 1/write_raw_bids' -> seconds.
+    times = {}
+    for stage in stages:
+        name = prefix + stage['name']
+        times[name] = times.get(name, 0) + stage['wall']
+        for sub_name, seconds in flatten(stage.get('stages', []), name + '/').items():
+            times[sub_name] = times.get(sub_name, 0) + seconds
+    return times
+
+
+def run(args):
+    directory = tempfile.mkdtemp(prefix='eeg2bids-benchmark-')
+    try:
+        extension = '.bdf' if args.format == 'bdf' else '.edf'
+        files = []
+        size = 0
+        for split in range(args.splits):
+            path = os.path.join(directory, 'split-%d%s' % (split + 1, extension))
+            size += synthetic.make_recording(
+                path, args.format, nchan=args.channels, rates=args.rates, n_records=args.records,
+                annotations_per_record=args.annotations, start=(1, 1, 21, 10 + split, 0, 0), seed=split)
+            files.append(path)
+
+        cases = Cases(directory, files, args)
+        results = {}
+        for name in args.cases or Cases.names:
+            times = []
+            stages = []
+            error = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                try:
+                    getattr(cases, name)()
+                except Exception as e:
+                    error = type(e).__name__ + ': ' + str(e)
+                    break
+                times.append(time.perf_counter() - start)
+                if name == 'conversion':
+                    stages.append(flatten(cases.stages))
+
+            if error:
+                results[name] = {'error': error}
+                continue
+
+            results[name] = {'median': statistics.median(times), 'min': min(times), 'times': times}
+            if stages:
+                results[name]['stages'] = {
+                    stage: statistics.median(run_stages.get(stage, 0) for run_stages in stages)
+                    for stage in stages[0]
+                }
+
+        return {
+            'commit': git_commit(),
+            'parameters': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+            'input_bytes': size,
+            'results': results,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def regressions(report, baseline, threshold):
+    found = []
+    for name, result in report['results'].items():
+        reference = baseline['results'].get(name)
+        if 'median' not in result or not reference or 'median' not in reference:
+            continue
+        ratio = result['median'] / reference['median']
+        if ratio > 1 + threshold:
+            found.append((name, reference['median'], result['median'], ratio))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the EDF to BIDS pipeline on synthetic recordings.')
+    parser.add_argument('--format', choices=synthetic.formats, default='edf')
+    parser.add_argument('--channels', type=int, default=64)
+    parser.add_argument('--rates', type=lambda value: [int(rate) for rate in value.split(',')], default=[256],
+                        help='sampling rates of the channels, comma separated, cycled through the channels')
+    parser.add_argument('--records', type=int, default=600, help='number of 1 s data records per file')
+    parser.add_argument('--annotations', type=int, default=0, help='annotations per data record (EDF+)')
+    parser.add_argument('--splits', type=int, default=1, help='number of files of the recording')
+    parser.add_argument('--subjects', type=int, default=200, help='subjects of the validator_paths tree')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cases', nargs='*', choices=Cases.names)
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='results of a previous run (--output) to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown over the baseline median reported as a regression')
+    args = parser.parse_args()
+
+    report = run(args)
+
+    print('commit: %s, input: %.1f MB' % (report['commit'], report['input_bytes'] / 1e6))
+    for name, result in report['results'].items():
+        if 'error' in result:
+            print('%-22s failed: %s' % (name, result['error']))
+            continue
+        print('%-22s %8.3f s (min %.3f s)' % (name, result['median'], result['min']))
+        for stage, seconds in result.get('stages', {}).items():
+            print('    %-56s %8.3f s' % (stage, seconds))
+
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(report, fp, indent=4)
+
+    if args.compare:
+        with open(args.compare, 'r') as fp:
+            baseline = json.load(fp)
+        found = regressions(report, baseline, args.threshold)
+        for name, before, after, ratio in found:
+            print('regression: %s %.3f s -> %.3f s (%.2fx)' % (name, before, after, ratio))
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
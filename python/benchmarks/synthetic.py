@@ -0,0 +1,93 @@
+# Synthetic EDF, EDF+ and BDF recordings for the benchmarks.
+#
+# The files are written straight from numpy, a chunk of data records at a time, so that large
+# recordings are generated quickly and without going through the code being benchmarked.
+# The channels cycle through the given sampling rates, and EDF+ files get an annotations
+# channel holding the time-keeping TAL of each record and annotations_per_record annotations.
+import math
+import os
+import numpy as np
+
+formats = ['edf', 'edf+', 'bdf']
+
+
+def padtrim(value, size):
+    return str(value)[:size].ljust(size).encode('ascii')
+
+
+def annotation_tals(record, record_length, annotations_per_record):
+    onset = record * record_length
+    tals = '+%g\x14\x14\x00' % onset
+    for i in range(annotations_per_record):
+        tals += '+%.3f\x150.5\x14event %d\x14\x00' % (onset + i * record_length / annotations_per_record, i)
+    return tals.encode('ascii')
+
+
+def make_recording(path, fmt='edf', nchan=64, rates=(256,), n_records=60, record_length=1,
+                   annotations_per_record=0, start=(1, 1, 21, 10, 0, 0), seed=0, chunk_records=64):
+    """Write a synthetic recording to path, returns the size of the file in bytes."""
+    if fmt not in formats:
+        raise ValueError('Unknown format: ' + str(fmt))
+
+    data_size = 3 if fmt == 'bdf' else 2
+    digital_max = (1 << (8 * data_size - 1)) - 1
+    n_samps = [int(rates[i % len(rates)] * record_length) for i in range(nchan)]
+    labels = ['LA%d' % (i + 1) for i in range(nchan)]
+    physical = [(-3200, 3200)] * nchan
+    units = ['uV'] * nchan
+
+    annotations_size = 0
+    if fmt == 'edf+':
+        longest = len(annotation_tals(n_records, record_length, annotations_per_record))
+        annotations_size = math.ceil(longest / 2)
+        n_samps.append(annotations_size)
+        labels.append('EDF Annotations')
+        physical.append((-1, 1))
+        units.append('')
+
+    ns = len(labels)
+    day, month, year, hour, minute, second = start
+    header = b''.join([
+        padtrim('0', 8),
+        padtrim('X X X X', 80),
+        padtrim('Startdate X X X X', 80),
+        padtrim('%02d.%02d.%02d' % (day, month, year), 8),
+        padtrim('%02d.%02d.%02d' % (hour, minute, second), 8),
+        padtrim(256 * (ns + 1), 8),
+        padtrim({'edf': '', 'edf+': 'EDF+C', 'bdf': '24BIT'}[fmt], 44),
+        padtrim(n_records, 8),
+        padtrim('%g' % record_length, 8),
+        padtrim(ns, 4),
+    ])
+    fields = [
+        (labels, 16), ([''] * ns, 80), (units, 8),
+        ([p[0] for p in physical], 8), ([p[1] for p in physical], 8),
+        ([-digital_max - 1] * ns, 8), ([digital_max] * ns, 8),
+        ([''] * ns, 80), (n_samps, 8), ([''] * ns, 32),
+    ]
+    for values, size in fields:
+        header += b''.join(padtrim(value, size) for value in values)
+
+    rng = np.random.default_rng(seed)
+    signal_samps = sum(n_samps[:nchan])
+    with open(path, 'wb') as fp:
+        fp.write(header)
+        for first in range(0, n_records, chunk_records):
+            count = min(chunk_records, n_records - first)
+            samples = rng.integers(-digital_max // 8, digital_max // 8, size=(count, signal_samps), dtype=np.int32)
+            if fmt == 'bdf':
+                records = samples.astype('<i4').view(np.uint8).reshape(count, signal_samps, 4)[:, :, :3]
+                records = records.reshape(count, signal_samps * 3)
+            else:
+                records = samples.astype('<i2').view(np.uint8).reshape(count, signal_samps * 2)
+
+            if annotations_size:
+                annotations = np.zeros((count, annotations_size * 2), dtype=np.uint8)
+                for i in range(count):
+                    tals = annotation_tals(first + i, record_length, annotations_per_record)
+                    annotations[i, :len(tals)] = np.frombuffer(tals, dtype=np.uint8)
+                records = np.hstack([records, annotations])
+
+            fp.write(records.tobytes())
+
+    return os.path.getsize(path)
@@ -7,11 +7,15 @@ import socketio
 from python.libs import iEEG
 from python.libs.iEEG import ReadError, WriteError, metadata as metadata_fields
 from python.libs.Modifier import Modifier
+from python.libs.Journal import Journal
+from python.libs.Timing import Timing
 from python.libs import BIDS
+from python.libs import Recording
+from python.libs import Metrics
 from python.libs.loris_api import LorisAPI
 import csv
-import datetime
 import json
+import functools
 
 # LORIS credentials of user
 lorisCredentials = {
@@ -20,12 +24,108 @@ lorisCredentials = {
     'lorisPassword': '',
 }
 
+# Service metrics, sent on get_metrics and, with EEG2BIDS_METRICS_HTTP set, served as
+# Prometheus text on /metrics by the same server.
+metrics = Metrics.Registry()
+requests_total = metrics.counter('requests_total', 'Socket events handled.', ['event'])
+request_errors_total = metrics.counter('request_errors_total', 'Socket events that raised an error.', ['event'])
+requests_in_progress = metrics.gauge('requests_in_progress', 'Socket events being handled.', ['event'])
+request_seconds = metrics.histogram('request_seconds', 'Latency of the socket events.', ['event'])
+conversions_total = metrics.counter('conversions_total', 'EDF to BIDS conversions.', ['status'])
+conversion_bytes_total = metrics.counter('conversion_bytes_total', 'Bytes of the EDF files converted.')
+stage_seconds = metrics.histogram('stage_seconds', 'Latency of the conversion stages.', ['stage'])
+loris_request_seconds = metrics.histogram('loris_request_seconds', 'Latency of the LORIS API calls.', ['method'])
+loris_errors_total = metrics.counter('loris_errors_total', 'LORIS API calls that raised an error.', ['method'])
+validated_files_total = metrics.counter('validated_files_total', 'Files checked by the BIDS validations.')
+validation_seconds = metrics.histogram('validation_seconds', 'Duration of the BIDS validations.')
+tpool_threads = metrics.gauge('tpool_threads', 'Threads of the eventlet thread pool.')
+tpool_in_flight = metrics.gauge('tpool_in_flight', 'Calls running or waiting in the eventlet thread pool, '
+                                'but the attribute accesses of the tpool.Proxy responses.')
+tpool_queued = metrics.gauge('tpool_queued', 'Calls waiting for a thread of the eventlet thread pool, '
+                             'but the attribute accesses of the tpool.Proxy responses.')
+tpool_threads.set(int(os.environ.get('EVENTLET_THREADPOOL_SIZE', 20)))
+
+
+def metrics_app(environ, start_response):
+    if environ.get('PATH_INFO') != '/metrics':
+        start_response('404 Not Found', [('Content-Type', 'text/plain')])
+        return [b'Not Found']
+
+    body = metrics.render().encode('utf-8')
+    start_response('200 OK', [
+        ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+        ('Content-Length', str(len(body)))
+    ])
+    return [body]
+
+
 # Create socket listener.
 sio = socketio.Server(async_mode='eventlet', cors_allowed_origins=[])
-app = socketio.WSGIApp(sio)
+app = socketio.WSGIApp(sio, metrics_app if os.environ.get('EEG2BIDS_METRICS_HTTP') else None)
 
 # Create Loris API handler.
 loris_api = LorisAPI()
+metrics.instrument(loris_api, [
+    'login', 'get_projects', 'get_all_subprojects', 'get_subprojects', 'get_visits', 'get_sites',
+    'get_project', 'get_visit', 'start_next_stage', 'create_candidate', 'create_visit', 'get_candidate'
+], loris_request_seconds, loris_errors_total)
+
+
+def tracked(handler):
+    # counts and times a socket event handler in the metrics.
+    @functools.wraps(handler)
+    def wrapper(sid, *args):
+        event = handler.__name__
+        requests_total.inc(event=event)
+        with requests_in_progress.track(event=event), request_seconds.time(event=event):
+            try:
+                return handler(sid, *args)
+            except Exception:
+                request_errors_total.inc(event=event)
+                raise
+    return wrapper
+
+
+def execute(function, *args):
+    # eventlet.tpool.execute, tracked in the thread pool metrics.
+    tpool_in_flight.inc()
+    update_tpool_queued()
+    try:
+        return eventlet.tpool.execute(function, *args)
+    finally:
+        tpool_in_flight.dec()
+        update_tpool_queued()
+
+
+def iterate(iterable):
+    # eventlet.tpool.Proxy of an iterator, each item tracked in the thread pool metrics.
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = execute(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def update_tpool_queued():
+    with metrics.lock:
+        in_flight = tpool_in_flight.values.get((), 0)
+        tpool_queued.set(max(0, in_flight - tpool_threads.values.get((), 0)))
+
+
+def observe_stages(stages, prefix=''):
+    # the runs of a conversion are observed as a single 'run' stage.
+    for stage in stages:
+        name = prefix + ('run' if stage['name'].startswith('run ') else stage['name'])
+        stage_seconds.observe(stage['wall'], stage=name)
+        observe_stages(stage.get('stages', []), name + '/')
+
+
+@sio.event
+@tracked
+def get_metrics(sid, data=None):
+    sio.emit('metrics', metrics.snapshot(), to=sid)
 
 
 @sio.event
@@ -36,23 +136,29 @@ def connect(sid, environ):
 
 
 def tarfile_bids_thread(bids_directory):
-    iEEG.TarFile(bids_directory)
+    timing = Timing()
+    with timing.stage('tar'):
+        iEEG.TarFile(bids_directory)
     response = {
-        'compression_time': 'example_5mins'
+        'compression_time': 'example_5mins',
+        'timing': timing.save(bids_directory)
     }
     return eventlet.tpool.Proxy(response)
 
 
 @sio.event
+@tracked
 def tarfile_bids(sid, bids_directory):
-    response = eventlet.tpool.execute(tarfile_bids_thread, bids_directory)
+    response = execute(tarfile_bids_thread, bids_directory)
     send = {
-        'compression_time': response['compression_time']
+        'compression_time': response['compression_time'],
+        'timing': response['timing']
     }
     sio.emit('response', send)
 
 
 @sio.event
+@tracked
 def get_participant_data(sid, data):
     # todo helper to to data validation
     if 'candID' not in data or not data['candID']:
@@ -63,6 +169,7 @@ def get_participant_data(sid, data):
 
 
 @sio.event
+@tracked
 def set_loris_credentials(sid, data):
     global lorisCredentials
     lorisCredentials = data
@@ -93,26 +200,31 @@ def get_loris_sites(sid):
 
 
 @sio.event
+@tracked
 def get_loris_projects(sid):
     sio.emit('loris_projects', loris_api.get_projects())
 
 
 @sio.event
+@tracked
 def get_loris_subprojects(sid, project):
     sio.emit('loris_subprojects', loris_api.get_subprojects(project))
 
 
 @sio.event
+@tracked
 def get_loris_visits(sid, subproject):
     sio.emit('loris_visits', loris_api.get_visits(subproject))
 
 
 @sio.event
+@tracked
 def create_visit(sid, data):
     loris_api.create_visit(data['candID'], data['visit'], data['site'], data['project'], data['subproject'])
     loris_api.start_next_stage(data['candID'], data['visit'], data['site'], data['subproject'], data['project'], data['date'])
 
 @sio.event
+@tracked
 def create_candidate_and_visit(sid, data):
     new_candidate = loris_api.create_candidate(
         data['project'],
@@ -131,7 +243,19 @@ def create_candidate_and_visit(sid, data):
         sio.emit('new_candidate_created', new_candidate)
 
 
+def is_concatenable(headers):
+    # whether the splits can be written as a single run.
+    if len(headers) < 2:
+        return False
+    try:
+        Recording.Continuity(headers).concatenate()
+        return True
+    except ValueError:
+        return False
+
+
 @sio.event
+@tracked
 def get_edf_data(sid, data):
     # data = { files: 'EDF files (array of {path, name})' }
     print('get_edf_data:', data)
@@ -143,30 +267,28 @@ def get_edf_data(sid, data):
         sio.emit('edf_data', response)
         return
 
-    headers = []
     try:
-        for file in data['files']:
-            anonymize = iEEG.Anonymize(file['path'])
-            metadata = anonymize.get_header()
-            year = '20' + str(metadata[0]['year']) if metadata[0]['year'] < 85 else '19' + str(metadata[0]['year'])
-            date = datetime.datetime(int(year), metadata[0]['month'], metadata[0]['day'], metadata[0]['hour'],
-                                     metadata[0]['minute'], metadata[0]['second'])
-
-            headers.append({
-                'file': file,
-                'metadata': metadata,
-                'date': str(date)
-            })
-
-        for i in range(1, len(headers)):
-            if set(headers[i - 1]['metadata'][1]['ch_names']) != set(headers[i]['metadata'][1]['ch_names']):
-                msg = 'The files selected contain more than one recording.'
-                print(msg)
-                response = {
-                    'error': msg,
-                }
-                sio.emit('edf_data', response)
-                return
+        scan = Recording.HeaderScan(data['files'])
+
+        # the headers are read in a thread pool, each one is sent as soon as it is read.
+        for header in iterate(scan.iter_results()):
+            sio.emit('edf_header', {
+                'file': header['file'],
+                'date': header['date'],
+                'count': sum(1 for h in scan.headers if h),
+                'total': len(scan.headers)
+            }, to=sid)
+
+        headers = scan.headers
+        consistency = Recording.check_consistency(headers)
+        if consistency['errors']:
+            msg = consistency['errors'][0]
+            print(msg)
+            response = {
+                'error': msg,
+            }
+            sio.emit('edf_data', response)
+            return
 
         # sort the recording per date
         headers = sorted(headers, key=lambda k: k['date'])
@@ -176,7 +298,9 @@ def get_edf_data(sid, data):
             'files': [header['file'] for header in headers],
             'subjectID': headers[0]['metadata'][0]['subject_id'],
             'recordingID': headers[0]['metadata'][0]['recording_id'],
-            'date': headers[0]['date']
+            'date': headers[0]['date'],
+            'warnings': consistency['warnings'],
+            'concatenable': is_concatenable(headers)
         }
 
     except ReadError as e:
@@ -193,6 +317,7 @@ def get_edf_data(sid, data):
 
 
 @sio.event
+@tracked
 def get_bids_metadata(sid, data):
     # data = { file_path: 'path to metadata file' }
     print('data:', data)
@@ -246,60 +371,110 @@ def edf_to_bids_thread(data):
         error_messages.append('The LORIS Visit Label is missing.')
 
     if not error_messages:
-        time = iEEG.Time()
-        data['output_time'] = 'output-' + time.latest_output
-
         try:
-            iEEG.Converter(data)  # EDF to BIDS format.
-
-            # store subject_id for Modifier
-            data['subject_id'] = iEEG.Converter.m_info['subject_id']
-            Modifier(data)  # Modifies data of BIDS format
+            timing = Timing()
+            input_bytes = sum(
+                os.path.getsize(eegRun['edfFile']) for eegRun in data['eegRuns'] if os.path.isfile(eegRun['edfFile'])
+            )
+
+            # resumes a previous failed attempt of the same conversion, if any.
+            with timing.stage('journal'):
+                journal = Journal.start(data)
+
+            bids_root = os.path.join(data['bids_directory'], data['output_time'])
+            with timing.profile(bids_root):
+                # EDF to BIDS format, with the sidecars generated from the EEG2BIDS metadata.
+                with timing.stage('converter'):
+                    iEEG.Converter(data, journal, Modifier.sidecar_metadata(data), timing)
+
+                # store subject_id for Modifier
+                data['subject_id'] = iEEG.Converter.m_info['subject_id']
+                with timing.stage('modifier'):
+                    Modifier(data, journal, timing)  # Modifies data of BIDS format
+
+            journal.set_complete()
             response = {
-                'output_time': data['output_time']
+                'output_time': data['output_time'],
+                'timing': timing.save(bids_root)
             }
+            conversions_total.inc(status='success')
+            conversion_bytes_total.inc(input_bytes)
+            observe_stages(timing.stages)
             return eventlet.tpool.Proxy(response)
         except ReadError as e:
             error_messages.append('Cannot read file - ' + str(e))
         except WriteError as e:
             error_messages.append('Cannot write file - ' + str(e))
-    else:
-        response = {
-            'error': error_messages
-        }
+        except Exception as e:
+            # the journal is left incomplete, a retry of the conversion resumes it.
+            print(e)
+            error_messages.append('Conversion failed - ' + str(e))
+
+    conversions_total.inc(status='error')
+    response = {
+        'error': error_messages
+    }
     return eventlet.tpool.Proxy(response)
 
 
 @sio.event
+@tracked
 def edf_to_bids(sid, data):
     # data = { file_paths: [], bids_directory: '', read_only: false,
     # event_files: '', line_freq: '', site_id: '', project_id: '',
     # sub_project_id: '', session: '', subject_id: ''}
     print('edf_to_bids: ', data)
-    response = eventlet.tpool.execute(edf_to_bids_thread, data)
+    response = execute(edf_to_bids_thread, data)
     print(response)
     print('Response received!')
     sio.emit('bids', response.copy())
 
 
 @sio.event
-def validate_bids(sid, bids_directory):
-    print('validate_bids: ', bids_directory)
+@tracked
+def validate_bids(sid, data):
+    # data = 'BIDS directory' or { bids_directory: '', content: false }
+    print('validate_bids: ', data)
+    if isinstance(data, dict):
+        bids_directory = data.get('bids_directory')
+        content = data.get('content', False)
+    else:
+        bids_directory = data
+        content = False
+
     error_messages = []
     if not bids_directory:
         error_messages.append('The BIDS output directory is missing.')
 
     if not error_messages:
-        BIDS.Validate(bids_directory)
+        timing = Timing()
+        validation = BIDS.Validate(bids_directory)
+
+        # the chunks are validated one at a time off the event loop, each result is sent as soon as it is ready.
+        with timing.stage('validation'), validation_seconds.time():
+            for chunk in iterate(validation.iter_results()):
+                sio.emit('validation_progress', chunk, to=sid)
+        validated_files_total.inc(len(validation.file_paths))
+
         response = {
-            'file_paths': BIDS.Validate.file_paths,
-            'result': BIDS.Validate.result
+            'file_paths': validation.file_paths,
+            'result': validation.result
         }
+
+        if content:
+            content_validation = BIDS.ContentValidate(bids_directory)
+            with timing.stage('content_validation'):
+                for reports in iterate(content_validation.iter_results()):
+                    sio.emit('content_validation_progress', reports, to=sid)
+
+            response['content'] = content_validation.reports
+
+        response['timing'] = timing.save(bids_directory)
     else:
         response = {
             'error': error_messages
         }
-    sio.emit('response', response)
+    sio.emit('response', response, to=sid)
 
 
 @sio.event
@@ -1,39 +1,483 @@
 import os
+import csv
+import json
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import bids_validator
 from bids_validator import BIDSValidator
+from python.libs import EDF
+from python.libs.Journal import Journal
+from python.libs.Timing import Timing
+from mne_bids._index import _get_index, _INDEX_FNAME
 
 
-class Validate:
-    file_paths = []
-    result = []
+# validator shared by the validations, the rules are compiled once per process.
+validator = BIDSValidator()
+
+
+def validate_chunk(file_paths):
+    return validator.validate_paths(file_paths)
+
+
+@lru_cache(maxsize=None)
+def rules_version():
+    # identifies the validator and its rule set, cached results of another rule set are stale.
+    sha1 = hashlib.sha1(bids_validator.__version__.encode('utf-8'))
+    for filename in sorted(os.listdir(validator.dir_rules)):
+        with open(os.path.join(validator.dir_rules, filename), 'rb') as fp:
+            sha1.update(filename.encode('utf-8'))
+            sha1.update(fp.read())
+    return sha1.hexdigest()
+
+
+def stem(filename):
+    # the entities of a BIDS file name, without its suffix and extension.
+    return filename.rsplit('_', 1)[0] if '_' in filename else os.path.splitext(filename)[0]
+
+
+# ValidationCache - validation outcomes of a BIDS directory from a previous validation.
+#
+# The validator only checks the file names against its rules, so each outcome is stored per
+# relative path and reused as long as the rule set is unchanged, whatever the content of the file.
+class ValidationCache:
+    filename = '.eeg2bids_validation.json'
+    # the outcomes were keyed by signatures of the files in the first version.
+    version = 2
 
     def __init__(self, bids_directory):
+        self.path = os.path.join(bids_directory, self.filename)
+        self.files = {}
+        self.seen = set()
+        self.changed = False
+
+        try:
+            with open(self.path, 'r') as fp:
+                cache = json.load(fp)
+            if cache.get('version') == self.version and cache.get('rules') == rules_version():
+                self.files = cache['files']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, file_path):
+        self.seen.add(file_path)
+        return self.files.get(file_path)
+
+    def set(self, file_path, result):
+        self.seen.add(file_path)
+        self.changed = True
+        self.files[file_path] = result
+
+    def save(self):
+        if not self.changed and len(self.seen) == len(self.files):
+            return
+
+        # files removed since the previous validation are dropped.
+        cache = {
+            'version': self.version,
+            'rules': rules_version(),
+            'files': {k: v for k, v in self.files.items() if k in self.seen}
+        }
+
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, 'w') as fp:
+                fp.write(json.dumps(cache))
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print('Could not write the validation cache: ' + str(e))
+
+
+# Validate - validates the file names of a BIDS directory.
+#
+# The directory is scanned with os.scandir and the paths are validated in chunks, in the
+# calling thread. iter_results() yields the result of each chunk as soon as it is validated,
+# in scan order; the results gathered so far are kept on the instance, so every validation
+# has its own results. With use_cache, only the files new since the previous validation are
+# validated again, see ValidationCache.
+#
+# The paths are not validated on a worker pool, unlike what was first planned: the validation
+# is a single pass of the compiled rules of the validator per path, which holds the GIL, so a
+# thread pool does not speed it up, and it takes 0.3 s for 18505 files without one.
+class Validate:
+    def __init__(self, bids_directory, chunk_size=500, use_cache=True):
         print('- Validate: init started.')
-        file_paths = []
+        self.bids_directory = bids_directory
+        self.chunk_size = chunk_size
+        self.cache = ValidationCache(bids_directory) if use_cache else None
+        self.file_paths = []
+        self.result = []
+
+    @staticmethod
+    def is_ignored(filename):
+        if filename in ('.bidsignore', Journal.filename, Journal.temp_filename,
+                        ValidationCache.filename) + Timing.internal_files:
+            return True
+
+        # the index of the files, and the locks of the TSV files updated in place.
+        if filename.startswith(_INDEX_FNAME) or (filename.startswith('.') and filename.endswith('.tsv.lock')):
+            return True
+
+        return filename.endswith('_annotations.tsv') or filename.endswith('_annotations.json')
+
+    def listing(self):
+        # yields every directory, depth first in name order, with the names of its files.
+        # A directory holding the index of its files (written along the conversion) is listed
+        # from it, refreshed first for the changes made outside of the conversion: only its
+        # directories changed since are listed again.
+        if os.path.isfile(os.path.join(self.bids_directory, _INDEX_FNAME)):
+            index = _get_index(self.bids_directory)
+            index.refresh()
+            for directory, files, _ in index.stats():
+                yield os.path.join(self.bids_directory, directory) if directory else self.bids_directory, [
+                    name for name, _, _ in files if not self.is_ignored(name)
+                ]
+            return
+
+        directories = [self.bids_directory]
+        while directories:
+            directory = directories.pop()
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda e: e.name)
+
+            subdirectories = []
+            files = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif not self.is_ignored(entry.name):
+                    files.append(entry.name)
+
+            yield directory, files
+            directories.extend(reversed(subdirectories))
+
+    def scan(self):
+        # yields the path of every file relative to the BIDS directory, e.g. /sub-01/sub-01_scans.tsv.
+        for directory, files in self.listing():
+            for name in files:
+                yield os.path.join(directory, name)[len(self.bids_directory):]
+
+    def chunks(self):
+        chunk = []
+        for file_path in self.scan():
+            chunk.append(file_path)
+            if len(chunk) == self.chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    def iter_results(self):
+        for chunk in self.chunks():
+            yield self.validate(chunk)
+
+        if self.cache:
+            self.cache.save()
+
+    def validate(self, chunk):
+        cached = {}
+        if self.cache:
+            for file_path in chunk:
+                result = self.cache.get(file_path)
+                if result is not None:
+                    cached[file_path] = result
+
+        to_validate = [file_path for file_path in chunk if file_path not in cached]
+        validated = dict(zip(to_validate, validate_chunk(to_validate))) if to_validate else {}
+
         result = []
-        validator = BIDSValidator()
-        for path, dirs, files in os.walk(bids_directory):
-            for filename in files:
-                if filename == '.bidsignore':
-                    continue
+        for file_path in chunk:
+            if file_path in validated:
+                if self.cache:
+                    self.cache.set(file_path, validated[file_path])
+                result.append(validated[file_path])
+            else:
+                result.append(cached[file_path])
+
+        self.file_paths.extend(chunk)
+        self.result.extend(result)
+        return {
+            'file_paths': chunk,
+            'result': result
+        }
+
+    def run(self):
+        for _ in self.iter_results():
+            pass
+        return self
+
+
+# columns the BIDS specification requires, in this order, for each TSV file.
+required_columns = {
+    'channels': ['name', 'type', 'units'],
+    'electrodes': ['name', 'x', 'y', 'z'],
+    'events': ['onset', 'duration'],
+    'participants': ['participant_id'],
+    'scans': ['filename'],
+    'sessions': ['session_id'],
+}
+
+# columns holding numbers, 'n/a' is allowed except in the value_columns.
+numeric_columns = {
+    'channels': ['sampling_frequency', 'low_cutoff', 'high_cutoff'],
+    'electrodes': ['x', 'y', 'z', 'size', 'impedance'],
+    'events': ['onset', 'duration', 'response_time'],
+}
+
+integer_columns = {
+    'events': ['sample'],
+}
+
+value_columns = {
+    'events': ['onset'],
+}
+
+numeric_fields = ['SamplingFrequency', 'RecordingDuration', 'EpochLength', 'HeadCircumference']
+
+
+@lru_cache(maxsize=None)
+def non_custom_columns():
+    path = os.path.join(os.path.dirname(bids_validator.__file__), 'tsv', 'non_custom_columns.json')
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+@lru_cache(maxsize=None)
+def sidecar_fields():
+    # the fields of the *_eeg.json and *_ieeg.json sidecars by level (required, recommended,
+    # optional, deprecated), from the BIDS schema of the validator.
+    path = os.path.join(os.path.dirname(bids_validator.__file__), 'json', 'sidecar_fields.json')
+    with open(path, 'r') as fp:
+        return json.load(fp)
+
+
+def is_number(value, integer=False):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return False
+    return number.is_integer() if integer else True
+
+
+def suffix_of(filename):
+    return filename.rsplit('_', 1)[-1].split('.', 1)[0] if '_' in filename else filename.split('.', 1)[0]
+
+
+# ContentValidate - validates the content of the TSV/JSON sidecars and EDF headers of a BIDS directory.
+#
+# Each directory is checked as a unit on a worker pool, so every TSV and JSON file is parsed
+# exactly once and reused by the checks that need it (custom column descriptions, EDF channel
+# count against channels.tsv, EDF sampling frequency against the *_eeg.json sidecar).
+# iter_results() yields the report of each directory, in scan order, as a list of
+# {'file_path', 'errors', 'warnings'} for its checked files.
+class ContentValidate:
+    def __init__(self, bids_directory, max_workers=None, executor=None):
+        print('- ContentValidate: init started.')
+        self.bids_directory = bids_directory
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.executor = executor
+        self.reports = []
+
+    def scan(self):
+        # yields each directory with the names of its files.
+        directories = [self.bids_directory]
+        while directories:
+            directory = directories.pop()
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda e: e.name)
+
+            files = [e.name for e in entries if not e.is_dir(follow_symlinks=False) and not Validate.is_ignored(e.name)]
+            if files:
+                yield directory, files
+
+            directories.extend(reversed([e.path for e in entries if e.is_dir(follow_symlinks=False)]))
+
+    def iter_results(self):
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+
+        try:
+            for directory, files in self.scan():
+                pending.append(executor.submit(self.validate_directory, directory, files))
+
+                if len(pending) > 2 * self.max_workers:
+                    yield self.collect(pending.popleft())
+
+            while pending:
+                yield self.collect(pending.popleft())
+        finally:
+            for future in pending:
+                future.cancel()
+
+            if executor is not self.executor:
+                executor.shutdown(wait=False)
+
+    def collect(self, future):
+        reports = future.result()
+        self.reports.extend(reports)
+        return reports
+
+    def run(self):
+        for _ in self.iter_results():
+            pass
+        return self
+
+    def validate_directory(self, directory, files):
+        # every TSV and JSON file of the directory, parsed once.
+        parsed = {}
+        reports = {}
+        for filename in files:
+            if filename.endswith('.tsv') or filename.endswith('.json'):
+                report = reports[filename] = {'errors': [], 'warnings': []}
+                try:
+                    parsed[filename] = self.parse(os.path.join(directory, filename))
+                except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+                    report['errors'].append('Cannot parse file: ' + str(e))
+
+        for filename in files:
+            if filename in parsed and filename.endswith('.tsv'):
+                self.check_tsv(filename, parsed, reports[filename])
+            elif filename in parsed and suffix_of(filename) in sidecar_fields():
+                self.check_sidecar_json(filename, parsed[filename], reports[filename])
+            elif filename.endswith('.edf') or filename.endswith('.bdf'):
+                reports[filename] = {'errors': [], 'warnings': []}
+                self.check_edf(directory, filename, parsed, reports[filename])
+
+        return [
+            {
+                'file_path': os.path.join(directory, filename)[len(self.bids_directory):],
+                'errors': report['errors'],
+                'warnings': report['warnings'],
+            }
+            for filename, report in sorted(reports.items())
+        ]
+
+    @staticmethod
+    def parse(path):
+        if path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8-sig') as fp:
+                return json.load(fp)
+
+        with open(path, 'r', newline='', encoding='utf-8-sig') as fp:
+            reader = csv.reader(fp, delimiter='\t')
+            header = next(reader, [])
+            return {'header': header, 'rows': list(reader)}
+
+    @staticmethod
+    def inherited(filename, files, suffix):
+        # the closest file of the directory with this suffix whose entities the filename inherits.
+        candidates = [
+            f for f in files
+            if f.endswith('_' + suffix) and stem(filename).startswith(stem(f))
+        ]
+        return max(candidates, key=len) if candidates else None
+
+    def check_tsv(self, filename, parsed, report):
+        table = parsed[filename]
+        header = table['header']
+        suffix = suffix_of(filename)
+
+        required = required_columns.get(suffix, [])
+        if header[:len(required)] != required:
+            report['errors'].append(
+                'The first columns must be ' + ', '.join(required) + ', found ' + ', '.join(header[:len(required)])
+            )
+
+        for i, row in enumerate(table['rows']):
+            if len(row) != len(header):
+                report['errors'].append(
+                    'Row %d has %d values for %d columns.' % (i + 2, len(row), len(header))
+                )
+
+        columns = {name: index for index, name in enumerate(header)}
+        for name in numeric_columns.get(suffix, []) + integer_columns.get(suffix, []):
+            if name not in columns:
+                continue
+            integer = name in integer_columns.get(suffix, [])
+            invalid = [
+                i + 2 for i, row in enumerate(table['rows'])
+                if columns[name] < len(row) and not (
+                    is_number(row[columns[name]], integer) or
+                    (row[columns[name]] == 'n/a' and name not in value_columns.get(suffix, []))
+                )
+            ]
+            if invalid:
+                report['errors'].append(
+                    'Column %s must contain %s, invalid rows: %s' % (
+                        name,
+                        'integers' if integer else 'numbers',
+                        ', '.join(str(i) for i in invalid[:10]) + (' ...' if len(invalid) > 10 else '')
+                    )
+                )
+
+        if suffix in non_custom_columns():
+            described = parsed.get(filename[:-len('.tsv')] + '.json')
+            described = described if isinstance(described, dict) else {}
+            for name in header:
+                if name not in non_custom_columns()[suffix] and name not in described:
+                    report['warnings'].append(
+                        'Custom column ' + name + ' is not described in a JSON sidecar.'
+                    )
+
+    def check_sidecar_json(self, filename, sidecar, report):
+        modality = suffix_of(filename)
+        if not isinstance(sidecar, dict):
+            report['errors'].append('The sidecar must be a JSON object.')
+            return
+
+        fields = sidecar_fields()[modality]
+        for field in fields['required']:
+            if field not in sidecar:
+                report['errors'].append('Missing required field ' + field + '.')
+
+        for field in sidecar:
+            if field in fields.get('deprecated', []):
+                report['warnings'].append('Deprecated field ' + field + '.')
+            elif not any(field in names for names in fields.values()):
+                report['warnings'].append('Unknown field ' + field + '.')
+
+        for field in numeric_fields:
+            if field in sidecar and not isinstance(sidecar[field], (int, float)):
+                report['errors'].append('Field ' + field + ' must be a number.')
 
-                if filename.endswith('_annotations.tsv'):
-                    continue
+        if 'PowerLineFrequency' in sidecar and not (
+                isinstance(sidecar['PowerLineFrequency'], (int, float)) or sidecar['PowerLineFrequency'] == 'n/a'):
+            report['errors'].append('Field PowerLineFrequency must be a number or n/a.')
 
-                if filename.endswith('_annotations.json'):
-                    continue
+        for field in sidecar:
+            if field.endswith('ChannelCount') and not (
+                    isinstance(sidecar[field], int) and not isinstance(sidecar[field], bool)):
+                report['errors'].append('Field ' + field + ' must be an integer.')
 
-                temp = os.path.join(path, filename)
-                file_paths.append(temp[len(bids_directory):len(temp)])
-                result.append(validator.is_bids(temp[len(bids_directory):len(temp)]))
-                # print(validator.is_bids(temp[len(bids_directory):len(temp)]))
+    def check_edf(self, directory, filename, parsed, report):
+        try:
+            reader = EDF.EDFReader(fname=os.path.join(directory, filename))
+            meas_info, chan_info = reader.meas_info, reader.chan_info
+            reader.close()
+        except Exception as e:
+            report['errors'].append('Cannot read the EDF header: ' + str(e))
+            return
 
-        self.set_file_paths(file_paths)
-        self.set_result(result)
+        # the EDF+ annotations are not a channel of the recording.
+        n_channels = len([ch for ch in chan_info['ch_names'] if ch != 'EDF Annotations'])
 
-    @classmethod
-    def set_file_paths(cls, value):
-        cls.file_paths = value
+        channels_tsv = self.inherited(filename, parsed, 'channels.tsv')
+        if channels_tsv is None:
+            report['warnings'].append('No channels.tsv found for this recording.')
+        elif n_channels != len(parsed[channels_tsv]['rows']):
+            report['errors'].append(
+                'The EDF header has %d channels, %s lists %d.' % (
+                    n_channels, channels_tsv, len(parsed[channels_tsv]['rows']))
+            )
 
-    @classmethod
-    def set_result(cls, value):
-        cls.result = value
+        modality = suffix_of(filename)
+        sidecar = parsed.get(stem(filename) + '_' + modality + '.json')
+        if isinstance(sidecar, dict) and isinstance(sidecar.get('SamplingFrequency'), (int, float)):
+            sampling_frequency = max(chan_info['n_samps']) / meas_info['record_length']
+            if abs(sampling_frequency - sidecar['SamplingFrequency']) > 1e-6:
+                report['errors'].append(
+                    'The EDF header sampling frequency is %g Hz, the sidecar has %g Hz.' % (
+                        sampling_frequency, sidecar['SamplingFrequency'])
+                )
@@ -0,0 +1,170 @@
+import os
+import csv
+import json
+import shutil
+from mne_bids.tsv_handler import _tsv_lock, _find_row, _upsert_row
+
+
+# Dataset - in-memory model of the files of a BIDS directory.
+#
+# Files are read from disk at most once, on first access, and every change is kept in memory
+# until flush(): each changed file is then written exactly once, to a temporary file renamed
+# over the original, so a crash never leaves a half-written sidecar. Directory listings are
+# cached and kept in sync with the pending changes.
+class Dataset:
+    def __init__(self, bids_root):
+        self.bids_root = bids_root
+        # path -> {'kind': 'json' | 'tsv' | 'text', 'content': ..., 'changed': bool}
+        self.files = {}
+        self.listings = {}
+        # renames, removals, copies and row updates, applied in order before the writes.
+        self.operations = []
+
+    def get_path(self, *parts):
+        return os.path.join(self.bids_root, *parts)
+
+    def listdir(self, directory):
+        if directory not in self.listings:
+            self.listings[directory] = sorted(os.listdir(directory))
+        return list(self.listings[directory])
+
+    def exists(self, path):
+        directory, filename = os.path.split(path)
+        try:
+            return filename in self.listdir(directory)
+        except FileNotFoundError:
+            return False
+
+    def load(self, path, kind):
+        if path not in self.files:
+            with open(path, mode='r', newline='', encoding='utf-8-sig') as fp:
+                if kind == 'json':
+                    content = json.load(fp)
+                elif kind == 'tsv':
+                    rows = list(csv.reader(fp, delimiter='\t'))
+                    content = {'header': rows[0] if rows else [], 'rows': rows[1:]}
+                else:
+                    content = fp.read()
+            self.files[path] = {'kind': kind, 'content': content, 'changed': False}
+        return self.files[path]['content']
+
+    def read_json(self, path):
+        return self.load(path, 'json')
+
+    def read_tsv(self, path):
+        table = self.load(path, 'tsv')
+        return table['header'], table['rows']
+
+    def set(self, path, kind, content):
+        directory, filename = os.path.split(path)
+        if directory in self.listings and filename not in self.listings[directory]:
+            self.listings[directory] = sorted(self.listings[directory] + [filename])
+        self.files[path] = {'kind': kind, 'content': content, 'changed': True}
+
+    def write_json(self, path, data):
+        self.set(path, 'json', data)
+
+    def write_tsv(self, path, header, rows):
+        self.set(path, 'tsv', {'header': header, 'rows': rows})
+
+    def write_text(self, path, text):
+        self.set(path, 'text', text)
+
+    def remove(self, path):
+        directory, filename = os.path.split(path)
+        if filename in self.listdir(directory):
+            self.listings[directory].remove(filename)
+        self.files.pop(path, None)
+        self.operations.append(('remove', path))
+
+    def copy_file(self, source, destination):
+        # source is a file outside of the dataset, copied as is.
+        self.add_to_listing(destination)
+        self.files.pop(destination, None)
+        self.operations.append(('copy', source, destination))
+
+    def add_to_listing(self, path):
+        directory, filename = os.path.split(path)
+        if filename not in self.listdir(directory):
+            self.listings[directory] = sorted(self.listings[directory] + [filename])
+
+    def update_tsv_row(self, path, key, row):
+        # the row of the TSV file whose key column holds row[key] is inserted or replaced on
+        # flush, under the lock of the file: conversions into a shared root keep each other's rows.
+        self.add_to_listing(path)
+        self.files.pop(path, None)
+        self.operations.append(('update_row', path, key, row))
+
+    def rename(self, source, destination):
+        directory, filename = os.path.split(source)
+        if filename in self.listdir(directory):
+            self.listings[directory].remove(filename)
+        self.add_to_listing(destination)
+
+        if source in self.files:
+            self.files[destination] = self.files.pop(source)
+        self.operations.append(('rename', source, destination))
+
+    def flush(self):
+        # returns the paths written, renamed or removed.
+        paths = []
+        for operation in self.operations:
+            paths.extend(operation[1:] if operation[0] == 'rename' else operation[-1:])
+            if operation[0] == 'rename' and os.path.exists(operation[1]):
+                os.replace(operation[1], operation[2])
+            elif operation[0] == 'remove' and os.path.exists(operation[1]):
+                os.remove(operation[1])
+            elif operation[0] == 'copy':
+                shutil.copyfile(operation[1], operation[2] + '.tmp')
+                os.replace(operation[2] + '.tmp', operation[2])
+            elif operation[0] == 'update_row':
+                self.update_row(*operation[1:])
+
+        for path, file in self.files.items():
+            if file['changed']:
+                self.write_atomic(path, file['kind'], file['content'])
+                file['changed'] = False
+                paths.append(path)
+
+        self.operations = []
+        return paths
+
+    @classmethod
+    def update_row(cls, path, key, row):
+        with _tsv_lock(path):
+            # the columns of the row not given keep their value.
+            if os.path.exists(path):
+                row = dict(_find_row(path, key, row[key]) or {}, **row)
+
+            # only the row is written when the file has all its columns, see _upsert_row.
+            if os.path.exists(path) and _upsert_row(path, row, key):
+                return
+
+            header, rows = [], []
+            if os.path.exists(path):
+                with open(path, mode='r', newline='', encoding='utf-8-sig') as fp:
+                    lines = [line for line in csv.reader(fp, delimiter='\t') if line]
+                header, rows = (lines[0], lines[1:]) if lines else ([], [])
+
+            # new columns are added, and the rows are kept sorted by their unique key.
+            header = header + [column for column in row if column not in header]
+            index = header.index(key)
+            rows = {line[index]: line + ['n/a'] * (len(header) - len(line)) for line in rows}
+            rows[row[key]] = [str(row.get(column, 'n/a')) for column in header]
+            cls.write_atomic(path, 'tsv', {'header': header, 'rows': [rows[k] for k in sorted(rows)]})
+
+    @staticmethod
+    def write_atomic(path, kind, content):
+        temp_path = path + '.tmp'
+        with open(temp_path, mode='w', newline='', encoding='utf-8') as fp:
+            if kind == 'json':
+                json.dump(content, fp, indent=4)
+            elif kind == 'tsv':
+                writer = csv.writer(fp, delimiter='\t')
+                writer.writerow(content['header'])
+                writer.writerows(content['rows'])
+            else:
+                fp.write(content)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp_path, path)
@@ -0,0 +1,218 @@
+import os
+import csv
+import heapq
+import itertools
+import tempfile
+import numpy as np
+from datetime import datetime
+from python.libs import EDF
+
+
+# Events - merges events.tsv files by onset in bounded memory.
+#
+# Every source is read in chunks: the rows are normalized to the five BIDS columns and their
+# onsets are validated with a single numpy conversion per chunk. Each chunk is sorted and
+# spilled to a run file, appended to the previous run while the onsets keep increasing, so an
+# already sorted source becomes a single run. The runs of all the sources are then streamed
+# through a k-way merge, each one read a share of a chunk at a time so that the rows in memory
+# stay about a chunk: equal onsets keep the order of the sources, then of the rows.
+#
+# Given the timing of the recording (see recording_info), the onsets of a source can also be
+# clock times or data record indices, converted to seconds, and the missing samples are
+# computed from the sampling frequency, a whole chunk at a time.
+class Events:
+    headers = ['onset', 'duration', 'trial_type', 'value', 'sample']
+    onset_formats = ['seconds', 'clock', 'record']
+    chunk_size = 100000
+
+    def __init__(self, chunk_size=None, recording=None):
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.recording = recording
+
+    @staticmethod
+    def recording_info(edf_file):
+        """The timing of a recording, read from its EDF header only."""
+        reader = EDF.EDFReader(fname=edf_file)
+        meas_info, chan_info = reader.meas_info, reader.chan_info
+
+        n_samps = [
+            n for name, n in zip(chan_info['ch_names'], chan_info['n_samps'])
+            if name != 'EDF Annotations'
+        ]
+        year = meas_info['year']
+        if year < 100:
+            # EDF years are 2 digits, 85-99 are 1985-1999.
+            year += 1900 if year >= 85 else 2000
+
+        return {
+            'sfreq': max(n_samps) / meas_info['record_length'],
+            'record_length': meas_info['record_length'],
+            'start': datetime(year, meas_info['month'], meas_info['day'],
+                              meas_info['hour'], meas_info['minute'], meas_info['second']),
+        }
+
+    def read_chunks(self, path, onset_format='seconds'):
+        """Yield (rows, onsets) chunks of the valid rows of an events file, after its header.
+
+        The onsets are in seconds, converted from onset_format if needed.
+        """
+        if onset_format not in self.onset_formats:
+            raise ValueError('Unknown onset format: ' + str(onset_format))
+        if onset_format != 'seconds' and not self.recording:
+            raise ValueError('The recording timing is required for the ' + onset_format + ' onset format.')
+
+        with open(path, mode='r', newline='', encoding='utf-8-sig') as tsv_file:
+            tsv_file.readline()
+            reader = csv.reader(tsv_file, delimiter='\t')
+            line_number = 1
+
+            while True:
+                rows = []
+                for line in reader:
+                    line_number += 1
+                    if len(line) == 5:
+                        rows.append(line)
+                    elif len(line) == 3:
+                        rows.append(line + ['n/a', 'n/a'])
+                    elif line:
+                        print('error: ValueError, ' + path + ' line ' + str(line_number))
+
+                    if len(rows) == self.chunk_size:
+                        break
+
+                if not rows:
+                    return
+
+                rows, onsets = self.validate_onsets(path, rows, onset_format)
+
+                if onset_format != 'seconds':
+                    formatted = np.char.rstrip(np.char.rstrip(np.char.mod('%.6f', onsets), '0'), '.')
+                    for row, onset in zip(rows, formatted.tolist()):
+                        row[0] = onset
+
+                if self.recording:
+                    self.fill_samples(rows, onsets)
+
+                yield rows, onsets
+
+    def parse_onsets(self, values, onset_format):
+        if onset_format == 'clock':
+            values = np.char.replace(np.array(values, dtype=str), ' ', 'T')
+            start = np.datetime64(self.recording['start'], 'us')
+            # times of day are on the day the recording started, or the next one.
+            time_only = np.char.find(values, 'T') < 0
+            values = np.where(time_only, np.char.add(str(start.astype('datetime64[D]')) + 'T', values), values)
+            onsets = (values.astype('datetime64[us]') - start) / np.timedelta64(1, 's')
+            onsets[time_only & (onsets < 0)] += 86400
+            return onsets
+
+        onsets = np.array(values, dtype=np.float64)
+        if onset_format == 'record':
+            onsets *= self.recording['record_length']
+        return onsets
+
+    def validate_onsets(self, path, rows, onset_format='seconds'):
+        try:
+            onsets = self.parse_onsets([row[0] for row in rows], onset_format)
+        except ValueError:
+            # slow path, only for the chunks holding invalid onsets.
+            valid = []
+            for row in rows:
+                try:
+                    self.parse_onsets([row[0]], onset_format)
+                    valid.append(row)
+                except ValueError:
+                    print('error: invalid onset ' + repr(row[0]) + ' in ' + path)
+            rows = valid
+            onsets = self.parse_onsets([row[0] for row in rows], onset_format)
+
+        invalid = ~np.isfinite(onsets)
+        if invalid.any():
+            for i in np.flatnonzero(invalid):
+                print('error: invalid onset ' + repr(rows[i][0]) + ' in ' + path)
+            rows = [row for row, bad in zip(rows, invalid) if not bad]
+            onsets = onsets[~invalid]
+
+        return rows, onsets
+
+    def fill_samples(self, rows, onsets):
+        missing = np.array([row[4] == 'n/a' for row in rows], dtype=bool)
+        if not missing.any():
+            return
+
+        samples = np.char.mod('%d', np.rint(onsets[missing] * self.recording['sfreq']).astype(np.int64))
+        for i, sample in zip(np.flatnonzero(missing).tolist(), samples.tolist()):
+            rows[i][4] = sample
+
+    def sorted_runs(self, path, directory, onset_format='seconds'):
+        """Spill the rows of an events file to sorted run files, returns their paths."""
+        runs = []
+        run_file = None
+        last_onset = None
+
+        try:
+            for rows, onsets in self.read_chunks(path, onset_format):
+                if len(rows) == 0:
+                    continue
+
+                if np.any(onsets[1:] < onsets[:-1]):
+                    order = np.argsort(onsets, kind='stable')
+                    rows = [rows[i] for i in order]
+                    onsets = onsets[order]
+
+                if run_file is None or onsets[0] < last_onset:
+                    if run_file:
+                        run_file.close()
+                    fd, run_path = tempfile.mkstemp(dir=directory, suffix='.tsv')
+                    run_file = os.fdopen(fd, mode='w', newline='', encoding='utf-8')
+                    runs.append(run_path)
+
+                csv.writer(run_file, delimiter='\t').writerows(rows)
+                last_onset = onsets[-1]
+        finally:
+            if run_file:
+                run_file.close()
+
+        return runs
+
+    def iter_run(self, path, buffer_size=None):
+        """Yield the (onset, row) of a run file, reading buffer_size rows at a time."""
+        with open(path, mode='r', newline='', encoding='utf-8') as run_file:
+            reader = csv.reader(run_file, delimiter='\t')
+            while True:
+                rows = list(itertools.islice(reader, buffer_size or self.chunk_size))
+                if not rows:
+                    return
+                # the onsets of a run were validated when it was spilled.
+                onsets = np.array([row[0] for row in rows], dtype=np.float64)
+                yield from zip(onsets.tolist(), rows)
+
+    def merge(self, sources, destination):
+        """Merge the events files sources by onset into destination, written atomically.
+
+        A source is a path, or a (path, onset_format) tuple.
+        """
+        temp_path = destination + '.tmp'
+
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(destination)) as directory:
+            runs = []
+            for source in sources:
+                if isinstance(source, str):
+                    source = (source, 'seconds')
+                runs.extend(self.sorted_runs(source[0], directory, source[1]))
+
+            # the runs share a chunk of rows, so that the merge holds about as many rows as a
+            # chunk whatever the number of runs.
+            buffer_size = max(1, self.chunk_size // max(1, len(runs)))
+            with open(temp_path, mode='w', newline='', encoding='utf-8') as tsv_file:
+                writer = csv.writer(tsv_file, delimiter='\t')
+                writer.writerow(self.headers)
+                writer.writerows(
+                    row for onset, row in heapq.merge(
+                        *[self.iter_run(run, buffer_size) for run in runs], key=lambda x: x[0])
+                )
+                tsv_file.flush()
+                os.fsync(tsv_file.fileno())
+
+        os.replace(temp_path, destination)
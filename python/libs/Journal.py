@@ -0,0 +1,189 @@
+import os
+import json
+import hashlib
+from python.libs.iEEG import Time, WriteError
+
+
+# Journal - checkpoints the stages of a conversion so that a failed run can be resumed.
+#
+# The journal lives inside the output directory (<bids_directory>/<output_time>) and records,
+# per EDF run, the converted copy (with its hash) and the sidecars written next to it, then
+# every Modifier step applied to the dataset. A retry of the same conversion request finds
+# the incomplete journal, reuses its output directory and skips the finished stages.
+class Journal:
+    filename = '.eeg2bids_journal.json'
+    # the journal is saved through this temporary file, left behind if the service stops mid-save.
+    temp_filename = filename + '.tmp'
+    version = 1
+
+    def __init__(self, bids_root, key, output_time):
+        self.bids_root = bids_root
+        self.path = os.path.join(bids_root, self.filename)
+        self.resumed = False
+        self.state = {
+            'version': self.version,
+            'key': key,
+            'output_time': output_time,
+            'complete': False,
+            'runs': {},
+            'steps': [],
+        }
+
+    @classmethod
+    def start(cls, data):
+        """Resume the latest incomplete journal of this conversion request, or start a new one.
+
+        data['output_time'] is set to the output folder of the journal.
+        """
+        key = cls.fingerprint(data)
+        journal = cls.find_incomplete(data['bids_directory'], key)
+
+        if journal:
+            print('- Journal: resuming ' + journal.state['output_time'])
+            data['output_time'] = journal.state['output_time']
+            try:
+                os.remove(os.path.join(journal.bids_root, cls.temp_filename))
+            except FileNotFoundError:
+                pass
+            return journal
+
+        data['output_time'] = 'output-' + Time().latest_output
+        bids_root = os.path.join(data['bids_directory'], data['output_time'])
+        journal = cls(bids_root, key, data['output_time'])
+
+        try:
+            os.makedirs(bids_root, exist_ok=True)
+            journal.save()
+        except PermissionError as ex:
+            raise WriteError(ex)
+
+        return journal
+
+    @classmethod
+    def load(cls, bids_root):
+        with open(os.path.join(bids_root, cls.filename), 'r') as fp:
+            state = json.load(fp)
+
+        if state.get('version') != cls.version:
+            raise ValueError('Unsupported journal version: ' + str(state.get('version')))
+
+        journal = cls(bids_root, state['key'], state['output_time'])
+        journal.state = state
+        return journal
+
+    @classmethod
+    def find_incomplete(cls, bids_directory, key):
+        try:
+            entries = sorted(
+                [entry for entry in os.scandir(bids_directory)
+                 if entry.is_dir() and entry.name.startswith('output-')],
+                key=lambda entry: entry.name,
+                reverse=True
+            )
+        except OSError:
+            return None
+
+        for entry in entries:
+            try:
+                journal = cls.load(entry.path)
+            except (OSError, ValueError, KeyError):
+                continue
+
+            if journal.state['key'] == key and not journal.state['complete']:
+                journal.resumed = True
+                return journal
+
+        return None
+
+    @staticmethod
+    def fingerprint(data):
+        # everything the output depends on: the request itself and the state of the input files.
+        request = {k: v for k, v in data.items() if k not in ('output_time', 'subject_id')}
+        sources = []
+        for eegRun in data.get('eegRuns', []):
+            sources.append(Journal.file_signature(eegRun.get('edfFile')))
+
+        payload = json.dumps({'request': request, 'sources': sources}, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def file_signature(path):
+        try:
+            stat = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        return {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    @staticmethod
+    def file_hash(path, block_size=1 << 20):
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as fp:
+            for block in iter(lambda: fp.read(block_size), b''):
+                sha256.update(block)
+        return sha256.hexdigest()
+
+    def save(self):
+        # write to a temporary file first so a crash never leaves a truncated journal.
+        temp_path = os.path.join(self.bids_root, self.temp_filename)
+        with open(temp_path, 'w') as fp:
+            json.dump(self.state, fp, indent=4)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(temp_path, self.path)
+
+    def get_run(self, run_key):
+        return self.state['runs'].get(str(run_key))
+
+    def is_run_converted(self, run_key, source_file):
+        run = self.get_run(run_key)
+        if not run or 'copy' not in run:
+            return False
+
+        if run['source'] != self.file_signature(source_file):
+            return False
+
+        # once the Modifier started, the sidecars are renamed or removed by its steps.
+        if not self.state['steps']:
+            for sidecar in run['sidecars']:
+                if not os.path.isfile(os.path.join(self.bids_root, sidecar)):
+                    return False
+
+        copy_path = os.path.join(self.bids_root, run['copy']['path'])
+        if not os.path.isfile(copy_path) or os.path.getsize(copy_path) != run['copy']['size']:
+            return False
+
+        return self.file_hash(copy_path) == run['copy']['sha256']
+
+    def set_run_converted(self, run_key, source_file, basename, copy_path):
+        directory = os.path.dirname(copy_path)
+        sidecars = [
+            os.path.relpath(os.path.join(directory, f), self.bids_root)
+            for f in sorted(os.listdir(directory))
+            if f.startswith(basename + '_') and os.path.join(directory, f) != copy_path
+        ]
+
+        self.state['runs'][str(run_key)] = {
+            'source': self.file_signature(source_file),
+            'basename': basename,
+            'copy': {
+                'path': os.path.relpath(copy_path, self.bids_root),
+                'size': os.path.getsize(copy_path),
+                'sha256': self.file_hash(copy_path),
+            },
+            'sidecars': sidecars,
+        }
+        # a (re)converted run invalidates the Modifier steps applied on top of the previous output.
+        self.state['steps'] = []
+        self.save()
+
+    def is_step_done(self, step):
+        return step in self.state['steps']
+
+    def set_step_done(self, step):
+        if step not in self.state['steps']:
+            self.state['steps'].append(step)
+            self.save()
+
+    def set_complete(self):
+        self.state['complete'] = True
+        self.save()
@@ -0,0 +1,186 @@
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+
+# Metrics - counters, gauges and histograms of the eeg2bids service.
+#
+# The metrics are kept in a Registry, updated from the socket handlers and from the tpool
+# threads alike, so every update holds the registry lock. A registry can be read as a JSON
+# snapshot (the get_metrics socket event) or rendered in the Prometheus text format.
+class Metric:
+    type = ''
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # label values tuple -> value
+        self.values = {}
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError('Labels of ' + self.name + ' are ' + ', '.join(self.labelnames))
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        # (suffix, labels, value) of every sample, for the text format.
+        return [('', dict(zip(self.labelnames, key)), value) for key, value in self.values.items()]
+
+    def snapshot(self):
+        return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=None):
+        super().__init__(registry, name, help, labelnames)
+        if buckets:
+            self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            if key not in self.values:
+                self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0., 'count': 0}
+            histogram = self.values[key]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the block, even when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        samples = []
+        for key, histogram in self.values.items():
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, histogram['counts']):
+                samples.append(('_bucket', dict(labels, le=format_value(bound)), count))
+            samples.append(('_bucket', dict(labels, le='+Inf'), histogram['count']))
+            samples.append(('_sum', labels, histogram['sum']))
+            samples.append(('_count', labels, histogram['count']))
+        return samples
+
+    def snapshot(self):
+        return [{
+            'labels': dict(zip(self.labelnames, key)),
+            'count': histogram['count'],
+            'sum': histogram['sum'],
+            'buckets': dict(zip([format_value(bound) for bound in self.buckets], histogram['counts'])),
+        } for key, histogram in self.values.items()]
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self, prefix='eeg2bids_'):
+        self.prefix = prefix
+        self.metrics = {}
+        self.lock = threading.RLock()
+
+    def add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.add(Counter(self, self.prefix + name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self.add(Gauge(self, self.prefix + name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=None):
+        return self.add(Histogram(self, self.prefix + name, help, labelnames, buckets))
+
+    def instrument(self, target, names, histogram, errors):
+        """Time every call of the methods names of target in histogram, counting the exceptions in errors.
+
+        Both metrics have a single 'method' label.
+        """
+        def timed(name, function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with histogram.time(method=name):
+                    try:
+                        return function(*args, **kwargs)
+                    except Exception:
+                        errors.inc(method=name)
+                        raise
+            return wrapper
+
+        for name in names:
+            setattr(target, name, timed(name, getattr(target, name)))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {'type': metric.type, 'help': metric.help, 'values': metric.snapshot()}
+                for name, metric in self.metrics.items()
+            }
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, metric in self.metrics.items():
+                lines.append('# HELP ' + name + ' ' + metric.help)
+                lines.append('# TYPE ' + name + ' ' + metric.type)
+                for suffix, labels, value in metric.samples():
+                    label_text = ','.join('%s="%s"' % (k, escape(v)) for k, v in labels.items())
+                    lines.append(name + suffix + ('{' + label_text + '}' if label_text else '') + ' ' + format_value(value))
+        return '\n'.join(lines) + '\n'
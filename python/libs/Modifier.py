@@ -1,25 +1,155 @@
 import os
-import csv
 import json
 import re
-import shutil
+from python.libs.Dataset import Dataset
+from python.libs.Events import Events
+from python.libs.Timing import Timing
 from python.libs.iEEG import metadata as metadata_fields
-
+from mne_bids._index import _get_index, _INDEX_FNAME
+from mne_bids.tsv_handler import _remove_tsv_locks
+
+# Modifier - post-processes the BIDS files written by mne_bids.
+#
+# Every step reads and transforms the files through an in-memory Dataset, which is flushed
+# once all the steps are applied: each file is read at most once and written at most once.
+#
+# In the 'direct' sidecar mode (the default), the EEG2BIDS metadata is passed to mne_bids
+# up front (see sidecar_metadata), so the sidecars are generated with their final content
+# and only the steps adding files or removing duplicates are left to the Modifier.
 class Modifier:
-    def __init__(self, data):
+    def __init__(self, data, journal=None, timing=None):
         self.data = data
         print(self.data)
 
         print('- Modifier: init started.')
+        timing = timing or Timing()
+
+        self.dataset = Dataset(self.get_bids_root_path())
+
+        if self.is_direct(data):
+            steps = [
+                self.clean_dataset_files,
+                self.copy_event_files,
+                self.copy_annotation_files,
+            ]
+        else:
+            steps = [
+                self.modify_dataset_description_json,
+                self.modify_participants_tsv,
+                self.modify_participants_json,
+                self.clean_dataset_files,
+                self.copy_event_files,
+                self.copy_annotation_files,
+                self.modify_eeg_json,
+            ]
+
+        applied = []
+        for step in steps:
+            # steps applied by a previous attempt of a resumed conversion are not idempotent.
+            if journal and journal.is_step_done(step.__name__):
+                print('- Modifier: ' + step.__name__ + ' already applied, skipping.')
+                continue
+
+            with timing.stage(step.__name__):
+                step()
+            applied.append(step.__name__)
+
+        with timing.stage('flush'):
+            paths = self.dataset.flush()
+
+        # the lock files of participants.tsv and of the scans.tsv of the session, unless another
+        # conversion into the dataset holds them.
+        paths += _remove_tsv_locks([self.get_bids_root_path(), os.path.dirname(self.get_eeg_path())])
+
+        # the index of the files is persisted by the Converter, the flushed files are kept up to date.
+        with timing.stage('index'):
+            _get_index(self.get_bids_root_path()).update(paths)
+
+        if journal:
+            for step in applied:
+                journal.set_step_done(step)
+
+
+    @staticmethod
+    def is_direct(data):
+        return data.get('sidecar_mode', 'direct') == 'direct'
+
+    @classmethod
+    def sidecar_metadata(cls, data):
+        # the metadata to pass to write_raw_bids in the direct sidecar mode, None otherwise.
+        if not cls.is_direct(data):
+            return None
+
+        return {
+            'readme': False,
+            'dataset_description': cls.dataset_description_fields(data),
+            'participants': cls.participant_fields(data),
+            'participants_json': cls.participants_json_fields(),
+            'sidecar': cls.sidecar_fields(data),
+        }
+
+    @staticmethod
+    def app_version():
+        # EEG2BIDS Wizard version
+        try:
+            with open(os.path.join(os.path.dirname(__file__), '../../package.json'), "r") as fp:
+                file_data = json.load(fp)
+                return file_data['version']
+        except IOError as e:
+            print(e)
+            print("Could not read package.json file")
+            return 'unknown'
+
+    @classmethod
+    def dataset_description_fields(cls, data):
+        return {
+            'PreparedBy': data['preparedBy'],
+            'Eeg2bidsVersion': cls.app_version(),
+            'Name': data['participantID'] + '_' + data['session'],
+        }
+
+    @staticmethod
+    def participant_fields(data):
+        return {
+            'age': data['age'],
+            'sex': data['sex'],
+            'hand': data['hand'],
+            'site': data['site_id'],
+            'subproject': data['sub_project_id'],
+            'project': data['project_id'],
+        }
+
+    @staticmethod
+    def participants_json_fields():
+        return {
+            'site': {
+                'Description': "Site of the testing"
+            },
+            'subproject': {
+                'Description': "Subproject of the participant"
+            },
+            'project': {
+                'Description': "Project of the participant"
+            }
+        }
+
+    @staticmethod
+    def sidecar_fields(data):
+        fields = {"RecordingType": data['recording_type']}
 
-        self.modify_dataset_description_json()
-        self.modify_participants_tsv()
-        self.modify_participants_json()
-        self.clean_dataset_files()
-        self.copy_event_files()
-        self.copy_annotation_files()
-        self.modify_eeg_json()
+        if (data["modality"] == 'ieeg'):
+            referenceField = 'iEEGReference'
+        else:
+            referenceField = 'EGGReference'
 
+        fields[referenceField] = " ".join(data['reference'].split())
+
+        if 'metadata' in data['bidsMetadata'] and 'ignored_keys' in data['bidsMetadata']:
+            for key in data['bidsMetadata']['metadata']:
+                if key not in data['bidsMetadata']['ignored_keys']:
+                    fields[key] = data['bidsMetadata']['metadata'][key]
+
+        return fields
 
     def get_bids_root_path(self):
         return os.path.join(
@@ -48,10 +178,10 @@ class Modifier:
     def clean_dataset_files(self):
         if len(self.data['edfData']['files']) > 0:
             # for multiple run recording, clean the duplicate _channels.tsv
-            channels_files = [f for f in os.listdir(self.get_eeg_path()) if f.endswith('_channels.tsv')]
+            channels_files = [f for f in self.dataset.listdir(self.get_eeg_path()) if f.endswith('_channels.tsv')]
             for i in range(1, len(channels_files)):
                 filename = os.path.join(self.get_eeg_path(), channels_files[i])
-                os.remove(filename)
+                self.dataset.remove(filename)
 
             # remove the run suffix in the file names
             fileOrig = os.path.join(self.get_eeg_path(), channels_files[0])
@@ -59,42 +189,26 @@ class Modifier:
                 self.get_eeg_path(),
                 re.sub(r"_run-[0-9]+", '', channels_files[0])
             )
-            os.rename(fileOrig, fileDest)
+            self.dataset.rename(fileOrig, fileDest)
 
         # remove the mne citations README
         filename = os.path.join(self.get_bids_root_path(), 'README')
-        try:
-            os.remove(filename)
-        except FileNotFoundError:
+        if self.dataset.exists(filename):
+            self.dataset.remove(filename)
+        else:
             print("No README file found")
 
 
     def modify_dataset_description_json(self):
-        # EEG2BIDS Wizard version
-        appVersion = 'unknown'
-        
-        try:
-            with open(os.path.join(os.path.dirname(__file__), '../../package.json'), "r") as fp:
-                file_data = json.load(fp)
-                appVersion = file_data['version']
-        except IOError as e:
-            print(e)
-            print("Could not read package.json file")
-
         file_path = os.path.join(
             self.get_bids_root_path(),
             'dataset_description.json'
         )
 
         try:
-            with open(file_path, "r") as fp:
-                file_data = json.load(fp)
-                file_data['PreparedBy'] = self.data['preparedBy']
-                file_data['Eeg2bidsVersion'] = appVersion
-                file_data['Name'] = self.data['participantID'] + '_' + self.data['session']
-
-                with open(file_path, "w") as fp:
-                    json.dump(file_data, fp, indent=4)
+            file_data = self.dataset.read_json(file_path)
+            file_data.update(self.dataset_description_fields(self.data))
+            self.dataset.write_json(file_path, file_data)
 
         except IOError:
             print("Could not read or write dataset_description.json file")
@@ -106,51 +220,10 @@ class Modifier:
             'participants.tsv'
         )
 
-        with open(file_path, mode='r') as tsv_file:
-            tsv_file.readline()
-            reader = csv.reader(tsv_file, delimiter='\t')
-            rows = list(reader)
-            tsv_file.close()
-
-        # participants.tsv data collected:
-        output = []
-        for line in rows:
-            try:
-                participant_id, age, sex, hand = line
-                output.append(
-                    [
-                        participant_id,
-                        self.data['age'],
-                        self.data['sex'],
-                        self.data['hand'],
-                        self.data['site_id'],
-                        self.data['sub_project_id'],
-                        self.data['project_id']
-                    ]
-                )
-            except ValueError:
-                try:
-                    participant_id, age, sex, hand, site, project, subproject = line
-                    output.append(
-                        [
-                            participant_id,
-                            self.data['age'],
-                            self.data['sex'],
-                            self.data['hand'],
-                            self.data['site_id'],
-                            self.data['sub_project_id'],
-                            self.data['project_id']
-                        ]
-                    )
-                except ValueError:
-                    print('error: ValueError')
-
-        with open(file_path, mode='w', newline='') as tsv_file:
-            headers = ['participant_id', 'age', 'sex', 'hand', 'site', 'subproject', 'project']
-            writer = csv.writer(tsv_file, delimiter='\t')
-            writer.writerow(headers)
-            writer.writerows(output)
-            tsv_file.close()
+        # only the row of the participant is updated, the other participants of a shared root are kept.
+        row = {'participant_id': 'sub-' + self.data['participantID']}
+        row.update(self.participant_fields(self.data))
+        self.dataset.update_tsv_row(file_path, 'participant_id', row)
 
 
     def modify_participants_json(self):
@@ -159,23 +232,9 @@ class Modifier:
             'participants.json'
         )
 
-        with open(file_path, mode='r+', encoding='utf-8') as json_file:
-            json_data = json.load(json_file)
-            user_data = {
-                'site': {
-                    'Description': "Site of the testing"
-                },
-                'subproject': {
-                    'Description': "Subproject of the participant"
-                },
-                'project': {
-                    'Description': "Project of the participant"
-                }
-            }
-            json_data.update(user_data)
-            json_file.seek(0)
-            json.dump(json_data, json_file, indent=4)
-            json_file.close()
+        json_data = self.dataset.read_json(file_path)
+        json_data.update(self.participants_json_fields())
+        self.dataset.write_json(file_path, json_data)
 
 
     def copy_annotation_files(self):
@@ -184,17 +243,14 @@ class Modifier:
             '.bidsignore'
         )
 
-        with open(file, mode='w', newline='') as bidsignore:
-            bidsignore.write('*_annotations.json\n')
-            bidsignore.write('*_annotations.tsv\n')
-            bidsignore.close()
+        self.dataset.write_text(file, '*_annotations.json\n*_annotations.tsv\n' + _INDEX_FNAME + '*\n.*.tsv.lock\n')
 
         for eegRun in self.data.get('eegRuns'):
             edf_file = eegRun['edfBIDSBasename']
             filename = os.path.join(self.get_eeg_path(), edf_file + '_annotations')
 
             if eegRun['annotationsTSV']:
-                shutil.copyfile(
+                self.dataset.copy_file(
                     eegRun['annotationsTSV'],
                     os.path.join(self.get_eeg_path(), filename + '.tsv')
                 )
@@ -206,119 +262,46 @@ class Modifier:
                 try:
                     with open(eegRun['annotationsJSON'], "r") as fp:
                         file_data = json.load(fp)
-                        file_data["IntendedFor"] = os.path.join(self.get_eeg_path(relative=True), edf_file + '.edf')
-                        # In windows env path will contain \\
-                        file_data["IntendedFor"] = file_data["IntendedFor"].replace('\\', '/')
+                    file_data["IntendedFor"] = os.path.join(self.get_eeg_path(relative=True), edf_file + '.edf')
+                    # In windows env path will contain \\
+                    file_data["IntendedFor"] = file_data["IntendedFor"].replace('\\', '/')
 
-                        with open(eegRun['annotationsJSON'], "w") as fp:
-                            json.dump(file_data, fp, indent=4)
+                    self.dataset.write_json(os.path.join(self.get_eeg_path(), filename + '.json'), file_data)
                 except IOError as e:
                     print(e)
-                    print("Could not read or write " + eegRun['annotationsJSON'])
-
-                shutil.copyfile(
-                    eegRun['annotationsJSON'],
-                    os.path.join(self.get_eeg_path(), filename + '.json')
-                )
+                    print("Could not read " + eegRun['annotationsJSON'])
 
 
     def copy_event_files(self):
         for eegRun in self.data.get('eegRuns'):
-            edf_file = eegRun['edfBIDSBasename']
-            filename = os.path.join(self.get_eeg_path(), edf_file + '_annotations')
-
             if eegRun['eventFile']:
-                # events.tsv data collected:
-                output = []
-
-                # Open user supplied events.tsv and grab data.
-                with open(eegRun['eventFile'], mode='r', newline='') as tsv_file:
-                    tsv_file.readline()
-                    reader = csv.reader(tsv_file, delimiter='\t')
-                    rows = list(reader)
-                    tsv_file.close()
-
-                for line in rows:
-                    try:
-                        onset, duration, trial_type, value, sample = line
-                        output.append([onset, duration, trial_type, value, sample])
-                    except ValueError:
-                        try:
-                            onset, duration, trial_type = line
-                            output.append([onset, duration, trial_type, 'n/a', 'n/a'])
-                        except ValueError:
-                            print('error: ValueError')
-
-                path_event_files = ''
-                # We search for the events.tsv file.
-                for path, dirs, files in os.walk(self.get_eeg_path()):
-                    for filename in files:
-                        temp = os.path.join(path, filename)
-                        if temp.endswith(eegRun['edfBIDSBasename'] + '_events.tsv'):
-                            path_event_files = temp
-
-                # We now open BIDS events.tsv file if it exists
-                if path_event_files:
-                    try:
-                        with open(path_event_files, mode='r', newline='') as tsv_file:
-                            tsv_file.readline()
-                            reader = csv.reader(tsv_file, delimiter='\t')
-                            rows = list(reader)
-                            tsv_file.close()
-
-                        for line in rows:
-                            try:
-                                onset, duration, trial_type, value, sample = line
-                                output.append([onset, duration, trial_type, value, sample])
-                            except ValueError:
-                                try:
-                                    onset, duration, trial_type = line
-                                    output.append([onset, duration, trial_type, 'n/a', 'n/a'])
-                                except ValueError:
-                                    print('error: ValueError')
-                    except:
-                        print('No events.tsv found in the BIDS folder.')
-                else:
-                    path_event_files = self.get_eeg_path() + '/' + eegRun['edfBIDSBasename'] + '_events.tsv'
+                # the events.tsv file written by mne_bids, if any.
+                path_event_files = os.path.join(self.get_eeg_path(), eegRun['edfBIDSBasename'] + '_events.tsv')
 
-                # output is an array of arrays
-                # sort by first element in array
-                output.sort(key=lambda x: float(x[0]))
+                sources = [(eegRun['eventFile'], eegRun.get('eventOnsetFormat', 'seconds'))]
+                if self.dataset.exists(path_event_files):
+                    sources.append(path_event_files)
+                else:
+                    print('No events.tsv found in the BIDS folder.')
 
-                # overwrite BIDS events.tsv with collected data.
-                with open(path_event_files, mode='a+', newline='') as tsv_file:
-                    headers = ['onset', 'duration', 'trial_type', 'value', 'sample']
-                    writer = csv.writer(tsv_file, delimiter='\t')
-                    writer.writerow(headers)
-                    writer.writerows(output)
-                    tsv_file.close()
+                # merge the user supplied events with the BIDS ones, sorted by onset,
+                # the BIDS events.tsv is replaced when the dataset is flushed.
+                # the missing samples are computed from the sampling frequency of the recording.
+                merged_path = path_event_files + '.merged'
+                Events(recording=Events.recording_info(eegRun['edfFile'])).merge(sources, merged_path)
+                self.dataset.rename(merged_path, path_event_files)
 
 
     def modify_eeg_json(self):
-        eeg_jsons = [f for f in os.listdir(self.get_eeg_path()) if f.endswith('eeg.json')]
+        eeg_jsons = [f for f in self.dataset.listdir(self.get_eeg_path()) if f.endswith('eeg.json')]
 
         for eeg_json in eeg_jsons:
             file_path = os.path.join(self.get_eeg_path(), eeg_json)
 
             try:
-                with open(file_path, "r") as fp:
-                    file_data = json.load(fp)
-                    file_data["RecordingType"] = self.data['recording_type']
-
-                    if (self.data["modality"] == 'ieeg'):
-                        referenceField = 'iEEGReference'
-                    else:
-                        referenceField = 'EGGReference'
-
-                    file_data[referenceField] = " ".join(self.data['reference'].split())
-
-                    if 'metadata' in self.data['bidsMetadata'] and 'ignored_keys' in self.data['bidsMetadata']:
-                        for key in self.data['bidsMetadata']['metadata']:
-                            if key not in self.data['bidsMetadata']['ignored_keys']:
-                                file_data[key] = self.data['bidsMetadata']['metadata'][key]
-
-                    with open(file_path, "w") as fp:
-                        json.dump(file_data, fp, indent=4)
+                file_data = self.dataset.read_json(file_path)
+                file_data.update(self.sidecar_fields(self.data))
+                self.dataset.write_json(file_path, file_data)
 
             except IOError as e:
                 print(e)
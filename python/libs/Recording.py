@@ -0,0 +1,330 @@
+import re
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+from python.libs import EDF, iEEG
+
+
+# start_date - the start of a recording, from its EDF header.
+def start_date(meas_info):
+    # EDF years are 2 digits, 85-99 are 1985-1999.
+    year = meas_info['year'] + (2000 if meas_info['year'] < 85 else 1900)
+    return datetime.datetime(year, meas_info['month'], meas_info['day'], meas_info['hour'],
+                             meas_info['minute'], meas_info['second'])
+
+
+# HeaderScan - reads the headers of EDF files in a thread pool.
+#
+# Reading a header costs a few small reads, which are dominated by the latency of the storage
+# (e.g. a network share), so the files are read concurrently and each header is made available
+# as soon as it is read.
+class HeaderScan:
+    def __init__(self, files, max_workers=None, executor=None):
+        print('- HeaderScan: init started.')
+        # files = [{path, name}]
+        self.files = files
+        self.max_workers = max_workers or min(16, len(files) or 1)
+        self.executor = executor
+        self.headers = [None] * len(files)
+
+    @staticmethod
+    def read_header(index, file):
+        metadata = iEEG.Anonymize(file['path']).get_header()
+        return {
+            'index': index,
+            'file': file,
+            'metadata': metadata,
+            'date': str(start_date(metadata[0]))
+        }
+
+    def iter_results(self):
+        """Yield the headers in the order they are read."""
+        executor = self.executor or ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            futures = [executor.submit(self.read_header, i, file) for i, file in enumerate(self.files)]
+            for future in as_completed(futures):
+                header = future.result()
+                self.headers[header['index']] = header
+                yield header
+        finally:
+            if executor is not self.executor:
+                executor.shutdown(wait=False)
+
+    def run(self):
+        for _ in self.iter_results():
+            pass
+        return self.headers
+
+
+# check_consistency - checks that EDF headers are the splits of a single recording.
+#
+# The channel sets and sampling frequencies are compared as (files x channels) matrices,
+# then the contiguity of the files is analyzed (see Continuity).
+# Returns the errors, the warnings and the gaps between consecutive files in seconds.
+def check_consistency(headers, tolerance=1.):
+    result = {'errors': [], 'warnings': [], 'gaps': []}
+    if not headers:
+        return result
+
+    ch_names = sorted(set().union(*[header['metadata'][1]['ch_names'] for header in headers]))
+    columns = {ch_name: i for i, ch_name in enumerate(ch_names)}
+
+    # sampling frequency per file and channel, nan where the file lacks the channel.
+    sfreqs = np.full((len(headers), len(ch_names)), np.nan)
+    for i, header in enumerate(headers):
+        meas_info, chan_info = header['metadata']
+        indices = [columns[ch_name] for ch_name in chan_info['ch_names']]
+        sfreqs[i, indices] = np.asarray(chan_info['n_samps'], dtype=float) / meas_info['record_length']
+
+    present = ~np.isnan(sfreqs)
+    if np.any(present != present[0]):
+        result['errors'].append('The files selected contain more than one recording.')
+        return result
+
+    if np.any(np.nanmax(sfreqs, axis=0) != np.nanmin(sfreqs, axis=0)):
+        result['errors'].append('The files selected have different sampling frequencies.')
+        return result
+
+    continuity = Continuity(headers, tolerance)
+    result['gaps'] = [pair['gap'] for pair in continuity.pairs]
+    result['warnings'] = [pair['message'] for pair in continuity.discontinuities()]
+
+    return result
+
+
+# Continuity - the gaps and overlaps between the splits of a recording.
+#
+# The headers are sorted by start time; for each consecutive pair, the gap is the start of the
+# second file minus the end (start + n_records * record_length) of the first one, negative
+# for an overlap. EDF start times have a one second resolution, hence the tolerance.
+class Continuity:
+    def __init__(self, headers, tolerance=1.):
+        self.tolerance = tolerance
+        starts = np.array([np.datetime64(start_date(h['metadata'][0]), 's') for h in headers])
+        order = np.argsort(starts, kind='stable')
+        self.headers = [headers[i] for i in order]
+        self.starts = starts[order]
+        self.durations = np.array(
+            [h['metadata'][0]['n_records'] * h['metadata'][0]['record_length'] for h in self.headers],
+            dtype=float
+        )
+
+        gaps = (self.starts[1:] - self.starts[:-1]).astype(float) - self.durations[:-1]
+        self.pairs = []
+        for i, gap in enumerate(gaps.tolist()):
+            first = self.headers[i]['file']['name']
+            second = self.headers[i + 1]['file']['name']
+            if gap < -tolerance:
+                status = 'overlap'
+                message = '{} overlaps {} by {:g} seconds.'.format(second, first, -gap)
+            elif gap > tolerance:
+                status = 'gap'
+                message = 'There is a gap of {:g} seconds between {} and {}.'.format(gap, first, second)
+            else:
+                status = 'contiguous'
+                message = ''
+            self.pairs.append({
+                'first': first,
+                'second': second,
+                'gap': gap,
+                'status': status,
+                'message': message
+            })
+
+    def discontinuities(self):
+        return [pair for pair in self.pairs if pair['status'] != 'contiguous']
+
+    def is_continuous(self):
+        return not self.discontinuities()
+
+    def concatenate(self):
+        """The splits as a single VirtualRecording, raises ValueError if they cannot be joined."""
+        return VirtualRecording(self)
+
+
+# VirtualRecording - split EDF files seen as one recording, without reading their data.
+#
+# The splits must share the same data record layout (channels, samples per record, record
+# length, sample size and calibration), so the data sections can be joined as they are:
+# each segment is a byte range of a split. Overlapping splits cannot be joined. The segments
+# of a continuous recording follow each other, the onset of each one is the duration of the
+# previous ones; the header start times, with a one second resolution, only give the onsets
+# of the segments of an EDF+D output, which keep the gaps.
+class VirtualRecording:
+    layout_meas_fields = ['record_length', 'data_size', 'nchan']
+    layout_chan_fields = ['ch_names', 'n_samps', 'physical_min', 'physical_max', 'digital_min', 'digital_max',
+                          'units']
+
+    def __init__(self, continuity):
+        overlaps = [pair for pair in continuity.pairs if pair['status'] == 'overlap']
+        if overlaps:
+            raise ValueError(overlaps[0]['message'])
+
+        headers = continuity.headers
+        meas_info, chan_info = headers[0]['metadata']
+        for header in headers[1:]:
+            other_meas, other_chan = header['metadata']
+            for field in self.layout_meas_fields:
+                if other_meas[field] != meas_info[field]:
+                    raise ValueError(header['file']['name'] + ' has a different ' + field + '.')
+            for field in self.layout_chan_fields:
+                if not np.array_equal(np.asarray(other_chan[field]), np.asarray(chan_info[field])):
+                    raise ValueError(header['file']['name'] + ' has a different ' + field + '.')
+
+        self.record_length = meas_info['record_length']
+        self.record_size = int(np.sum(chan_info['n_samps'])) * meas_info['data_size']
+        self.start = start_date(meas_info)
+
+        self.continuous = continuity.is_continuous()
+
+        # (path, data offset, number of records, onset of the first record in seconds)
+        self.segments = []
+        onset = 0.
+        for header, start in zip(headers, continuity.starts):
+            split_meas = header['metadata'][0]
+            if not self.continuous:
+                onset = float((start - continuity.starts[0]) / np.timedelta64(1, 's'))
+            self.segments.append((
+                header['file']['path'],
+                split_meas['data_offset'],
+                int(split_meas['n_records']),
+                onset
+            ))
+            onset += int(split_meas['n_records']) * self.record_length
+
+        self.n_records = sum(segment[2] for segment in self.segments)
+        self.meas_info = dict(meas_info, n_records=self.n_records)
+        self.chan_info = chan_info
+
+    def record_onsets(self):
+        """The onset of every data record in seconds, from the start of the recording."""
+        return np.concatenate([
+            onset + np.arange(n_records) * self.record_length
+            for path, data_offset, n_records, onset in self.segments
+        ])
+
+    def duration(self):
+        path, data_offset, n_records, onset = self.segments[-1]
+        return onset + n_records * self.record_length
+
+    def annotations_channel(self):
+        for i, ch_name in enumerate(self.chan_info['ch_names']):
+            if ch_name in ('EDF Annotations', 'BDF Annotations'):
+                return i
+        return None
+
+    def write_edf(self, fname, block_size=16 << 20):
+        """Write the recording as one EDF(+) file, streaming the data sections of the splits.
+
+        The samples are never decoded: the data records are copied as they are, in blocks of
+        block_size bytes. Only the time-keeping of EDF+ data records is rewritten, i.e. the
+        onsets of the TALs (time-stamped annotations lists) of the annotations channel, which
+        are relative to the start of their split. Splits with gaps between them are written
+        as EDF+D, with an annotations channel added to plain EDF splits.
+        """
+        data_size = self.meas_info['data_size']
+        annotations = self.annotations_channel()
+
+        add_annotations = annotations is None and not self.continuous
+        shift_annotations = annotations is not None and len(self.segments) > 1
+        if add_annotations:
+            slot = (0, 30 * data_size)
+        elif annotations is not None:
+            start = int(np.sum(self.chan_info['n_samps'][:annotations])) * data_size
+            slot = (start, start + int(self.chan_info['n_samps'][annotations]) * data_size)
+
+        records_per_block = max(1, block_size // self.record_size)
+
+        with open(fname, 'wb') as fid:
+            fid.write(self.edf_header(add_annotations))
+
+            for path, data_offset, n_records, onset in self.segments:
+                with open(path, 'rb') as split:
+                    split.seek(data_offset)
+
+                    for first in range(0, n_records, records_per_block):
+                        count = min(records_per_block, n_records - first)
+                        buffer = split.read(count * self.record_size)
+                        if len(buffer) != count * self.record_size:
+                            raise ValueError(path + ' is shorter than its header states.')
+
+                        if not add_annotations and not shift_annotations:
+                            fid.write(buffer)
+                            continue
+
+                        records = np.frombuffer(buffer, dtype=np.uint8).reshape(count, self.record_size)
+                        onsets = onset + (first + np.arange(count)) * self.record_length
+
+                        if add_annotations:
+                            out = np.empty((count, self.record_size + slot[1]), dtype=np.uint8)
+                            out[:, :self.record_size] = records
+                            tals = b''.join(self.tal(record_onset).ljust(slot[1], b'\x00') for record_onset in onsets)
+                            out[:, self.record_size:] = np.frombuffer(tals, dtype=np.uint8).reshape(count, slot[1])
+                        else:
+                            out = records.copy()
+                            for i in range(count):
+                                tals = self.shift_tals(out[i, slot[0]:slot[1]].tobytes(), onset)
+                                out[i, slot[0]:slot[1]] = np.frombuffer(tals, dtype=np.uint8)
+
+                        fid.write(out.tobytes())
+
+    def edf_header(self, add_annotations=False):
+        # the header of the first split, with the fields of the joined recording.
+        path, data_offset, n_records, onset = self.segments[0]
+        with open(path, 'rb') as split:
+            header = split.read(data_offset)
+
+        nchan = self.meas_info['nchan']
+        fixed, channels = bytearray(header[:256]), header[256:]
+        bdf = self.meas_info['data_size'] == 3
+
+        if add_annotations:
+            # the per channel fields are stored field by field, for all the channels.
+            fields = [
+                (16, 'BDF Annotations' if bdf else 'EDF Annotations'), (80, ''), (8, ''), (8, '-1'), (8, '1'),
+                (8, '-8388608' if bdf else '-32768'), (8, '8388607' if bdf else '32767'), (80, ''), (8, '30'),
+                (32, '')
+            ]
+            new_channels = b''
+            offset = 0
+            for width, value in fields:
+                new_channels += channels[offset:offset + width * nchan] + EDF.padtrim(value, width).encode('ascii')
+                offset += width * nchan
+            channels = new_channels
+            nchan += 1
+            fixed[184:192] = EDF.padtrim(str(256 * (nchan + 1)), 8).encode('ascii')
+            fixed[252:256] = EDF.padtrim(str(nchan), 4).encode('ascii')
+
+        if add_annotations or self.annotations_channel() is not None:
+            subtype = ('BDF' if bdf else 'EDF') + ('+C' if self.continuous else '+D')
+            fixed[192:236] = EDF.padtrim(subtype, 44).encode('ascii')
+
+        fixed[236:244] = EDF.padtrim(str(self.n_records), 8).encode('ascii')
+
+        return bytes(fixed) + channels
+
+    @staticmethod
+    def format_onset(onset):
+        return ('+' if onset >= 0 else '-') + np.format_float_positional(abs(onset), trim='-')
+
+    @classmethod
+    def tal(cls, onset):
+        # the time-keeping TAL of a data record.
+        return cls.format_onset(onset).encode('ascii') + b'\x14\x14\x00'
+
+    @classmethod
+    def shift_tals(cls, slot, offset):
+        tals = []
+        for tal in slot.split(b'\x00'):
+            if not tal:
+                continue
+            match = re.match(rb'[+-][0-9.]+', tal)
+            if match:
+                tal = cls.format_onset(float(match.group()) + offset).encode('ascii') + tal[match.end():]
+            tals.append(tal + b'\x00')
+
+        shifted = b''.join(tals)
+        if len(shifted) > len(slot):
+            raise ValueError('The annotations of a data record do not fit once shifted.')
+        return shifted.ljust(len(slot), b'\x00')
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak RSS is then not reported.
+    resource = None
+
+
+def io_counters():
+    """Bytes read and written by the process so far, None where the platform does not tell."""
+    try:
+        with open('/proc/self/io', 'r') as fp:
+            counters = dict(line.split(':', 1) for line in fp if ':' in line)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def peak_rss():
+    """Peak resident set size of the process so far, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Timing - per-stage timing report of a conversion.
+#
+# Each stage records its wall and CPU time, the bytes read and written and the peak RSS of the
+# process when it ends. Stages nest: a stage opened inside another one is one of its stages.
+# The counters are those of the whole process, so they also include the work of the other
+# threads of the service running meanwhile.
+#
+# The report is saved as JSON in the output directory, where the stages timed later on the
+# same directory (validation, tar) are added to it. Setting EEG2BIDS_PROFILE to cprofile or
+# pyinstrument also dumps a profile of the profiled stages next to it.
+class Timing:
+    filename = '.eeg2bids_timing.json'
+    profile_filename = '.eeg2bids_profile'
+    # the report and the profiles are internal to EEG2BIDS, like the journal.
+    internal_files = (filename, profile_filename + '.prof', profile_filename + '.html')
+
+    def __init__(self, profiler=None):
+        self.stages = []
+        self.stack = []
+        self.profiler = profiler if profiler is not None else os.environ.get('EEG2BIDS_PROFILE', '').lower()
+
+    @staticmethod
+    def counters():
+        return {
+            'wall': time.perf_counter(),
+            'cpu': time.process_time(),
+            'io': io_counters(),
+        }
+
+    @contextmanager
+    def stage(self, name):
+        record = {'name': name}
+        (self.stack[-1].setdefault('stages', []) if self.stack else self.stages).append(record)
+        self.stack.append(record)
+        start = self.counters()
+        try:
+            yield record
+        finally:
+            end = self.counters()
+            self.stack.pop()
+            record['wall'] = round(end['wall'] - start['wall'], 6)
+            record['cpu'] = round(end['cpu'] - start['cpu'], 6)
+            if start['io'] and end['io']:
+                record['read_bytes'] = end['io'][0] - start['io'][0]
+                record['written_bytes'] = end['io'][1] - start['io'][1]
+            record['peak_rss'] = peak_rss()
+            # the sub-stages come last, for readability.
+            if 'stages' in record:
+                record['stages'] = record.pop('stages')
+
+    @staticmethod
+    def has_pyinstrument():
+        try:
+            import pyinstrument
+            return True
+        except ImportError:
+            return False
+
+    @contextmanager
+    def profile(self, directory):
+        """Profile the block with EEG2BIDS_PROFILE, the profile is dumped in directory."""
+        if self.profiler == 'cprofile':
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(directory, self.profile_filename + '.prof'))
+        elif self.profiler == 'pyinstrument' and not self.has_pyinstrument():
+            print('- Timing: pyinstrument is not installed, the conversion is not profiled.')
+            yield
+        elif self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(os.path.join(directory, self.profile_filename + '.html'), 'w') as fp:
+                    fp.write(profiler.output_html())
+        else:
+            yield
+
+    def report(self):
+        return {
+            'stages': self.stages,
+            'wall': round(sum(stage.get('wall', 0) for stage in self.stages), 6),
+            'peak_rss': peak_rss(),
+        }
+
+    def save(self, directory):
+        """Add the stages to the timing report of directory, returns the whole report."""
+        path = os.path.join(directory, self.filename)
+        try:
+            with open(path, 'r') as fp:
+                stages = json.load(fp)['stages']
+        except (OSError, ValueError, KeyError):
+            stages = []
+
+        # a stage timed again (e.g. a second validation) replaces its previous timing.
+        names = [stage['name'] for stage in self.stages]
+        report = self.report()
+        report['stages'] = [stage for stage in stages if stage['name'] not in names] + self.stages
+        report['wall'] = round(sum(stage.get('wall', 0) for stage in report['stages']), 6)
+
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'w') as fp:
+                json.dump(report, fp, indent=4)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print('Could not write the timing report: ' + str(e))
+
+        return report
@@ -2,6 +2,107 @@
 import re
 import os
 import json
+from functools import lru_cache
+
+
+RULE_FILES = {
+    'top_level': 'top_level_rules.json',
+    'associated_data': 'associated_data_rules.json',
+    'session_level': 'session_level_rules.json',
+    'subject_level': 'subject_level_rules.json',
+    'phenotypic': 'phenotypic_rules.json',
+    'file_level': 'file_level_rules.json',
+}
+
+
+@lru_cache(maxsize=None)
+def _read_regular_expressions(file_name):
+    """Read and expand the regular expressions of a rule file once."""
+    regexps = []
+
+    with open(file_name, 'r') as fin:
+        rules = json.load(fin)
+
+    for key in list(rules.keys()):
+        rule = rules[key]
+
+        regexp = rule["regexp"]
+
+        if "tokens" in rule:
+            tokens = rule["tokens"]
+
+            for token in list(tokens):
+                regexp = regexp.replace(token, "|".join(tokens[token]))
+
+        regexps.append(regexp)
+
+    return tuple(regexps)
+
+
+def _rename_groups(regexp, prefix):
+    """Turn numbered groups and backreferences into uniquely named ones.
+
+    Every rule numbers its groups from 1, so rules can only be joined in a
+    single alternation once their groups (and the backreferences to them)
+    no longer collide.
+    """
+    out = []
+    group = 0
+    in_class = False
+    i = 0
+    while i < len(regexp):
+        char = regexp[i]
+        if char == '\\':
+            escaped = regexp[i + 1]
+            if escaped.isdigit() and not in_class:
+                out.append('(?P=%s%s)' % (prefix, escaped))
+            else:
+                out.append(char + escaped)
+            i += 2
+            continue
+
+        if in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            # a negation and a closing bracket right after the opening one
+            # are part of the class
+            start = i
+            i += 1
+            if regexp[i:i + 1] == '^':
+                i += 1
+            if regexp[i:i + 1] == ']':
+                i += 1
+            out.append(regexp[start:i])
+            continue
+        elif char == '(' and regexp[i + 1:i + 2] != '?':
+            group += 1
+            out.append('(?P<%s%d>' % (prefix, group))
+            i += 1
+            continue
+
+        out.append(char)
+        i += 1
+
+    return ''.join(out)
+
+
+@lru_cache(maxsize=None)
+def _compile_family(file_name):
+    """Compile all rules of a family into a single alternation."""
+    regexps = _read_regular_expressions(file_name)
+    return re.compile('|'.join(
+        '(?:%s)' % _rename_groups(regexp, 'r%d_' % i)
+        for i, regexp in enumerate(regexps)
+    ))
+
+
+@lru_cache(maxsize=None)
+def _compile_rules(file_name):
+    """Compile each rule of a family on its own."""
+    return tuple(re.compile(x)
+                 for x in _read_regular_expressions(file_name))
 
 
 class BIDSValidator():
@@ -63,104 +164,75 @@ class BIDSValidator():
         True
 
         """
-        conditions = []
+        # most files of a dataset live in datatype folders, check those first
+        return (self.is_file(path) or
+                self.is_session_level(path) or
+                self.is_top_level(path) or
+                self.is_subject_level(path) or
+                self.is_phenotypic(path) or
+                self.is_associated_data(path))
 
-        conditions.append(self.is_top_level(path))
-        conditions.append(self.is_associated_data(path))
-        conditions.append(self.is_session_level(path))
-        conditions.append(self.is_subject_level(path))
-        conditions.append(self.is_phenotypic(path))
-        conditions.append(self.is_file(path))
+    def validate_paths(self, paths):
+        """Check a batch of file paths.
 
-        return (any(conditions))
+        Parameters
+        ----------
+        paths : iterable of str
+            Paths of the files to be checked, relative to the root of a BIDS
+            dataset.
 
-    def is_top_level(self, path):
-        """Check if the file has appropriate name for a top-level file."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'top_level_rules.json')
+        Returns
+        -------
+        results : list of bool
+            Whether each path adheres to BIDS, in the order of ``paths``.
 
-        conditions = [False if re.compile(x).search(path) is None else True for
-                      x in regexps]
+        """
+        return [self.is_bids(path) for path in paths]
 
-        return (any(conditions))
+    def is_top_level(self, path):
+        """Check if the file has appropriate name for a top-level file."""
+        return self._search('top_level', path)
 
     def is_associated_data(self, path):
         """Check if file is appropriate associated data."""
         if not self.index_associated:
             return False
 
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'associated_data_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return any(conditions)
+        return self._search('associated_data', path)
 
     def is_session_level(self, path):
         """Check if the file has appropriate name for a session level."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'session_level_rules.json')
-
-        conditions = [self.conditional_match(x, path) for x in regexps]
+        regexps = _compile_rules(self.dir_rules +
+                                 RULE_FILES['session_level'])
 
-        return (any(conditions))
+        return any(self.conditional_match(x, path) for x in regexps)
 
     def is_subject_level(self, path):
         """Check if the file has appropriate name for a subject level."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'subject_level_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return (any(conditions))
+        return self._search('subject_level', path)
 
     def is_phenotypic(self, path):
         """Check if file is phenotypic data."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'phenotypic_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
-
-        return (any(conditions))
+        return self._search('phenotypic', path)
 
     def is_file(self, path):
         """Check if file is phenotypic data."""
-        regexps = self.get_regular_expressions(self.dir_rules +
-                                               'file_level_rules.json')
-
-        conditions = [(re.compile(x).search(path) is not None) for
-                      x in regexps]
+        return self._search('file_level', path)
 
-        return (any(conditions))
+    def _search(self, family, path):
+        """Search path with the compiled alternation of a rule family."""
+        regexp = _compile_family(self.dir_rules + RULE_FILES[family])
+        return regexp.search(path) is not None
 
     def get_regular_expressions(self, file_name):
         """Read regular expressions from a file."""
-        regexps = []
-
-        with open(file_name, 'r') as fin:
-            rules = json.load(fin)
-
-        for key in list(rules.keys()):
-            rule = rules[key]
-
-            regexp = rule["regexp"]
-
-            if "tokens" in rule:
-                tokens = rule["tokens"]
-
-                for token in list(tokens):
-                    regexp = regexp.replace(token, "|".join(tokens[token]))
-
-            regexps.append(regexp)
-
-        return regexps
+        return list(_read_regular_expressions(file_name))
 
     def conditional_match(self, expression, path):
         """Find conditional match."""
-        match = re.compile(expression).findall(path)
+        if isinstance(expression, str):
+            expression = re.compile(expression)
+        match = expression.findall(path)
         match = match[0] if len(match) >= 1 else False
         # adapted from JS code and JS does not support conditional groups
         if (match):
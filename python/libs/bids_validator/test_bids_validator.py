@@ -5,6 +5,7 @@ actual file contents.
 
 """
 import os
+import re
 
 import pytest
 import datalad.api
@@ -52,3 +53,54 @@ def test_is_bids(fname):
     """Test that is_bids returns true for each file in a valid BIDS dataset."""
     validator = BIDSValidator()
     assert validator.is_bids(fname)
+
+
+PATHS = [
+    ('/sub-01/anat/sub-01_rec-CSD_T1w.nii.gz', True),
+    ('/sub-01/anat/sub-01_acq-23_rec-CSD_T1w.exe', False),
+    ('home/username/my_dataset/participants.tsv', False),
+    ('/participants.tsv', True),
+    ('/sub-01/ses-01/ieeg/sub-01_ses-01_task-rest_run-1_ieeg.edf', True),
+    ('/sub-01/ses-01/ieeg/sub-01_ses-02_task-rest_ieeg.edf', False),
+    ('/sub-01/ses-01/sub-01_ses-01_scans.tsv', True),
+    ('/sub-01/ses-01/sub-01_scans.tsv', False),
+    ('/sub-01/ses-01/sub-02_ses-01_scans.tsv', False),
+    ('/sub-01/sub-01_sessions.tsv', True),
+    ('/code/convert.py', True),
+    ('/phenotype/measures.tsv', True),
+]
+
+
+def _is_bids_uncompiled(validator, path):
+    """Check a path the way is_bids did before rules were compiled once."""
+    def search(rules):
+        return any(re.compile(x).search(path) for x in
+                   validator.get_regular_expressions(validator.dir_rules +
+                                                     rules))
+
+    session_rules = validator.get_regular_expressions(
+        validator.dir_rules + 'session_level_rules.json')
+
+    return any([
+        search('top_level_rules.json'),
+        search('associated_data_rules.json'),
+        any(validator.conditional_match(x, path) for x in session_rules),
+        search('subject_level_rules.json'),
+        search('phenotypic_rules.json'),
+        search('file_level_rules.json'),
+    ])
+
+
+@pytest.mark.parametrize('fname, expected', PATHS)
+def test_compiled_rules_match_uncompiled(fname, expected):
+    """Test that the compiled rule families give the per-rule results."""
+    validator = BIDSValidator()
+    assert validator.is_bids(fname) is expected
+    assert _is_bids_uncompiled(validator, fname) is expected
+
+
+def test_validate_paths():
+    """Test that validate_paths checks a batch of paths in order."""
+    validator = BIDSValidator()
+    fnames = [fname for fname, _ in PATHS]
+    assert validator.validate_paths(fnames) == [exp for _, exp in PATHS]
@@ -1,7 +1,10 @@
 import os
+import glob
 import mne
 from python.libs import EDF
+from python.libs.Timing import Timing
 from mne_bids import write_raw_bids, BIDSPath
+from mne_bids._index import _get_index, _INDEX_FNAME
 
 
 class ReadError(PermissionError):
@@ -93,9 +96,20 @@ metadata = {
 class TarFile:
     def __init__(self, bids_directory):
         import tarfile
+        from python.libs.Journal import Journal
+        from python.libs.BIDS import ValidationCache
+        # the conversion journal, the validation cache, the timing report and the index of the
+        # files are internal to EEG2BIDS.
+        internal_files = (Journal.filename, Journal.temp_filename, ValidationCache.filename, _INDEX_FNAME,
+                          _INDEX_FNAME + '-journal') + Timing.internal_files
         output_filename = bids_directory + '.tar.gz'
         with tarfile.open(output_filename, "w:gz") as tar:
-            tar.add(bids_directory, arcname=os.path.basename(bids_directory))
+            tar.add(
+                bids_directory,
+                arcname=os.path.basename(bids_directory),
+                filter=lambda info: None if os.path.basename(info.name) in internal_files
+                or os.path.basename(info.name).endswith('.tsv.lock') else info
+            )
 
         #import platform
         #import subprocess
@@ -152,25 +166,76 @@ class Converter:
     # data = { file_path: '', bids_directory: '', read_only: false,
     # event_files: '', line_freq: '', site_id: '', project_id: '',
     # sub_project_id: '', session: '', subject_id: ''}
-    def __init__(self, data):
+    def __init__(self, data, journal=None, sidecar_metadata=None, timing=None):
         print('- Converter: init started.')
+        timing = timing or Timing()
         modality = 'seeg'
         if data['modality'] == 'eeg':
             modality = 'eeg'
 
-        for i, eegRun in enumerate(data['eegRuns']):
-            eegRun['edfBIDSBasename'] = self.to_bids(
-                eeg_run=eegRun,
-                ch_type=modality,
-                task=data['taskName'],
-                bids_directory=data['bids_directory'],
-                subject_id=data['participantID'],
-                session=data['session'],
-                run=((i + 1) if len(data['edfData']['files']) > 1 else None),
-                output_time=data['output_time'],
-                read_only=data['read_only'],
-                line_freq=data['line_freq']
-            )
+        # split recordings can be written as a single run, from a joined copy of the splits.
+        # only the conversion reads the copy: the run keeps the path of the first split, whose
+        # timing is the one of the recording, for the events copied by the Modifier.
+        concatenated = None
+        if data.get('concatenate_splits') and len(data['eegRuns']) > 1 and not data['read_only']:
+            with timing.stage('concatenate'):
+                concatenated = self.concatenate(data)
+
+        try:
+            for i, eegRun in enumerate(data['eegRuns']):
+                with timing.stage('run ' + str(i + 1)):
+                    eegRun['edfBIDSBasename'] = self.to_bids(
+                        eeg_run=dict(eegRun, edfFile=concatenated) if concatenated else eegRun,
+                        journal=journal,
+                        run_key=i,
+                        sidecar_metadata=sidecar_metadata,
+                        ch_type=modality,
+                        task=data['taskName'],
+                        bids_directory=data['bids_directory'],
+                        subject_id=data['participantID'],
+                        session=data['session'],
+                        run=((i + 1) if len(data['edfData']['files']) > 1 and not concatenated else None),
+                        output_time=data['output_time'],
+                        read_only=data['read_only'],
+                        line_freq=data['line_freq'],
+                        timing=timing
+                    )
+        finally:
+            if concatenated and os.path.isfile(concatenated):
+                os.remove(concatenated)
+
+    @staticmethod
+    def concatenate(data):
+        # joins the EDF splits of the runs in a single file, and replaces the runs by the one of the
+        # first split. returns the path of the joined file, None if the splits cannot be joined.
+        from python.libs import Recording
+
+        files = [{'path': eegRun['edfFile'], 'name': os.path.basename(eegRun['edfFile'])} for eegRun in data['eegRuns']]
+        try:
+            recording = Recording.Continuity(Recording.HeaderScan(files).run()).concatenate()
+        except ValueError as ex:
+            print('- Converter: the EDF files cannot be joined: ' + str(ex))
+            return None
+
+        # the events and annotations are relative to the start of their split, so only those
+        # of the first split of the recording can be kept.
+        first = recording.segments[0][0]
+        for eegRun in data['eegRuns']:
+            if eegRun['edfFile'] != first and (
+                    eegRun.get('eventFile') or eegRun.get('annotationsTSV') or eegRun.get('annotationsJSON')):
+                print('- Converter: the EDF files cannot be joined: only the first one can have events.')
+                return None
+
+        fname = os.path.join(data['bids_directory'], data['output_time'], '.concatenated_splits.edf')
+        try:
+            os.makedirs(os.path.dirname(fname), exist_ok=True)
+            recording.write_edf(fname)
+        except PermissionError as ex:
+            raise WriteError(ex)
+
+        eegRun = next(eegRun for eegRun in data['eegRuns'] if eegRun['edfFile'] == first)
+        data['eegRuns'] = [eegRun]
+        return fname
 
     @staticmethod
     def validate(path):
@@ -194,19 +259,31 @@ class Converter:
                 run=None,
                 ch_type='seeg',
                 read_only=False,
-                line_freq='n/a'):
+                line_freq='n/a',
+                journal=None,
+                run_key=None,
+                sidecar_metadata=None,
+                timing=None):
         file = eeg_run['edfFile']
+        timing = timing or Timing()
 
         if self.validate(file):
-            try:
-                reader = EDF.EDFReader(fname=file)
-            except PermissionError as ex:
-                raise ReadError(ex)
+            with timing.stage('edf_header'):
+                try:
+                    reader = EDF.EDFReader(fname=file)
+                except PermissionError as ex:
+                    raise ReadError(ex)
 
-            m_info, c_info = reader.open(fname=file)
+                m_info, c_info = reader.open(fname=file)
             self.set_m_info(m_info)
 
-            raw = mne.io.read_raw_edf(input_fname=file)
+            if journal and not read_only and journal.is_run_converted(run_key, file):
+                print('- Converter: run already converted, skipping.')
+                m_info['subject_id'] = subject_id
+                return journal.get_run(run_key)['basename']
+
+            with timing.stage('read_raw_edf'):
+                raw = mne.io.read_raw_edf(input_fname=file)
 
             if read_only:
                 return True
@@ -258,24 +335,50 @@ class Converter:
                 bids_basename = BIDSPath(subject=subject, task=task, root=bids_root, acquisition=ch_type, run=run)
                 bids_basename.update(session=session)
 
-                try:
-                    write_raw_bids(raw, bids_basename, overwrite=False, verbose=False)
+                # a resumed conversion overwrites whatever a failed attempt left behind for this run.
+                overwrite = bool(journal and journal.resumed)
+                if overwrite:
+                    session_path = os.path.join(bids_root, 'sub-' + subject, 'ses-' + session)
+                    for partial_copy in glob.glob(os.path.join(session_path, '*', bids_basename.basename + '_*.edf')):
+                        os.remove(partial_copy)
+
+                # the copy and each sidecar written by mne_bids are timed as sub-stages.
+                with timing.stage('write_raw_bids'):
+                    write_raw_bids(raw, bids_basename, overwrite=overwrite, sidecar_metadata=sidecar_metadata,
+                                   stage=timing.stage, verbose=False)
+
+                with timing.stage('header_patch'):
                     with open(bids_basename, 'r+b') as f:
                         f.seek(8)  # id_info field starts 8 bytes in
                         f.write(bytes("X X X X".ljust(80), 'ascii'))
-                except Exception as ex:
-                    print('Exception ex:')
-                    print(ex)
+
+                if journal:
+                    with timing.stage('journal'):
+                        journal.set_run_converted(run_key, file, bids_basename.basename, str(bids_basename.fpath))
+
+                # the files of the run (and the dataset files rewritten in place) are added to
+                # the persistent index of the output, with the hash of the copy when journaled.
+                with timing.stage('index'):
+                    copy_path = str(bids_basename.fpath)
+                    session_path = os.path.join(bids_root, 'sub-' + subject, 'ses-' + session)
+                    paths = glob.glob(os.path.join(os.path.dirname(copy_path), bids_basename.basename + '_*'))
+                    paths += [
+                        os.path.join(session_path, 'sub-%s_ses-%s_scans.tsv' % (subject, session)),
+                        os.path.join(bids_root, 'participants.tsv'),
+                        os.path.join(bids_root, 'participants.json'),
+                        os.path.join(bids_root, 'dataset_description.json'),
+                    ]
+                    hashes = {copy_path: journal.get_run(run_key)['copy']['sha256']} if journal else None
+                    _get_index(bids_root, persistent=True).update(paths, hashes)
 
                 print('finished')
 
                 return bids_basename.basename
 
+            # any other error fails the conversion: the run is not journaled as converted, so that a
+            # retry converts it again.
             except PermissionError as ex:
                 raise WriteError(ex)
-
-            except Exception as ex:
-                print(ex)
         else:
             print('File not found or is not file: %s', file)
 
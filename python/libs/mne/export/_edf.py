@@ -6,10 +6,16 @@
 from contextlib import contextmanager
 import numpy as np
 
+from ..io.edf.edf import _get_physical_range
 from ..utils import _check_edflib_installed, warn
 _check_edflib_installed()
 from EDFlib.edfwriter import EDFwriter  # noqa: E402
 
+# The data are read and written in windows of whole data records of at most
+# this many samples (all channels), so that the memory used does not depend on
+# the length of the recording.
+_WINDOW_SAMPLES = 2 ** 21
+
 
 def _try_to_set_value(header, key, value, channel_index=None):
     """Set key/value pairs in EDF header."""
@@ -60,9 +66,6 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
     digital_max = 32767
     file_type = EDFwriter.EDFLIB_FILETYPE_EDFPLUS
 
-    # load data first
-    raw.load_data()
-
     # remove extra STI channels
     orig_ch_types = raw.get_channel_types()
     drop_chs = []
@@ -116,8 +119,21 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
     linefreq = raw.info['line_freq']
     filter_str_info = f"HP:{highpass}Hz LP:{lowpass}Hz N:{linefreq}Hz"
 
-    # get the entire dataset in uV
-    data = raw.get_data(units=units, picks=ch_names)
+    # the data are read in windows of whole data records, in uV
+    window_size = max(1, _WINDOW_SAMPLES // (n_channels * out_sfreq))
+    window_size *= out_sfreq
+
+    def _windows():
+        for start in range(0, n_times, window_size):
+            stop = min(start + window_size, n_times)
+            yield raw.get_data(units=units, picks=ch_names, start=start,
+                               stop=stop)
+
+    # get max and min for each channel, from the header of the file when the
+    # data are read unmodified from EDF or BDF, else in a first pass over the
+    # data
+    ch_phys_min, ch_phys_max = _get_physical_range(
+        raw, ch_names, units, window_size)
 
     if physical_range == 'auto':
         # get max and min for each channel type data
@@ -126,9 +142,8 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
 
         for _type in np.unique(ch_types):
             _picks = np.nonzero(ch_types == _type)[0]
-            _data = raw.get_data(units=units, picks=_picks)
-            ch_types_phys_max[_type] = _data.max()
-            ch_types_phys_min[_type] = _data.min()
+            ch_types_phys_max[_type] = ch_phys_max[_picks].max()
+            ch_types_phys_min[_type] = ch_phys_min[_picks].min()
     else:
         # get the physical min and max of the data in uV
         # Physical ranges of the data in uV is usually set by the manufacturer
@@ -139,14 +154,20 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
         # levels of their input amplifiers & ADC).
         # For full discussion, see: https://github.com/sccn/eeglab/issues/246
         pmin, pmax = physical_range[0], physical_range[1]
+        if ch_phys_max.max() > pmax or ch_phys_min.min() < pmin:
+            # the data can be within the range even if the header is not
+            ch_phys_min, ch_phys_max = _get_physical_range(
+                raw, ch_names, units, window_size, use_header=False)
 
         # check that physical min and max is not exceeded
-        if data.max() > pmax:
-            raise RuntimeError(f'The maximum μV of the data {data.max()} is '
-                               f'more than the physical max passed in {pmax}.')
-        if data.min() < pmin:
-            raise RuntimeError(f'The minimum μV of the data {data.min()} is '
-                               f'less than the physical min passed in {pmin}.')
+        if ch_phys_max.max() > pmax:
+            raise RuntimeError(f'The maximum μV of the data '
+                               f'{ch_phys_max.max()} is more than the '
+                               f'physical max passed in {pmax}.')
+        if ch_phys_min.min() < pmin:
+            raise RuntimeError(f'The minimum μV of the data '
+                               f'{ch_phys_min.min()} is less than the '
+                               f'physical min passed in {pmin}.')
 
     # create instance of EDF Writer
     with _auto_close(EDFwriter(fname, file_type, n_channels)) as hdl:
@@ -237,35 +258,28 @@ def _export_raw(fname, raw, physical_range, add_ch_type):
             if n_annot_chans > 1:
                 hdl.setNumberOfAnnotationSignals(n_annot_chans)
 
-        # Write each data record sequentially
-        for idx in range(n_blocks):
-            end_samp = (idx + 1) * out_sfreq
-            if end_samp > n_times:
-                end_samp = n_times
-            start_samp = idx * out_sfreq
-
-            # then for each datarecord write each channel
-            for jdx in range(n_channels):
-                # create a buffer with sampling rate
-                buf = np.zeros(out_sfreq, np.float64, "C")
-
-                # get channel data for this block
-                ch_data = data[jdx, start_samp:end_samp]
-
-                # assign channel data to the buffer and write to EDF
-                buf[:len(ch_data)] = ch_data
-                err = hdl.writeSamples(buf)
-                if err != 0:
-                    raise RuntimeError(
-                        f"writeSamples() for channel{ch_names[jdx]} "
-                        f"returned error: {err}")
-
-            # there was an incomplete datarecord
-            if len(ch_data) != len(buf):
+        # Write each data record sequentially, a window of data records at a
+        # time
+        for data in _windows():
+            n_window_blocks = int(np.ceil(data.shape[1] / out_sfreq))
+            n_samples = n_window_blocks * out_sfreq
+            if data.shape[1] != n_samples:
+                # there is an incomplete datarecord
                 warn(f'EDF format requires equal-length data blocks, '
-                     f'so {(len(buf) - len(ch_data)) / sfreq} seconds of '
+                     f'so {(n_samples - data.shape[1]) / sfreq} seconds of '
                      'zeros were appended to all channels when writing the '
                      'final block.')
+                data = np.pad(data, ((0, 0), (0, n_samples - data.shape[1])))
+
+            # then for each datarecord write each channel
+            for block in range(n_window_blocks):
+                block_data = data[:, block * out_sfreq:(block + 1) * out_sfreq]
+                for jdx in range(n_channels):
+                    err = hdl.writeSamples(block_data[jdx])
+                    if err != 0:
+                        raise RuntimeError(
+                            f"writeSamples() for channel{ch_names[jdx]} "
+                            f"returned error: {err}")
 
         # write annotations
         if annots is not None:
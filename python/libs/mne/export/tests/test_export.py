@@ -20,6 +20,7 @@ from mne import (read_epochs_eeglab, Epochs, read_evokeds, read_evokeds_mff,
 from mne.datasets import testing, misc
 from mne.export import export_evokeds, export_evokeds_mff
 from mne.io import read_raw_fif, read_raw_eeglab, read_raw_edf
+from mne.io.edf.edf import _get_physical_range
 from mne.utils import (_check_eeglabio_installed, requires_version,
                        object_diff, _check_edflib_installed, _resource_path)
 from mne.tests.test_epochs import _get_data
@@ -236,6 +237,87 @@ def test_rawarray_edf(tmp_path):
         raw.times, raw_read.times[:orig_raw_len], rtol=0, atol=1e-5)
 
 
+@pytest.mark.skipif(not _check_edflib_installed(strict=False),
+                    reason='edflib-python not installed')
+def test_export_edf_windows(tmp_path, monkeypatch):
+    """Test exporting to EDF a window of data records at a time."""
+    from mne.export import _edf
+    rng = np.random.RandomState(0)
+    ch_types = ['eeg', 'eeg', 'eeg', 'seeg']
+    info = create_info(len(ch_types), sfreq=100, ch_types=ch_types)
+    data = rng.random(size=(len(ch_types), 1200)) * 1e-5
+    data[3] *= 10
+    raw_fname = tmp_path / 'test_raw.edf'
+    RawArray(data, info).export(raw_fname)
+    # not preloaded, not a whole number of data records, a stim channel
+    raw = read_raw_edf(raw_fname).crop(tmax=10.49)
+    raw.set_channel_types({raw.ch_names[0]: 'stim'}, verbose='error')
+    assert raw.n_times == 1050
+
+    with pytest.warns(RuntimeWarning, match='equal-length data blocks'):
+        raw.export(tmp_path / 'test.edf')
+    assert not raw.preload
+    # one data record per window
+    monkeypatch.setattr(_edf, '_WINDOW_SAMPLES', 1)
+    with pytest.warns(RuntimeWarning, match='equal-length data blocks'):
+        raw.export(tmp_path / 'test_windows.edf')
+    assert ((tmp_path / 'test.edf').read_bytes() ==
+            (tmp_path / 'test_windows.edf').read_bytes())
+
+    # the physical range of each channel type is the one of its channels
+    raw_read = read_raw_edf(tmp_path / 'test_windows.edf', preload=True)
+    assert raw_read.ch_names == raw.ch_names[1:]
+    assert_array_almost_equal(
+        raw.get_data(picks=[1, 2, 3]), raw_read.get_data()[:, :1050],
+        decimal=8)
+
+
+@pytest.mark.skipif(not _check_edflib_installed(strict=False),
+                    reason='edflib-python not installed')
+def test_export_edf_header_range(tmp_path):
+    """Test exporting to EDF with the physical range of the source header."""
+    rng = np.random.RandomState(0)
+    info = create_info(2, sfreq=100, ch_types='eeg')
+    data = (rng.random(size=(2, 1000)) - 0.5) * 2e-4
+    raw_fname = tmp_path / 'test_raw.edf'
+    RawArray(data, info).export(raw_fname, physical_range=(-500, 500))
+    units = dict(eeg='uV')
+
+    raw = read_raw_edf(raw_fname)
+    ch_min, ch_max = _get_physical_range(raw, units=units)
+    assert_allclose(ch_min, -500)
+    assert_allclose(ch_max, 500)
+    # the extrema of the data, read once
+    data_min = raw.get_data(units=units).min(axis=1)
+    data_max = raw.get_data(units=units).max(axis=1)
+    for kwargs in (dict(use_header=False, window_size=300),
+                   dict(use_header=False)):
+        ch_min, ch_max = _get_physical_range(raw, units=units, **kwargs)
+        assert_array_equal(ch_min, data_min)
+        assert_array_equal(ch_max, data_max)
+    # the data of a preloaded instance may have been modified
+    raw_preloaded = read_raw_edf(raw_fname, preload=True)
+    ch_min, ch_max = _get_physical_range(raw_preloaded, units=units)
+    assert_array_equal(ch_min, data_min)
+    assert_array_equal(ch_max, data_max)
+
+    # the physical range of the header is kept
+    raw.export(tmp_path / 'test.edf')
+    raw_read = read_raw_edf(tmp_path / 'test.edf')
+    assert_allclose(_get_physical_range(raw_read, units=units), [
+        [-500, -500], [500, 500]], rtol=1e-5)
+    assert_allclose(raw_read.get_data(), data, atol=1e-7)
+    raw_preloaded.export(tmp_path / 'test_preloaded.edf')
+    raw_read = read_raw_edf(tmp_path / 'test_preloaded.edf')
+    assert_allclose(_get_physical_range(raw_read, units=units),
+                    [[data_min.min()] * 2, [data_max.max()] * 2], rtol=1e-5)
+
+    # a range within the one of the header is checked against the data
+    raw.export(tmp_path / 'test_range.edf', physical_range=(-200, 200))
+    with pytest.raises(RuntimeError, match='more than the physical max'):
+        raw.export(tmp_path / 'test_small.edf', physical_range=(-200, 50))
+
+
 @pytest.mark.skipif(not _check_edflib_installed(strict=False),
                     reason='edflib-python not installed')
 @pytest.mark.parametrize(
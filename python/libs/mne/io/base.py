@@ -17,6 +17,7 @@ import os
 import os.path as op
 import shutil
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 
@@ -974,6 +975,80 @@ class BaseRaw(ProjMixin, ContainsMixin, UpdateChannelsMixin, SetChannelsMixin,
             return data, times
         return data
 
+    @fill_doc
+    def iter_chunks(self, duration, picks=None, dtype=np.float32, units=None,
+                    prefetch=False):
+        """Iterate over the data in windows of a given duration.
+
+        Unlike :meth:`get_data`, the data of an instance that is not preloaded
+        are read from the files a window at a time, so that the memory used
+        does not depend on the length of the recording.
+
+        Parameters
+        ----------
+        duration : float
+            The duration of each window in seconds. The last window is shorter
+            when the duration of the data is not a multiple of it.
+        %(picks_all)s
+        dtype : data-type
+            The data type of the windows. Defaults to ``np.float32``.
+        %(units)s
+        prefetch : bool
+            If True, the next window is read in a thread while the current
+            one is used. Defaults to False.
+
+        Yields
+        ------
+        data : ndarray, shape (n_channels, n_samples)
+            The data of each window in turn. The window starting at sample
+            ``start`` is the ``start // n_samples``-th one. The array is
+            reused for the following windows, so copy it to keep it beyond
+            the next iteration.
+
+        Notes
+        -----
+        .. versionadded:: 1.1
+        """
+        _validate_type(duration, 'numeric', 'duration')
+        n_samples = int(round(duration * self.info['sfreq']))
+        if n_samples < 1:
+            raise ValueError('duration must be at least one sample long, got '
+                             f'{duration}')
+        n_samples = min(n_samples, self.n_times)
+        picks = _picks_to_idx(self.info, picks, 'all', exclude=())
+        ch_factors = None
+        if units is not None:
+            ch_factors = _get_ch_factors(self, units, picks)[:, np.newaxis]
+        # with prefetching, the next window is read into the other buffer
+        buffers = [np.empty((len(picks), n_samples), dtype)
+                   for _ in range(2 if prefetch else 1)]
+
+        def _read(start, data):
+            stop = min(start + n_samples, self.n_times)
+            data = data[:, :stop - start]
+            if self.preload:
+                data[:] = self._data[picks, start:stop]
+            else:
+                self._read_segment(start, stop, picks, data_buffer=data,
+                                   projector=self._projector)
+            if ch_factors is not None:
+                data *= ch_factors
+            return data
+
+        starts = range(0, self.n_times, n_samples)
+        if not prefetch:
+            for start in starts:
+                yield _read(start, buffers[0])
+            return
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(_read, starts[0], buffers[0])
+            for ii in range(len(starts)):
+                data = future.result()
+                if ii + 1 < len(starts):
+                    future = executor.submit(
+                        _read, starts[ii + 1], buffers[(ii + 1) % 2])
+                yield data
+
     @verbose
     def apply_function(self, fun, picks=None, dtype=None, n_jobs=1,
                        channel_wise=True, verbose=None, **kwargs):
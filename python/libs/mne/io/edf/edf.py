@@ -19,8 +19,9 @@ import numpy as np
 
 from ...utils import verbose, logger, warn
 from ..utils import _blk_read_lims, _mult_cal_one
-from ..base import BaseRaw
+from ..base import BaseRaw, _get_ch_factors
 from ..meas_info import _empty_info, _unique_channel_names
+from ..pick import _picks_to_idx
 from ..constants import FIFF
 from ...filter import resample
 from ...utils import fill_doc
@@ -341,6 +342,79 @@ def _read_segment_file(data, idx, fi, start, stop, raw_extras, filenames,
     return tal_data
 
 
+@fill_doc
+def _get_physical_range(raw, picks=None, units=None, window_size=2 ** 21,
+                        use_header=True):
+    """Get the physical minimum and maximum of channels.
+
+    Parameters
+    ----------
+    raw : instance of Raw
+        The raw data.
+    %(picks_all)s
+    %(units)s
+    window_size : int
+        The number of samples of each channel read at a time.
+    use_header : bool
+        Whether to take the range of unmodified EDF or BDF data from the
+        digital range of their header, without reading the data.
+
+    Returns
+    -------
+    ch_min, ch_max : ndarray, shape (n_picks,)
+        The physical minimum and maximum of each channel. When taken from the
+        header, they are the limits of the data of the channels rather than
+        their extrema.
+    """
+    picks = _picks_to_idx(raw.info, picks, 'all', exclude=())
+    ch_range = _get_header_range(raw, picks) if use_header else None
+    if ch_range is None:
+        # a single pass over the data, a window at a time
+        ch_min = np.full(len(picks), np.inf)
+        ch_max = np.full(len(picks), -np.inf)
+        for start in range(0, raw.n_times, window_size):
+            data = raw.get_data(picks, start=start, stop=start + window_size)
+            np.minimum(ch_min, data.min(axis=1), out=ch_min)
+            np.maximum(ch_max, data.max(axis=1), out=ch_max)
+    else:
+        ch_min, ch_max = ch_range
+    if units is not None:
+        ch_factors = _get_ch_factors(raw, units, picks)
+        ch_min, ch_max = ch_min * ch_factors, ch_max * ch_factors
+    return ch_min, ch_max
+
+
+def _get_header_range(raw, picks):
+    """Get the physical range of channels from the header of their files.
+
+    Returns None when the data read may not be within this range.
+    """
+    # the data of a preloaded instance may have been modified, projectors mix
+    # the channels, and resampling can overshoot the range of a channel
+    if not isinstance(raw, RawEDF) or raw.preload or \
+            raw._projector is not None or raw._comp is not None:
+        return None
+    ch_min = np.full(len(picks), np.inf)
+    ch_max = np.full(len(picks), -np.inf)
+    for raw_extras, read_picks in zip(raw._raw_extras, raw._read_picks):
+        if 'digital_min' not in raw_extras:
+            return None
+        orig_idx = read_picks[picks]
+        n_samps = raw_extras['n_samps'][raw_extras['sel'][orig_idx]]
+        if np.any(n_samps != raw_extras['max_samp']) or np.isin(
+                orig_idx, raw_extras['stim_channel_idxs']).any():
+            return None
+        # as in _read_segment_file
+        cal = raw_extras['cal'][orig_idx]
+        offsets = raw_extras['offsets'][orig_idx]
+        gains = raw_extras['units'][orig_idx] * raw._cals[picks]
+        lims = [(raw_extras[key][orig_idx] * cal + offsets) * gains
+                for key in ('digital_min', 'digital_max')]
+        np.minimum(ch_min, np.minimum(*lims), out=ch_min)
+        np.maximum(ch_max, np.maximum(*lims), out=ch_max)
+    return ch_min, ch_max
+
+
 def _read_header(fname, exclude, infer_types):
     """Unify EDF, BDF and GDF _read_header call.
 
@@ -546,7 +620,6 @@ def _get_info(fname, stim_channel, eog, misc, exclude, infer_types, preload):
     edf_info['offsets'] = (
         edf_info['physical_min'] - edf_info['digital_min'] * edf_info['cal'])
     del edf_info['physical_min']
-    del edf_info['digital_min']
 
     if edf_info['subtype'] == 'bdf':
         edf_info['cal'][stim_channel_idxs] = 1
@@ -118,6 +118,15 @@ def _test_raw_reader(reader, test_preloading=True, test_kwargs=True,
                 assert_allclose(data1, data2)
                 assert_allclose(times1, times2)
 
+        # test iterating over windows of the data
+        data1 = raw.get_data(picks)
+        for other_raw in other_raws:
+            for prefetch in (False, True):
+                chunks = [data.copy() for data in other_raw.iter_chunks(
+                    bnd / raw.info['sfreq'], picks, dtype=np.float64,
+                    prefetch=prefetch)]
+                assert_allclose(np.concatenate(chunks, axis=1), data1)
+
         # test projection vs cals and data units
         other_raw = reader(preload=False, **kwargs)
         other_raw.del_proj()
@@ -656,6 +665,45 @@ def test_test_raw_reader():
     _test_raw_reader(_read_raw_arange, test_scaling=False, test_rank='less')
 
 
+def test_iter_chunks():
+    """Test iterating over windows of the data."""
+    rng = np.random.RandomState(0)
+    info = create_info(3, 100., 'eeg')
+    data = rng.randn(3, 1050) * 1e-5
+    raw = RawArray(data, info)
+    chunks = list()
+    for chunk in raw.iter_chunks(2.):
+        assert chunk.dtype == np.float32
+        chunks.append(chunk.copy())
+    assert [chunk.shape for chunk in chunks] == [(3, 200)] * 5 + [(3, 50)]
+    assert_allclose(np.concatenate(chunks, axis=1), data, rtol=1e-6)
+    # the windows are read in the same buffer, two with prefetching
+    for prefetch, n_buffers in ((False, 1), (True, 2)):
+        bases = [chunk.base if chunk.base is not None else chunk
+                 for chunk in raw.iter_chunks(2., prefetch=prefetch)]
+        assert len({id(base) for base in bases}) == n_buffers
+    chunks = [chunk.copy() for chunk in raw.iter_chunks(
+        4., picks=[2, 0], dtype=np.float64, units='uV', prefetch=True)]
+    assert_allclose(np.concatenate(chunks, axis=1), data[[2, 0]] * 1e6)
+    # a window longer than the data
+    chunks = list(raw.iter_chunks(20.))
+    assert len(chunks) == 1
+    assert chunks[0].shape == (3, 1050)
+    # the generator can be closed while prefetching
+    chunks = raw.iter_chunks(1., prefetch=True)
+    next(chunks)
+    chunks.close()
+    with pytest.raises(ValueError, match='at least one sample'):
+        next(raw.iter_chunks(0.001))
+
+    # without preloading
+    raw = _read_raw_arange()
+    chunks = [chunk.copy() for chunk in raw.iter_chunks(0.3, picks=[0, 7])]
+    assert [chunk.shape for chunk in chunks] == [(2, 300)] * 3 + [(2, 100)]
+    assert_array_equal(np.concatenate(chunks, axis=1),
+                       np.repeat([[1.], [8.]], 1000, axis=1))
+
+
 @pytest.mark.slowtest
 def test_describe_print():
     """Test print output of describe method."""
@@ -2116,7 +2116,9 @@ docdict['physical_range_export_params'] = """
 physical_range : str | tuple
     The physical range of the data. If 'auto' (default), then
     it will infer the physical min and max from the data itself,
-    taking the minimum and maximum values per channel type.
+    taking the minimum and maximum values per channel type. Data read
+    unmodified from EDF or BDF files, without preloading, take the physical
+    range of the header of their files instead, and are not read twice.
     If it is a 2-tuple of minimum and maximum limit, then those
     physical ranges will be used. Only used for exporting EDF files.
 """
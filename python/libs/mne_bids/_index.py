@@ -0,0 +1,531 @@
+"""Private index of the files of a BIDS root, shared by the path lookups."""
+import os
+import os.path as op
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from mne.utils import warn
+
+from mne_bids.config import ALLOWED_DATATYPES
+
+# directories modified this recently (in ns) may still change within the
+# granularity of their modification time, they are listed again on refresh.
+_RACY_NS = 2 * 10 ** 9
+
+# number of roots whose index is kept in memory.
+_MAX_INDEXES = 16
+
+# the persistent index of a root, see _BIDSIndex, and its SQLite schema.
+_INDEX_FNAME = '.mne_bids_index.sqlite'
+_INDEX_VERSION = 1
+_INDEX_ENTITIES = ('sub', 'ses', 'task', 'acq', 'run', 'datatype', 'suffix',
+                   'extension')
+_INDEX_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY, parent TEXT, mtime_ns INTEGER, racy INTEGER);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, directory TEXT, name TEXT,
+    {', '.join(key + ' TEXT' for key in _INDEX_ENTITIES)},
+    size INTEGER, mtime_ns INTEGER, hash TEXT);
+CREATE INDEX IF NOT EXISTS files_directory ON files (directory);
+CREATE INDEX IF NOT EXISTS files_sub ON files (sub);
+CREATE INDEX IF NOT EXISTS files_datatype ON files (datatype, suffix);
+"""
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _parse_name(name):
+    """Parse the entities, suffix and extension of a file name.
+
+    Returns a dict of the ``key-value`` pairs of the name, keyed by their BIDS
+    abbreviation (``sub``, ``ses``, ...), with the ``suffix`` and
+    ``extension``.
+    """
+    stem, dot, extension = name.partition('.')
+    entities = {'extension': dot + extension if dot else None,
+                'suffix': None}
+    for part in stem.split('_'):
+        key, dash, value = part.partition('-')
+        if dash:
+            entities.setdefault(key, value)
+        else:
+            entities['suffix'] = part
+    return entities
+
+
+class _BIDSIndex(object):
+    """Index of the files and directories below a root.
+
+    The tree is listed once with ``os.scandir``, then kept up to date by the
+    writers: ``write_raw_bids`` and the other functions of MNE-BIDS writing
+    files give them to ``update``, which lists again only their directories.
+    The lookups trust the index, they only list the directories they cover
+    that are not indexed yet, so their cost does not grow with the size of
+    the tree. The files written, renamed or removed by other means are seen
+    once given to ``update``, or after ``refresh``: every directory below
+    the one refreshed is checked with a single ``stat`` and listed again only
+    if its modification time changed.
+
+    Files are also indexed by the value of each of their entities, so the
+    lookups by entity only go through the matching files.
+
+    A persistent index is also stored in a SQLite file in the root
+    (``.mne_bids_index.sqlite``), with the size, modification time and hash
+    of every file, so that it survives restarts: it is loaded instead of
+    listing the tree again, then refreshed once to see the changes made while
+    it was not loaded. The hashes
+    are only known for the files whose hash was given to ``update``, and are
+    forgotten when the size or modification time of the file changes.
+    """
+
+    def __init__(self, root, persistent=False):
+        self.root = op.abspath(str(root))
+        # relative directory ('' for the root) -> [mtime_ns, racy, files, dirs]
+        self._dirs = dict()
+        # relative file path -> entities, see _parse_name
+        self._files = dict()
+        # entity abbreviation -> value -> set of relative file paths
+        self._by_entity = dict()
+        self._lock = threading.RLock()
+        # persistent index only: relative file path -> [size, mtime_ns, hash]
+        self._stats = dict()
+        # directories changed since the last save
+        self._dirty = set()
+        self._db = None
+        if persistent:
+            self._open()
+
+    @property
+    def persistent(self):
+        return self._db is not None
+
+    def _open(self):
+        """Open the SQLite file of the index and load it."""
+        fname = op.join(self.root, _INDEX_FNAME)
+        try:
+            db = sqlite3.connect(fname, check_same_thread=False)
+            if db.execute('PRAGMA user_version').fetchone()[0] != \
+                    _INDEX_VERSION:
+                db.executescript('DROP TABLE IF EXISTS dirs;'
+                                 'DROP TABLE IF EXISTS files;')
+            db.executescript(_INDEX_SCHEMA)
+            db.execute(f'PRAGMA user_version = {_INDEX_VERSION}')
+            dirs = db.execute(
+                'SELECT path, parent, mtime_ns, racy FROM dirs').fetchall()
+            files = db.execute('SELECT path, directory, name, size, '
+                               'mtime_ns, hash FROM files').fetchall()
+        except (sqlite3.Error, OSError) as e:
+            warn(f'The index of {self.root} cannot be stored in {fname}, '
+                 f'it is kept in memory only: {e}')
+            return
+
+        with self._lock:
+            self._db = db
+            if self._dirs:
+                # the index listed so far is stored as a whole.
+                self._stat_files()
+                self._dirty.update(self._dirs)
+                return
+
+            for rel, parent, mtime_ns, racy in dirs:
+                self._dirs[rel] = [mtime_ns, bool(racy), [], []]
+            for rel, parent, _, _ in dirs:
+                if rel and parent in self._dirs:
+                    self._dirs[parent][3].append(op.basename(rel))
+            for rel, directory, name, size, mtime_ns, hash in files:
+                if directory in self._dirs:
+                    self._dirs[directory][2].append(name)
+                    self._add_file(rel, name)
+                    self._stats[rel] = [size, mtime_ns, hash]
+            for entry in self._dirs.values():
+                entry[2].sort()
+                entry[3].sort()
+            self._refresh_dir('')
+            self._save()
+
+    def _stat_files(self):
+        for rel in self._files:
+            try:
+                stat = os.stat(self._abs(rel))
+            except OSError:
+                continue
+            self._stats[rel] = [stat.st_size, stat.st_mtime_ns, None]
+
+    def _save(self):
+        """Store the directories changed since the last save."""
+        if self._db is None or not self._dirty:
+            return
+
+        try:
+            with self._db:
+                for rel in self._dirty:
+                    self._db.execute('DELETE FROM files WHERE directory = ?',
+                                     (rel,))
+                    entry = self._dirs.get(rel)
+                    if entry is None:
+                        self._db.execute('DELETE FROM dirs WHERE path = ?',
+                                         (rel,))
+                        continue
+
+                    parent = op.dirname(rel) if rel else None
+                    self._db.execute(
+                        'INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)',
+                        (rel, parent, entry[0], int(entry[1])))
+                    rows = list()
+                    for name in entry[2]:
+                        file_rel = op.join(rel, name) if rel else name
+                        entities = self._files[file_rel]
+                        rows.append(
+                            [file_rel, rel, name] +
+                            [entities.get(key) for key in _INDEX_ENTITIES] +
+                            list(self._stats.get(file_rel, (None,) * 3)))
+                    self._db.executemany(
+                        'INSERT INTO files VALUES (' +
+                        ', '.join('?' * (len(_INDEX_ENTITIES) + 6)) + ')',
+                        rows)
+        except sqlite3.Error as e:
+            warn(f'The index of {self.root} could not be saved: {e}')
+            return
+        self._dirty.clear()
+
+    def _abs(self, rel):
+        return op.join(self.root, rel) if rel else self.root
+
+    def _add_file(self, rel, name):
+        entities = _parse_name(name)
+        datatype = op.basename(op.dirname(rel))
+        entities['datatype'] = (datatype if datatype in ALLOWED_DATATYPES
+                                else None)
+        self._files[rel] = entities
+        for key, value in entities.items():
+            if value is not None:
+                self._by_entity.setdefault(key, dict()).setdefault(
+                    value, set()).add(rel)
+
+    def _remove_file(self, rel):
+        self._stats.pop(rel, None)
+        entities = self._files.pop(rel, None) or dict()
+        for key, value in entities.items():
+            paths = self._by_entity.get(key, dict()).get(value)
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del self._by_entity[key][value]
+
+    def _remove_dir(self, rel):
+        entry = self._dirs.pop(rel, None)
+        if entry is None:
+            return
+        if self._db is not None:
+            self._dirty.add(rel)
+        for name in entry[2]:
+            self._remove_file(op.join(rel, name) if rel else name)
+        for name in entry[3]:
+            self._remove_dir(op.join(rel, name) if rel else name)
+
+    def _scan_dir(self, rel, stat, recursive=True):
+        """List a directory, (re)indexing its entries.
+
+        Its subdirectories are refreshed too, or only the new ones if not
+        ``recursive``.
+        """
+        files, dirs = list(), list()
+        stats = dict()
+        try:
+            with os.scandir(self._abs(rel)) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            dirs.append(entry.name)
+                        elif entry.is_file():
+                            if entry.name.startswith(_INDEX_FNAME):
+                                continue
+                            files.append(entry.name)
+                            if self._db is not None:
+                                stats[entry.name] = entry.stat()
+                    except OSError:
+                        continue
+        except OSError:
+            self._remove_dir(rel)
+            return
+
+        old = self._dirs.get(rel)
+        racy = time.time_ns() - stat.st_mtime_ns < _RACY_NS
+        # a change of the racy flag alone is not saved: the directories
+        # saved as racy are listed again once loaded, which is harmless.
+        if self._db is not None and (
+                old is None or old[2] != sorted(files) or
+                old[3] != sorted(dirs)):
+            self._dirty.add(rel)
+        for name, file_stat in stats.items():
+            self._set_stat(op.join(rel, name) if rel else name, file_stat)
+        old_files = set(old[2]) if old else set()
+        old_dirs = set(old[3]) if old else set()
+        for name in old_files - set(files):
+            self._remove_file(op.join(rel, name) if rel else name)
+        for name in old_dirs - set(dirs):
+            self._remove_dir(op.join(rel, name) if rel else name)
+        for name in set(files) - old_files:
+            self._add_file(op.join(rel, name) if rel else name, name)
+
+        self._dirs[rel] = [stat.st_mtime_ns, racy, sorted(files), sorted(dirs)]
+
+        for name in dirs:
+            child = op.join(rel, name) if rel else name
+            if recursive or child not in self._dirs:
+                self._refresh_dir(child, recursive)
+
+    def _set_stat(self, rel, stat):
+        old = self._stats.get(rel)
+        new = [stat.st_size, stat.st_mtime_ns]
+        if old is None or old[:2] != new:
+            # the hash of a changed file is unknown.
+            self._stats[rel] = new + [None]
+            self._dirty.add(op.dirname(rel))
+
+    def _refresh_dir(self, rel, recursive=True):
+        try:
+            stat = os.stat(self._abs(rel))
+        except OSError:
+            self._remove_dir(rel)
+            return
+
+        entry = self._dirs.get(rel)
+        if entry is None or entry[1] or entry[0] != stat.st_mtime_ns:
+            self._scan_dir(rel, stat, recursive)
+            return
+
+        if recursive:
+            for name in entry[3]:
+                self._refresh_dir(op.join(rel, name) if rel else name)
+
+    def _closest(self, rel):
+        """Get the closest directory of rel that is indexed and exists."""
+        while rel and (rel not in self._dirs or not op.isdir(self._abs(rel))):
+            rel = op.dirname(rel)
+        return rel
+
+    def refresh(self, subdir=''):
+        """Bring the index of ``subdir`` (relative to the root) up to date.
+
+        Every directory below ``subdir`` is checked with a ``stat``, the
+        changed ones are listed again.
+        """
+        with self._lock:
+            self._refresh_dir(self._closest(subdir))
+            self._save()
+
+    def _lookup(self, subdir):
+        """Index ``subdir`` if it is not yet, the indexed ones are trusted."""
+        subdir = op.normpath(subdir) if subdir else ''
+        if subdir not in self._dirs:
+            # listed from its closest indexed directory, like a new one.
+            self._refresh_dir(self._closest(subdir), recursive=False)
+            self._save()
+        return subdir
+
+    def update(self, paths, hashes=None):
+        """Bring the index of the directories of written files up to date.
+
+        Parameters
+        ----------
+        paths : iterable of path-like
+            The files written, renamed or removed below the root. Only their
+            directories are listed again, those of the files written in new
+            directories from the closest indexed one. Files rewritten in
+            place do not change the modification time of their directory, so
+            they are looked at even when it is unchanged.
+        hashes : dict | None
+            The hash of some of the files, keyed by their path.
+        """
+        hashes = {op.abspath(str(path)): value
+                  for path, value in (hashes or dict()).items()}
+        with self._lock:
+            rels, directories = list(), set()
+            for path in paths:
+                rel = op.relpath(op.abspath(str(path)), self.root)
+                if rel.startswith(op.pardir):
+                    continue
+                rels.append(rel)
+                # new directories are listed from the closest indexed one.
+                directories.add(self._closest(op.dirname(rel)))
+
+            for directory in sorted(directories):
+                self._refresh_dir(directory, recursive=False)
+
+            if self._db is not None:
+                for rel in rels:
+                    if rel in self._files:
+                        try:
+                            self._set_stat(rel, os.stat(self._abs(rel)))
+                        except OSError:
+                            continue
+
+            for path, value in hashes.items():
+                rel = op.relpath(path, self.root)
+                if rel in self._stats and self._stats[rel][2] != value:
+                    self._stats[rel][2] = value
+                    self._dirty.add(op.dirname(rel))
+            self._save()
+
+    def records(self, subdir='', subject_prefix=None, **entities):
+        """Get the files below ``subdir`` with the given entity values.
+
+        Like ``files``, with the subjects optionally filtered by the prefix
+        of their label (e.g. the site of the subject). Returns a list of
+        dict of the path of each file, its entities, and its ``size``,
+        ``mtime_ns`` and ``hash`` for a persistent index.
+        """
+        records = list()
+        with self._lock:
+            for path in self.files(subdir, **entities):
+                rel = op.relpath(str(path), self.root)
+                record = dict(self._files[rel], path=path)
+                if subject_prefix is not None and not (
+                        record.get('sub') or '').startswith(subject_prefix):
+                    continue
+                size, mtime_ns, hash = self._stats.get(rel, (None,) * 3)
+                record.update(size=size, mtime_ns=mtime_ns, hash=hash)
+                records.append(record)
+        return records
+
+    def stats(self, subdir=''):
+        """Get the (directory, [(name, size, mtime_ns)], dirs) of subdir.
+
+        Every directory below ``subdir`` is listed, in sorted order, with its
+        files and subdirectories. Only for a persistent index.
+        """
+        with self._lock:
+            subdir = self._lookup(subdir)
+            entries = list()
+            for rel in self._walk(subdir):
+                files = list()
+                for name in self._dirs[rel][2]:
+                    stat = self._stats.get(op.join(rel, name) if rel else name,
+                                           (None,) * 3)
+                    files.append((name, stat[0], stat[1]))
+                entries.append((rel, files, list(self._dirs[rel][3])))
+            return entries
+
+    def _under(self, rel, subdir):
+        return not subdir or rel == subdir or rel.startswith(subdir + os.sep)
+
+    def _walk(self, rel, hidden=True):
+        """Yield the relative paths of rel and of the directories below it."""
+        entry = self._dirs.get(rel)
+        if entry is None:
+            return
+        yield rel
+        for name in entry[3]:
+            if hidden or not name.startswith('.'):
+                yield from self._walk(op.join(rel, name) if rel else name,
+                                      hidden)
+
+    def files(self, subdir='', **entities):
+        """Get the files below ``subdir`` with the given entity values.
+
+        The entities are keyed by their BIDS abbreviation (``sub``, ``ses``,
+        ...), ``suffix`` or ``extension``; the ``None`` values are ignored.
+        Returns a sorted list of ``pathlib.Path``.
+        """
+        entities = {key: value for key, value in entities.items()
+                    if value is not None}
+        with self._lock:
+            subdir = self._lookup(subdir)
+
+            if entities:
+                # start from the rarest entity value.
+                candidates = None
+                for key, value in entities.items():
+                    paths = self._by_entity.get(key, dict()).get(value, set())
+                    if candidates is None or len(paths) < len(candidates):
+                        candidates = paths
+                rels = [rel for rel in candidates
+                        if self._under(rel, subdir) and
+                        all(self._files[rel].get(key) == value
+                            for key, value in entities.items())]
+            else:
+                rels = [op.join(rel, name) if rel else name
+                        for rel in self._walk(subdir)
+                        for name in self._dirs[rel][2]]
+
+            return sorted(Path(self._abs(rel)) for rel in rels)
+
+    def entity_values(self, key, subdir=''):
+        """Get a dict of the values of an entity to the files holding them.
+
+        The files of each value are yielded lazily, in no particular order.
+        """
+        with self._lock:
+            subdir = self._lookup(subdir)
+            return {
+                value: (Path(self._abs(rel)) for rel in list(rels)
+                        if self._under(rel, subdir))
+                for value, rels in self._by_entity.get(key, dict()).items()
+            }
+
+    def dirs(self, subdir=''):
+        """Get the relative paths of the directories below ``subdir``."""
+        with self._lock:
+            subdir = self._lookup(subdir)
+            return [rel for rel in self._walk(subdir) if rel != subdir]
+
+    def entries(self, subdir=''):
+        """Get the (directory, files, dirs) of every directory below subdir.
+
+        ``directory`` is relative to the root, like ``os.walk`` without
+        descending into the hidden directories.
+        """
+        with self._lock:
+            subdir = self._lookup(subdir)
+            return [(rel, list(self._dirs[rel][2]), list(self._dirs[rel][3]))
+                    for rel in self._walk(subdir, hidden=False)]
+
+
+def _get_index(root, persistent=None):
+    """Get the index of a BIDS root, created on first use.
+
+    With ``persistent=None``, the index is persistent only if the root
+    already holds one; with ``True``, it is made persistent.
+    """
+    key = op.abspath(str(root))
+    if persistent is None:
+        persistent = op.isfile(op.join(key, _INDEX_FNAME))
+    with _indexes_lock:
+        index = _indexes.pop(key, None)
+        if index is None:
+            index = _BIDSIndex(key, persistent=persistent)
+        elif persistent and not index.persistent:
+            index._open()
+        _indexes[key] = index
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _update_index(root, paths=None, hashes=None):
+    """Update the index of a root with the files written, if it is loaded.
+
+    With ``paths=None``, the whole index is refreshed. An index loaded later
+    lists the tree, or refreshes it once loaded back from its file, so the
+    files are seen anyway.
+    """
+    with _indexes_lock:
+        index = _indexes.get(op.abspath(str(root)))
+    if index is None:
+        return
+    if paths is None:
+        index.refresh()
+    else:
+        index.update(paths, hashes)
+
+
+def _clear_indexes():
+    """Forget the index of every root."""
+    with _indexes_lock:
+        _indexes.clear()
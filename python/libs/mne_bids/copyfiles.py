@@ -18,13 +18,13 @@ import os
 import os.path as op
 import re
 import shutil as sh
+from datetime import datetime, timezone
 from pathlib import Path
 
 from scipy.io import loadmat, savemat
 
 import mne
-from mne.io import (read_raw_brainvision, read_raw_edf, read_raw_bdf,
-                    anonymize_info)
+from mne.io import read_raw_brainvision, anonymize_info
 from mne.utils import logger, verbose, warn
 
 from mne_bids.path import BIDSPath, _parse_ext, _mkdir_p
@@ -362,6 +362,50 @@ def copyfile_brainvision(vhdr_src, vhdr_dest, anonymize=None, verbose=None):
         logger.info('Anonymized all dates in VHDR and VMRK.')
 
 
+def _read_edf_info(fname):
+    """Read the measurement date of an EDF, EDF+, or BDF file.
+
+    Only the header of the file is read, and the date is parsed like
+    :func:`mne.io.read_raw_edf` does.
+
+    Returns
+    -------
+    info : mne.Info
+        A measurement info without channels, holding the measurement date.
+    """
+    with open(fname, 'rb') as fid:
+        fid.seek(88)  # rec_info field starts 88 bytes in
+        rec_info = fid.read(80).decode('latin-1').rstrip().split(' ')
+        meas_date = fid.read(8).decode('latin-1')
+        meas_time = fid.read(8).decode('latin-1')
+
+    # The startdate of the recording info has all 4 digits of the year
+    startdate = None
+    if len(rec_info) == 5:
+        try:
+            startdate = datetime.strptime(rec_info[1], '%d-%b-%Y')
+        except ValueError:
+            pass
+    if startdate is not None:
+        day, month, year = startdate.day, startdate.month, startdate.year
+    else:
+        day, month, year = [int(x) for x in meas_date.split('.')]
+        year = year + 2000 if year < 85 else year + 1900
+    hour, minute, sec = [int(x) for x in meas_time.split('.')]
+    try:
+        meas_date = datetime(year, month, day, hour, minute, sec,
+                             tzinfo=timezone.utc)
+    except ValueError:
+        warn(f'Invalid date encountered ({year:04d}-{month:02d}-'
+             f'{day:02d} {hour:02d}:{minute:02d}:{sec:02d}).')
+        meas_date = None
+
+    info = mne.create_info([], 1.)
+    with info._unlock():
+        info['meas_date'] = meas_date
+    return info
+
+
 def copyfile_edf(src, dest, anonymize=None):
     """Copy an EDF, EDF+, or BDF file to a new location, optionally anonymize.
 
@@ -437,14 +481,12 @@ def copyfile_edf(src, dest, anonymize=None):
     # Copy data prior to any anonymization
     sh.copyfile(src, dest)
 
-    # Anonymize EDF/BDF data, if requested
+    # Anonymize EDF/BDF data, if requested. Only the header is rewritten, so
+    # only the header is read.
     if anonymize is not None:
-        if ext_src in ['.bdf', '.BDF']:
-            raw = read_raw_bdf(dest, preload=False, verbose=0)
-        elif ext_src in ['.edf', '.EDF']:
-            raw = read_raw_edf(dest, preload=False, verbose=0)
-        else:
+        if ext_src not in ['.bdf', '.BDF', '.edf', '.EDF']:
             raise ValueError('Unsupported file type ({0})'.format(ext_src))
+        info = _read_edf_info(dest)
 
         # Get subject info, recording info, and recording date
         with open(dest, 'rb') as f:
@@ -461,8 +503,8 @@ def copyfile_edf(src, dest, anonymize=None):
         start_date, admin_code, tech, equip = rec_info.split(' ')[1:5]
 
         # Try to anonymize the recording date
-        daysback, keep_his, _ = _check_anonymize(anonymize, raw, '.edf')
-        anonymize_info(raw.info, daysback=daysback, keep_his=keep_his)
+        daysback, keep_his, _ = _check_anonymize(anonymize, info, '.edf')
+        anonymize_info(info, daysback=daysback, keep_his=keep_his)
         start_date = '01-JAN-1985'
         meas_date = '01.01.85'
 
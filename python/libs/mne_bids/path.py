@@ -27,6 +27,7 @@ from mne_bids.config import (
     reader, ENTITY_VALUE_TYPE)
 from mne_bids.utils import (_check_key_val, _check_empty_room_basename,
                             param_regex, _ensure_tuple)
+from mne_bids._index import _get_index
 
 
 def _find_matched_empty_room(bids_path):
@@ -774,17 +775,17 @@ class BIDSPath(object):
                                'BIDS root directory path to `root` via '
                                'BIDSPath.update().')
 
-        # allow searching by datatype
-        # all other entities are filtered below
+        # the files are looked up in the index of the root, narrowed down by
+        # subject and datatype; all other entities are filtered below
+        root = Path(self.root)
+        paths = _get_index(root).files(sub=self.subject)
         if self.datatype is not None:
-            search_str = f'*/{self.datatype}/*'
+            paths = [p for p in paths if p.parent.name == self.datatype and
+                     len(p.relative_to(root).parts) > 2]
         else:
-            search_str = '*.*'
-
-        paths = self.root.rglob(search_str)
-        # Only keep files (not directories), and omit the JSON sidecars.
-        paths = [p for p in paths
-                 if p.is_file() and p.suffix != '.json']
+            paths = [p for p in paths if '.' in p.name]
+        # Omit the JSON sidecars.
+        paths = [p for p in paths if p.suffix != '.json']
         fnames = _filter_fnames(paths, suffix=self.suffix,
                                 extension=self.extension,
                                 **self.entities)
@@ -1445,8 +1446,8 @@ def _find_matching_sidecar(bids_path, suffix=None,
     if bids_path.session is not None:
         search_str_filename += f'_ses-{bids_path.session}'
 
-    # Find all potential sidecar files, doing a recursive glob
-    # from bids_root/sub-*, potentially taking into account the data type
+    # Find all potential sidecar files, in the index of bids_root/sub-*,
+    # potentially taking into account the data type
     search_dir = Path(bids_root) / f'sub-{bids_path.subject}'
     # ** -> don't forget about potentially present session directories
     if bids_path.datatype is None:
@@ -1458,7 +1459,17 @@ def _find_matching_sidecar(bids_path, suffix=None,
         search_dir / f'{search_str_filename}*{search_suffix}'
     )
 
-    candidate_list = glob.glob(search_str_complete, recursive=True)
+    candidate_list = []
+    subject_dir = f'sub-{bids_path.subject}'
+    for directory, files, dirs in _get_index(bids_root).entries(subject_dir):
+        if (bids_path.datatype is not None and
+                op.basename(directory) != bids_path.datatype):
+            continue
+        candidate_list.extend(
+            op.join(bids_root, directory, name) for name in files + dirs
+            if name.startswith(search_str_filename) and
+            name.endswith(search_suffix) and
+            len(name) >= len(search_str_filename) + len(search_suffix))
     best_candidates = _find_best_candidates(bids_path.entities,
                                             candidate_list)
     if len(best_candidates) == 1:
@@ -1521,10 +1532,10 @@ def get_datatypes(root, verbose=None):
     datatype_list = ('anat', 'func', 'dwi', 'fmap', 'beh',
                      'meg', 'eeg', 'ieeg', 'nirs')
     datatypes = list()
-    for root, dirs, files in os.walk(root):
-        for dir in dirs:
-            if dir in datatype_list and dir not in datatypes:
-                datatypes.append(dir)
+    for directory in _get_index(root).dirs():
+        dir = op.basename(directory)
+        if dir in datatype_list and dir not in datatypes:
+            datatypes.append(dir)
 
     return datatypes
 
@@ -1659,53 +1670,60 @@ def get_entity_vals(root, entity_key, *, ignore_subjects='emptyroom',
 
     p = re.compile(r'{}-(.*?)_'.format(entity_long_abbr_map[entity_key]))
     values = list()
-    filenames = root.glob(f'**/*{entity_long_abbr_map[entity_key]}-*_*')
-
-    for filename in filenames:
-        # Skip ignored directories
-        # XXX In Python 3.9, we can use Path.is_relative_to() here
-        if any([
-            str(filename).startswith(str(ignore_dir))
-            for ignore_dir in ignore_dirs
-        ]):
-            continue
+    # the files holding the entity, grouped by value, from the index of root
+    groups = _get_index(root).entity_values(entity_long_abbr_map[entity_key])
 
-        if ignore_datatypes and filename.parent.name in ignore_datatypes:
-            continue
-        if ignore_subjects and any([filename.stem.startswith(f'sub-{s}_')
-                                    for s in ignore_subjects]):
-            continue
-        if ignore_sessions and any([f'_ses-{s}_' in filename.stem
-                                    for s in ignore_sessions]):
-            continue
-        if ignore_tasks and any([f'_task-{t}_' in filename.stem
-                                 for t in ignore_tasks]):
-            continue
-        if ignore_runs and any([f'_run-{r}_' in filename.stem
-                                for r in ignore_runs]):
-            continue
-        if ignore_processings and any([f'_proc-{p}_' in filename.stem
-                                       for p in ignore_processings]):
-            continue
-        if ignore_spaces and any([f'_space-{s}_' in filename.stem
-                                  for s in ignore_spaces]):
-            continue
-        if ignore_acquisitions and any([f'_acq-{a}_' in filename.stem
-                                        for a in ignore_acquisitions]):
-            continue
-        if ignore_splits and any([f'_split-{s}_' in filename.stem
-                                  for s in ignore_splits]):
-            continue
-        if ignore_modalities and any([f'_{k}' in filename.stem
-                                      for k in ignore_modalities]):
-            continue
+    for value_filenames in groups.values():
+        for filename in value_filenames:
+            if not p.search(filename.stem):
+                continue
+
+            # Skip ignored directories
+            # XXX In Python 3.9, we can use Path.is_relative_to() here
+            if any([
+                str(filename).startswith(str(ignore_dir))
+                for ignore_dir in ignore_dirs
+            ]):
+                continue
+
+            if ignore_datatypes and filename.parent.name in ignore_datatypes:
+                continue
+            if ignore_subjects and any([filename.stem.startswith(f'sub-{s}_')
+                                        for s in ignore_subjects]):
+                continue
+            if ignore_sessions and any([f'_ses-{s}_' in filename.stem
+                                        for s in ignore_sessions]):
+                continue
+            if ignore_tasks and any([f'_task-{t}_' in filename.stem
+                                     for t in ignore_tasks]):
+                continue
+            if ignore_runs and any([f'_run-{r}_' in filename.stem
+                                    for r in ignore_runs]):
+                continue
+            if ignore_processings and any([f'_proc-{p}_' in filename.stem
+                                           for p in ignore_processings]):
+                continue
+            if ignore_spaces and any([f'_space-{s}_' in filename.stem
+                                      for s in ignore_spaces]):
+                continue
+            if ignore_acquisitions and any([f'_acq-{a}_' in filename.stem
+                                            for a in ignore_acquisitions]):
+                continue
+            if ignore_splits and any([f'_split-{s}_' in filename.stem
+                                      for s in ignore_splits]):
+                continue
+            if ignore_modalities and any([f'_{k}' in filename.stem
+                                          for k in ignore_modalities]):
+                continue
 
-        match = p.search(filename.stem)
-        value = match.group(1)
-        if with_key:
-            value = f'{entity_long_abbr_map[entity_key]}-{value}'
-        if value not in values:
-            values.append(value)
+            match = p.search(filename.stem)
+            value = match.group(1)
+            if with_key:
+                value = f'{entity_long_abbr_map[entity_key]}-{value}'
+            if value not in values:
+                values.append(value)
+            # a single file is enough to keep the value
+            break
     return sorted(values)
 
 
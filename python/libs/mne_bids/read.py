@@ -219,8 +219,11 @@ def _handle_participants_reading(participants_fname, raw, subject):
     return raw
 
 
-def _handle_scans_reading(scans_fname, raw, bids_path):
-    """Read associated scans.tsv and set meas_date."""
+def _read_acq_time(scans_fname, bids_path):
+    """Read the acquisition time of a recording in its scans.tsv.
+
+    Returns ``None`` if the acquisition time is not available (``n/a``).
+    """
     scans_tsv = _from_tsv(scans_fname)
     fname = bids_path.fpath.name
 
@@ -257,14 +260,21 @@ def _handle_scans_reading(scans_fname, raw, bids_path):
 
     # extract the acquisition time from scans file
     acq_time = acq_times[row_ind]
-    if acq_time != 'n/a':
-        # microseconds in the acquisition time is optional
-        if '.' not in acq_time:
-            # acquisition time ends with '.%fZ' microseconds string
-            acq_time += '.0Z'
-        acq_time = datetime.strptime(acq_time, '%Y-%m-%dT%H:%M:%S.%fZ')
-        acq_time = acq_time.replace(tzinfo=timezone.utc)
+    if acq_time == 'n/a':
+        return None
 
+    # microseconds in the acquisition time is optional
+    if '.' not in acq_time:
+        # acquisition time ends with '.%fZ' microseconds string
+        acq_time += '.0Z'
+    acq_time = datetime.strptime(acq_time, '%Y-%m-%dT%H:%M:%S.%fZ')
+    return acq_time.replace(tzinfo=timezone.utc)
+
+
+def _handle_scans_reading(scans_fname, raw, bids_path):
+    """Read associated scans.tsv and set meas_date."""
+    acq_time = _read_acq_time(scans_fname, bids_path)
+    if acq_time is not None:
         logger.debug(f'Loaded {scans_fname} scans file to set '
                      f'acq_time as {acq_time}.')
         # First set measurement date to None and then call call anonymize() to
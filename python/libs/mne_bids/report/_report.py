@@ -3,8 +3,13 @@
 #
 # License: BSD-3-Clause
 import json
+import os
 import os.path as op
 import textwrap
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
 from pathlib import Path
 
 import numpy as np
@@ -16,8 +21,17 @@ from mne_bids.tsv_handler import _from_tsv
 from mne_bids.path import (get_bids_path_from_fname, get_datatypes,
                            get_entity_vals, BIDSPath,
                            _parse_ext, _find_matching_sidecar)
+from mne_bids._index import _get_index
 
 
+# number of threads reading the files of the dataset
+_N_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+
+# number of files whose contribution to the report is cached, see _cached
+_MAX_CONTRIBUTIONS = 100000
+_contributions = OrderedDict()
+_contributions_lock = threading.Lock()
+
 jinja_env = jinja2.Environment(
     loader=jinja2.PackageLoader(
         package_name='mne_bids.report',
@@ -183,7 +197,7 @@ def _summarize_participants_tsv(root):
     if not op.exists(participants_tsv_fpath):
         return dict()
 
-    participants_tsv = _from_tsv(str(participants_tsv_fpath))
+    participants_tsv = _cached(participants_tsv_fpath, _from_tsv)
     p_ids = participants_tsv['participant_id']
     logger.info(f'Summarizing participants.tsv {participants_tsv_fpath}...')
 
@@ -236,6 +250,118 @@ def _summarize_participants_tsv(root):
     return template_dict
 
 
+def _cached(fname, read):
+    """Get what ``read`` extracts from a file, read again only if changed.
+
+    The contributions of the files to the report are cached by path, and
+    reused as long as the modification time and size of the file are
+    unchanged, so that the report of a dataset is only updated with the
+    files added or changed since the previous one.
+    """
+    fname = str(fname)
+    stat = os.stat(fname)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (fname, read.__name__)
+    with _contributions_lock:
+        cached = _contributions.get(key)
+        if cached is not None and cached[0] == signature:
+            _contributions.move_to_end(key)
+            return cached[1]
+
+    value = read(fname)
+    with _contributions_lock:
+        _contributions[key] = (signature, value)
+        while len(_contributions) > _MAX_CONTRIBUTIONS:
+            _contributions.popitem(last=False)
+    return value
+
+
+def _read_scans(fname):
+    return _from_tsv(fname)['filename']
+
+
+def _read_sidecar_json(fname):
+    with open(fname, 'r', encoding='utf-8-sig') as fin:
+        sidecar_json = json.load(fin)
+
+    # REQUIRED kwargs
+    sfreq = sidecar_json['SamplingFrequency']
+    powerlinefreq = str(sidecar_json['PowerLineFrequency'])
+    software_filters = sidecar_json.get('SoftwareFilters')
+    if not software_filters:
+        software_filters = 'n/a'
+
+    return {
+        'sfreq': str(np.round(sfreq, 2)),
+        'powerlinefreq': powerlinefreq,
+        'software_filters': software_filters,
+        # RECOMMENDED kwargs
+        'manufacturer': sidecar_json.get('Manufacturer', 'n/a'),
+        'record_duration': sidecar_json.get('RecordingDuration', 'n/a'),
+    }
+
+
+def _read_channels_tsv(fname):
+    channels_tsv = _from_tsv(fname)
+    return {
+        'n_chs': len(channels_tsv['name']),
+        'good': len([ch for ch in channels_tsv['status'] if ch == 'good']),
+        'bad': len([ch for ch in channels_tsv['status'] if ch == 'bad']),
+    }
+
+
+def _summarize_scan(root, scan):
+    """Get the contributions of a scan to the report.
+
+    Returns a dict with the ``datatype`` of the scan and, unless skipped,
+    the summary of its ``sidecar`` JSON and of its ``channels`` TSV.
+    """
+    contribution = {'datatype': op.dirname(scan), 'sidecar': None,
+                    'channels': None}
+    datatype = contribution['datatype']
+    if datatype not in ALLOWED_DATATYPES:
+        return contribution
+
+    # convert to BIDS Path
+    bids_path, _ = _parse_ext(scan)
+    if not isinstance(bids_path, BIDSPath):
+        bids_path = get_bids_path_from_fname(bids_path)
+    bids_path.root = root
+
+    # XXX: improve to allow emptyroom
+    if bids_path.subject == 'emptyroom':
+        return contribution
+
+    sidecar_fname = _find_matching_sidecar(bids_path=bids_path,
+                                           suffix=datatype,
+                                           extension='.json')
+    contribution['sidecar'] = _cached(sidecar_fname, _read_sidecar_json)
+
+    if datatype in ['meg', 'eeg', 'ieeg']:
+        channels_fname = _find_matching_sidecar(bids_path=bids_path,
+                                                suffix='channels',
+                                                extension='.tsv')
+        contribution['channels'] = _cached(channels_fname,
+                                           _read_channels_tsv)
+    return contribution
+
+
+def _summarize_scans_contributions(root, scans_fpaths):
+    """Get the contributions of every scan listed in the scans files.
+
+    The scans files, then the sidecars of their scans, are read in a single
+    pass across a thread pool. The contributions are in the order of the
+    scans in ``scans_fpaths``.
+    """
+    with ThreadPoolExecutor(max_workers=_N_WORKERS) as executor:
+        scans = list()
+        for scans_list in executor.map(
+                lambda fname: _cached(fname, _read_scans), scans_fpaths):
+            scans.extend(scans_list)
+        return list(executor.map(lambda scan: _summarize_scan(root, scan),
+                                 scans))
+
+
 def _summarize_scans(root, session=None):
     """Summarize scans in BIDS root directory.
 
@@ -260,7 +386,8 @@ def _summarize_scans(root, session=None):
     else:
         search_str = f'*ses-{session}' \
                      f'*_scans.tsv'
-    scans_fpaths = list(root.rglob(search_str))
+    scans_fpaths = [fpath for fpath in _get_index(root).files(suffix='scans')
+                    if fnmatch(fpath.name, search_str)]
     if len(scans_fpaths) == 0:
         warn('No *scans.tsv files found. Currently, '
              'we do not generate a report without the scans.tsv files.')
@@ -269,8 +396,9 @@ def _summarize_scans(root, session=None):
     logger.info(f'Summarizing scans.tsv files {scans_fpaths}...')
 
     # summarize sidecar.json, channels.tsv template
-    sidecar_dict = _summarize_sidecar_json(root, scans_fpaths)
-    channels_dict = _summarize_channels_tsv(root, scans_fpaths)
+    contributions = _summarize_scans_contributions(root, scans_fpaths)
+    sidecar_dict = _summarize_sidecar_json(root, scans_fpaths, contributions)
+    channels_dict = _summarize_channels_tsv(root, scans_fpaths, contributions)
     template_dict = dict()
     template_dict.update(**sidecar_dict)
     template_dict.update(**channels_dict)
@@ -278,7 +406,7 @@ def _summarize_scans(root, session=None):
     return template_dict
 
 
-def _summarize_sidecar_json(root, scans_fpaths):
+def _summarize_sidecar_json(root, scans_fpaths, contributions=None):
     """Summarize scans in BIDS root directory.
 
     Parameters
@@ -288,6 +416,9 @@ def _summarize_sidecar_json(root, scans_fpaths):
     scans_fpaths : list
         A list of all *_scans.tsv files in ``root``. The summary
         will occur for all scans listed in the *_scans.tsv files.
+    contributions : list | None
+        The contributions of the scans, see
+        ``_summarize_scans_contributions``. Read if None.
 
     Returns
     -------
@@ -295,58 +426,31 @@ def _summarize_sidecar_json(root, scans_fpaths):
         A dictionary of values for various template strings.
 
     """
+    if contributions is None:
+        contributions = _summarize_scans_contributions(root, scans_fpaths)
+
     n_scans = 0
     powerlinefreqs, sfreqs = set(), set()
     manufacturers = set()
     length_recordings = []
+    software_filters = 'n/a'
+
+    # aggregate metadata from each scan
+    for contribution in contributions:
+        if contribution['datatype'] not in ALLOWED_DATATYPES:
+            continue
+
+        n_scans += 1
+        sidecar = contribution['sidecar']
+        if sidecar is None:
+            continue
 
-    # loop through each scan
-    for scan_fpath in scans_fpaths:
-        # load in the scans.tsv file
-        # and read metadata for each scan
-        scans_tsv = _from_tsv(scan_fpath)
-        scans = scans_tsv['filename']
-        for scan in scans:
-            # summarize metadata of recordings
-            bids_path, ext = _parse_ext(scan)
-            datatype = op.dirname(scan)
-            if datatype not in ALLOWED_DATATYPES:
-                continue
-
-            n_scans += 1
-
-            # convert to BIDS Path
-            if not isinstance(bids_path, BIDSPath):
-                bids_path = get_bids_path_from_fname(bids_path)
-            bids_path.root = root
-
-            # XXX: improve to allow emptyroom
-            if bids_path.subject == 'emptyroom':
-                continue
-
-            sidecar_fname = _find_matching_sidecar(bids_path=bids_path,
-                                                   suffix=datatype,
-                                                   extension='.json')
-            with open(sidecar_fname, 'r', encoding='utf-8-sig') as fin:
-                sidecar_json = json.load(fin)
-
-            # aggregate metadata from each scan
-            # REQUIRED kwargs
-            sfreq = sidecar_json['SamplingFrequency']
-            powerlinefreq = str(sidecar_json['PowerLineFrequency'])
-            software_filters = sidecar_json.get('SoftwareFilters')
-            if not software_filters:
-                software_filters = 'n/a'
-
-            # RECOMMENDED kwargs
-            manufacturer = sidecar_json.get('Manufacturer', 'n/a')
-            record_duration = sidecar_json.get('RecordingDuration', 'n/a')
-
-            sfreqs.add(str(np.round(sfreq, 2)))
-            powerlinefreqs.add(str(powerlinefreq))
-            if manufacturer != 'n/a':
-                manufacturers.add(manufacturer)
-            length_recordings.append(record_duration)
+        software_filters = sidecar['software_filters']
+        sfreqs.add(sidecar['sfreq'])
+        powerlinefreqs.add(sidecar['powerlinefreq'])
+        if sidecar['manufacturer'] != 'n/a':
+            manufacturers.add(sidecar['manufacturer'])
+        length_recordings.append(sidecar['record_duration'])
 
     # XXX: length summary is only allowed, if no 'n/a' was found
     if any([dur == 'n/a' for dur in length_recordings]):
@@ -363,7 +467,7 @@ def _summarize_sidecar_json(root, scans_fpaths):
     return template_dict
 
 
-def _summarize_channels_tsv(root, scans_fpaths):
+def _summarize_channels_tsv(root, scans_fpaths, contributions=None):
     """Summarize channels.tsv data in BIDS root directory.
 
     Currently, summarizes all REQUIRED components of channels
@@ -376,51 +480,30 @@ def _summarize_channels_tsv(root, scans_fpaths):
     scans_fpaths : list
         A list of all *_scans.tsv files in ``root``. The summary
         will occur for all scans listed in the *_scans.tsv files.
+    contributions : list | None
+        The contributions of the scans, see
+        ``_summarize_scans_contributions``. Read if None.
 
     Returns
     -------
     template_dict : dict
         A dictionary of values for various template strings.
     """
-    root = Path(root)
+    if contributions is None:
+        contributions = _summarize_scans_contributions(root, scans_fpaths)
 
     # keep track of channel type, status
     ch_status_count = {'bad': [], 'good': []}
     ch_count = []
 
-    # loop through each scan
-    for scan_fpath in scans_fpaths:
-        # load in the scans.tsv file
-        # and read metadata for each scan
-        scans_tsv = _from_tsv(scan_fpath)
-        scans = scans_tsv['filename']
-        for scan in scans:
-            # summarize metadata of recordings
-            bids_path, _ = _parse_ext(scan)
-            datatype = op.dirname(scan)
-            if datatype not in ['meg', 'eeg', 'ieeg']:
-                continue
-
-            # convert to BIDS Path
-            if not isinstance(bids_path, BIDSPath):
-                bids_path = get_bids_path_from_fname(bids_path)
-            bids_path.root = root
-
-            # XXX: improve to allow emptyroom
-            if bids_path.subject == 'emptyroom':
-                continue
-
-            channels_fname = _find_matching_sidecar(bids_path=bids_path,
-                                                    suffix='channels',
-                                                    extension='.tsv')
-
-            # summarize channels.tsv
-            channels_tsv = _from_tsv(channels_fname)
-            for status in ch_status_count.keys():
-                ch_status = [ch for ch in channels_tsv['status']
-                             if ch == status]
-                ch_status_count[status].append(len(ch_status))
-            ch_count.append(len(channels_tsv['name']))
+    for contribution in contributions:
+        channels = contribution['channels']
+        if channels is None:
+            continue
+
+        for status in ch_status_count.keys():
+            ch_status_count[status].append(channels[status])
+        ch_count.append(channels['n_chs'])
 
     # create summary template strings for status
     template_dict = {
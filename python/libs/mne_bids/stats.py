@@ -4,9 +4,75 @@
 #
 # License: BSD-3-Clause
 
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from mne_bids import BIDSPath, get_datatypes
 from mne_bids.config import EPHY_ALLOWED_DATATYPES
+from mne_bids.tsv_handler import _tsv_header
+
+# Files counted in parallel, and rows of an events file read at a time: the
+# memory used does not depend on the number of events.
+_N_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+_CHUNK_SIZE = 100000
+
+
+def _count_trial_types(fname):
+    """Count the events of an events.tsv file by trial type.
+
+    The file is read in chunks of ``_CHUNK_SIZE`` rows, and only its
+    ``trial_type`` (or ``stim_type``) column.
+
+    Returns
+    -------
+    counts : dict | None
+        The number of events of each trial type, like
+        ``pandas.read_csv`` would parse them, or ``None`` if the file has
+        no trial type column.
+    n_events : int
+        The number of events in the file.
+    """
+    import pandas as pd
+
+    columns = _tsv_header(fname)
+    column = None
+    if 'trial_type' in columns:
+        column = 'trial_type'
+    elif 'stim_type' in columns:
+        # Deal with some old files that use stim_type rather than
+        # trial_type
+        column = 'stim_type'
+
+    counts = Counter()
+    n_events = 0
+    has_na = False
+    # The values are read as str: a type inferred for each chunk could
+    # differ from one chunk to the next.
+    reader = pd.read_csv(fname, delimiter='\t', dtype=str,
+                         usecols=[column or columns[0]],
+                         chunksize=_CHUNK_SIZE)
+    for chunk in reader:
+        n_events += len(chunk)
+        if column is not None:
+            values = chunk[column]
+            has_na = has_na or values.isna().any()
+            counts.update(values.value_counts().to_dict())
+
+    if column is None:
+        return None, n_events
+
+    # Parse the trial types of the whole file as pandas.read_csv would,
+    # different strings can parse to the same trial type (e.g., 1 and 1.0)
+    trial_types = pd.Index(list(counts), dtype=object)
+    try:
+        trial_types = pd.to_numeric(trial_types)
+        if has_na:
+            trial_types = trial_types.astype(float)
+    except (ValueError, TypeError):
+        pass
+    counts = pd.Series(list(counts.values()), index=trial_types)
+    return counts.groupby(level=0).sum().to_dict(), n_events
 
 
 def count_events(root_or_path, datatype='auto'):
@@ -63,44 +129,59 @@ def count_events(root_or_path, datatype='auto'):
 
     bids_path.update(datatype=datatype)
 
-    tasks = sorted(set([bp.task for bp in bids_path.match()]))
+    matches = bids_path.match()
+    tasks = sorted(set([bp.task for bp in matches]))
+
+    # Each events file is read once, the rows below hold the counts of
+    # its trial types and are grouped like the events themselves would be.
+    with ThreadPoolExecutor(max_workers=_N_WORKERS) as executor:
+        file_counts = list(executor.map(
+            _count_trial_types, [str(bp) for bp in matches]))
 
     all_counts = []
 
     for task in tasks:
-        bids_path.update(task=task)
-
-        all_df = []
-        for bp in bids_path.match():
-            df = pd.read_csv(str(bp), delimiter='\t')
-            df['subject'] = bp.subject
-            if bp.session is not None:
-                df['session'] = bp.session
-            if bp.run is not None:
-                df['run'] = bp.run
-            all_df.append(df)
+        task_matches = [(bp, counts) for bp, counts
+                        in zip(matches, file_counts) if bp.task == task]
 
-        if not all_df:
+        if not task_matches:
             continue
 
-        df = pd.concat(all_df)
+        # The events of files without a trial type are counted under the
+        # 'n/a' trial type when other files of the task have one
+        has_trial_type = any(counts is not None
+                             for _, (counts, _) in task_matches)
+
+        rows = []
+        for bp, (counts, n_events) in task_matches:
+            entities = dict(subject=bp.subject)
+            if bp.session is not None:
+                entities['session'] = bp.session
+            if bp.run is not None:
+                entities['run'] = bp.run
+
+            if counts is None:
+                if has_trial_type:
+                    entities['trial_type'] = 'n/a'
+                rows.append(dict(entities, count=n_events))
+                continue
+            rows.extend(dict(entities, trial_type=trial_type, count=count)
+                        for trial_type, count in counts.items())
+
+        df = pd.DataFrame(rows, columns=['subject', 'session', 'run',
+                                         'trial_type', 'count'])
         groups = ['subject']
         if bp.session is not None:
             groups.append('session')
         if bp.run is not None:
             groups.append('run')
 
-        if 'stim_type' in df.columns:
-            # Deal with some old files that use stim_type rather than
-            # trial_type
-            df = df.rename(columns={"stim_type": "trial_type"})
-
         # There are datasets out there without a `trial_type` or `stim_type`
         # column.
-        if 'trial_type' in df.columns:
+        if has_trial_type:
             groups.append('trial_type')
 
-        counts = df.groupby(groups).size()
+        counts = df.groupby(groups)['count'].sum()
         counts = counts.unstack()
 
         if 'BAD_ACQ_SKIP' in counts.columns:
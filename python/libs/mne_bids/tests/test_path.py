@@ -23,6 +23,7 @@ from mne_bids.path import (_parse_ext, get_entities_from_fname,
                            _filter_fnames, search_folder_for_text,
                            get_bids_path_from_fname)
 from mne_bids.config import ALLOWED_PATH_ENTITIES_SHORT
+from mne_bids._index import _INDEX_FNAME, _clear_indexes, _get_index
 
 from test_read import _read_raw_fif, warning_str
 
@@ -844,6 +845,142 @@ def test_match(return_bids_test_dir):
     assert bids_path_01.match(check=False)[0].fpath.name == 'sub-01_foo.eeg'
 
 
+def _make_index_tree(root, n_subjects=3):
+    """Write empty files of a small iEEG dataset, with old mtimes."""
+    for sub in range(1, n_subjects + 1):
+        directory = root / f'sub-{sub:02d}' / 'ses-01' / 'ieeg'
+        directory.mkdir(parents=True)
+        (directory.parent / f'sub-{sub:02d}_ses-01_scans.tsv').touch()
+        for run in (1, 2):
+            basename = f'sub-{sub:02d}_ses-01_task-rest_run-{run:02d}'
+            for suffix in ('ieeg.edf', 'ieeg.json', 'channels.tsv'):
+                (directory / f'{basename}_{suffix}').touch()
+    (root / 'derivatives' / 'sub-01').mkdir(parents=True)
+    (root / 'derivatives' / 'sub-01' / 'sub-01_task-other_ieeg.edf').touch()
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (1e9, 1e9))
+
+
+def test_index_matches_filesystem(tmp_path):
+    """Test the lookups answered from the index against the filesystem."""
+    _make_index_tree(tmp_path)
+
+    paths = BIDSPath(root=tmp_path, subject='02', datatype='ieeg').match()
+    assert [p.basename for p in paths] == [
+        'sub-02_ses-01_task-rest_run-01_channels.tsv',
+        'sub-02_ses-01_task-rest_run-01_ieeg.edf',
+        'sub-02_ses-01_task-rest_run-02_channels.tsv',
+        'sub-02_ses-01_task-rest_run-02_ieeg.edf',
+    ]
+    assert len(BIDSPath(root=tmp_path, run='02', suffix='ieeg').match()) == 3
+
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '02', '03']
+    assert get_entity_vals(tmp_path, 'task') == ['rest']
+    assert get_entity_vals(tmp_path, 'task', ignore_dirs=None) == [
+        'other', 'rest']
+    assert get_entity_vals(tmp_path, 'run', ignore_subjects=None,
+                           with_key=True) == ['run-01', 'run-02']
+    assert get_datatypes(tmp_path) == ['ieeg']
+
+    bids_path = BIDSPath(subject='03', session='01', task='rest', run='01',
+                         suffix='ieeg', extension='.edf', root=tmp_path)
+    sidecar = _find_matching_sidecar(bids_path, suffix='channels',
+                                     extension='.tsv')
+    assert Path(sidecar).name == 'sub-03_ses-01_task-rest_run-01_channels.tsv'
+
+
+def test_index_follows_changes(tmp_path):
+    """Test that the index sees the files written, renamed and removed."""
+    _make_index_tree(tmp_path)
+    index = _get_index(tmp_path)
+    ieeg_dir = tmp_path / 'sub-01' / 'ses-01' / 'ieeg'
+    bids_path = BIDSPath(subject='01', session='01', task='rest', run='01',
+                         suffix='ieeg', extension='.edf', root=tmp_path)
+    assert _find_matching_sidecar(bids_path, suffix='events',
+                                  extension='.tsv', on_error='ignore') is None
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '02', '03']
+
+    # a file written in an indexed directory, seen once given to update
+    events = ieeg_dir / 'sub-01_ses-01_task-rest_run-01_events.tsv'
+    events.touch()
+    assert _find_matching_sidecar(bids_path, suffix='events',
+                                  extension='.tsv', on_error='ignore') is None
+    index.update([events])
+    assert _find_matching_sidecar(bids_path, suffix='events',
+                                  extension='.tsv') == str(events)
+
+    # renamed, then removed
+    renamed = events.with_name('sub-01_ses-01_task-rest_run-02_events.tsv')
+    events.rename(renamed)
+    index.update([events, renamed])
+    assert _find_matching_sidecar(bids_path, suffix='events',
+                                  extension='.tsv', on_error='ignore') is None
+    assert [p.run for p in BIDSPath(root=tmp_path, subject='01',
+                                    suffix='events').match()] == ['02']
+    renamed.unlink()
+    index.update([renamed])
+    assert BIDSPath(root=tmp_path, suffix='events').match() == []
+
+    # a new subject, and a removed one, seen once refreshed
+    new_dir = tmp_path / 'sub-04' / 'ses-01' / 'eeg'
+    new_dir.mkdir(parents=True)
+    (new_dir / 'sub-04_ses-01_task-rest_eeg.edf').touch()
+    shutil.rmtree(tmp_path / 'sub-02')
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '02', '03']
+    index.refresh()
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '03', '04']
+    assert sorted(get_datatypes(tmp_path)) == ['eeg', 'ieeg']
+
+    # a new directory given to update is listed from its closest parent
+    new_dir = tmp_path / 'sub-05' / 'ses-01' / 'eeg'
+    new_dir.mkdir(parents=True)
+    (new_dir / 'sub-05_ses-01_task-rest_eeg.edf').touch()
+    index.update([new_dir / 'sub-05_ses-01_task-rest_eeg.edf'])
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '03', '04', '05']
+
+
+def test_index_persistent(tmp_path):
+    """Test the index stored in the root."""
+    _make_index_tree(tmp_path)
+    edf = tmp_path / 'sub-01' / 'ses-01' / 'ieeg' / \
+        'sub-01_ses-01_task-rest_run-01_ieeg.edf'
+    _clear_indexes()
+    assert not _get_index(tmp_path).persistent
+    index = _get_index(tmp_path, persistent=True)
+    assert (tmp_path / _INDEX_FNAME).is_file()
+    index.update([edf], {edf: 'abc'})
+
+    # loaded back once forgotten, without the index file itself
+    _clear_indexes()
+    index = _get_index(tmp_path)
+    assert index.persistent
+    assert _INDEX_FNAME not in [p.name for p in index.files()]
+    records = index.records(datatype='ieeg', suffix='ieeg', extension='.edf',
+                            subject_prefix='0')
+    assert [(r['sub'], r['run']) for r in records] == [
+        ('01', '01'), ('01', '02'), ('02', '01'), ('02', '02'),
+        ('03', '01'), ('03', '02')]
+    assert records[0]['path'] == edf
+    assert records[0]['size'] == 0
+    assert records[0]['hash'] == 'abc'
+    assert records[1]['hash'] is None
+    assert index.records(subject_prefix='04') == []
+
+    # the hash of a file rewritten in place is forgotten
+    edf.write_bytes(b'0')
+    index.update([edf])
+    _clear_indexes()
+    record = _get_index(tmp_path).records(sub='01', run='01',
+                                          suffix='ieeg')[0]
+    assert (record['size'], record['hash']) == (1, None)
+
+    # changes made while the index was not loaded are seen
+    shutil.rmtree(tmp_path / 'sub-03')
+    _clear_indexes()
+    assert get_entity_vals(tmp_path, 'subject') == ['01', '02']
+    _clear_indexes()
+
+
 @pytest.mark.filterwarnings(warning_str['meas_date_set_to_none'])
 @pytest.mark.filterwarnings(warning_str['channel_unit_changed'])
 def test_find_empty_room(return_bids_test_dir, tmp_path):
@@ -2,8 +2,10 @@
 # Authors: Adam Li <adam2392@gmail.com>
 #
 # License: BSD-3-Clause
+import json
 import os.path as op
 import textwrap
+from functools import wraps
 
 import mne
 import pytest
@@ -13,6 +15,7 @@ from mne_bids import (BIDSPath,
                       make_report)
 from mne_bids.write import write_raw_bids
 from mne_bids.config import BIDS_VERSION
+from mne_bids.report import _report
 
 
 subject_id = '01'
@@ -96,3 +99,52 @@ analysis (2.0 +/- 0.0 were removed from analysis)."""  # noqa
 
     expected_report = '\n'.join(textwrap.wrap(expected_report, width=80))
     assert report == expected_report
+
+
+def _write_scan(bids_root, subject, session, n_bad):
+    """Write the sidecars and scans.tsv of an iEEG scan without its data."""
+    ieeg_dir = bids_root / f'sub-{subject}' / f'ses-{session}' / 'ieeg'
+    ieeg_dir.mkdir(parents=True)
+    basename = f'sub-{subject}_ses-{session}_task-rest'
+    (ieeg_dir / f'{basename}_ieeg.edf').touch()
+    sidecar = dict(SamplingFrequency=1000, PowerLineFrequency=60,
+                   Manufacturer='Natus', RecordingDuration=10)
+    (ieeg_dir / f'{basename}_ieeg.json').write_text(json.dumps(sidecar))
+    status = ['bad'] * n_bad + ['good'] * (4 - n_bad)
+    (ieeg_dir / f'{basename}_channels.tsv').write_text(
+        'name\ttype\tstatus\n' +
+        ''.join(f'C{idx}\tSEEG\t{val}\n' for idx, val in enumerate(status)))
+    (ieeg_dir.parent / f'sub-{subject}_ses-{session}_scans.tsv').write_text(
+        f'filename\tacq_time\nieeg/{basename}_ieeg.edf\tn/a\n')
+
+
+def test_report_incremental(tmp_path, monkeypatch):
+    """Test that only the files added since the last report are read."""
+    reads = list()
+    read_sidecar_json = _report._read_sidecar_json
+
+    @wraps(read_sidecar_json)
+    def _read_sidecar_json(fname):
+        reads.append(fname)
+        return read_sidecar_json(fname)
+
+    monkeypatch.setattr(_report, '_read_sidecar_json', _read_sidecar_json)
+    for subject in ('01', '02', '03'):
+        _write_scan(tmp_path, subject, '01', n_bad=0)
+
+    summary = _report._summarize_scans(tmp_path)
+    assert summary['n_scans'] == 3
+    assert summary['mean_chs'] == 4
+    assert summary['mean_bad_chs'] == 0
+    assert summary['sfreq'] == '1000'
+    assert len(reads) == 3
+
+    # a new session only reads its own sidecars
+    _write_scan(tmp_path, '01', '02', n_bad=4)
+    summary = _report._summarize_scans(tmp_path)
+    assert summary['n_scans'] == 4
+    assert summary['mean_bad_chs'] == 1
+    assert len(reads) == 4
+    assert reads[-1].endswith('sub-01_ses-02_task-rest_ieeg.json')
+    assert _report._summarize_scans(tmp_path, session='02')['n_scans'] == 1
+    assert len(reads) == 4
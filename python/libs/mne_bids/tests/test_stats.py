@@ -4,6 +4,7 @@
 # License: BSD-3-Clause
 
 
+from collections import OrderedDict
 from pathlib import Path
 import itertools
 
@@ -15,6 +16,7 @@ from mne.utils import requires_pandas
 from mne.datasets import testing
 
 from mne_bids import BIDSPath, write_raw_bids
+from mne_bids import stats
 from mne_bids.stats import count_events
 from mne_bids.read import _from_tsv
 from mne_bids.write import _write_tsv
@@ -149,3 +151,75 @@ def test_count_no_events_column(tmp_path):
     counts = count_events(root)
     _check_counts(counts, events, event_id, [subject], [task], [run],
                   [session])
+
+
+@requires_pandas
+def test_count_events_chunks(tmp_path, monkeypatch):
+    """Test counting events files read in several chunks."""
+    monkeypatch.setattr(stats, '_CHUNK_SIZE', 7)
+    trial_types = ['go', 'stop', 'n/a', 'stop', 'BAD_ACQ_SKIP'] * 5
+    for subject, run in itertools.product(['01', '02'], ['01', '02']):
+        bids_path = BIDSPath(root=tmp_path, subject=subject, task='task1',
+                             run=run, datatype='eeg', suffix='events',
+                             extension='.tsv')
+        bids_path.mkdir()
+        run_trial_types = trial_types[int(run) - 1:]
+        _write_tsv(fname=bids_path.fpath, dictionary=OrderedDict(
+            onset=[str(onset) for onset in range(len(run_trial_types))],
+            duration=['0'] * len(run_trial_types),
+            trial_type=run_trial_types))
+
+    counts = count_events(tmp_path)
+    assert list(counts.index) == [('01', '01'), ('01', '02'),
+                                  ('02', '01'), ('02', '02')]
+    assert list(counts.columns) == [('task1', 'go'), ('task1', 'stop')]
+    assert counts[('task1', 'go')].tolist() == [5, 4, 5, 4]
+    assert counts[('task1', 'stop')].tolist() == [10, 10, 10, 10]
+
+    # numeric trial types are parsed like pandas.read_csv would parse them
+    bids_path.update(subject='03', run=None)
+    bids_path.mkdir()
+    _write_tsv(fname=bids_path.fpath, dictionary=OrderedDict(
+        onset=['0', '1', '2'], duration=['0'] * 3,
+        trial_type=['1', '2', '1']))
+    counts = count_events(bids_path)
+    assert list(counts.columns) == [('task1', 1), ('task1', 2)]
+    assert counts.loc['03'].tolist() == [2, 1]
+
+    # different strings of the same numeric trial type are counted together
+    bids_path.update(subject='04')
+    bids_path.mkdir()
+    _write_tsv(fname=bids_path.fpath, dictionary=OrderedDict(
+        onset=['0', '1', '2', '3'], duration=['0'] * 4,
+        trial_type=['1', '1.0', '1', '01']))
+    counts = count_events(bids_path)
+    assert list(counts.columns) == [('task1', 1.0)]
+    assert counts.loc['04'].tolist() == [4]
+
+
+def test_count_events_mixed_trial_type(tmp_path):
+    """Test counting events files with and without a trial type."""
+    def _write_events(subject, columns):
+        bids_path = BIDSPath(root=tmp_path, subject=subject, task='task1',
+                             datatype='eeg', suffix='events',
+                             extension='.tsv')
+        bids_path.mkdir()
+        events = OrderedDict(onset=['0', '1', '2'], duration=['0'] * 3)
+        for column in columns:
+            events[column] = ['go', 'stop', 'go']
+        _write_tsv(fname=bids_path.fpath, dictionary=events)
+
+    # trial_type and stim_type files are counted together
+    _write_events('01', ['trial_type'])
+    _write_events('02', ['stim_type'])
+    counts = count_events(tmp_path)
+    assert list(counts.columns) == [('task1', 'go'), ('task1', 'stop')]
+    assert counts[('task1', 'go')].tolist() == [2, 2]
+
+    # the events of a file without a trial type are counted as n/a
+    _write_events('03', [])
+    counts = count_events(tmp_path)
+    assert list(counts.columns) == [('task1', 'go'), ('task1', 'n/a'),
+                                    ('task1', 'stop')]
+    assert counts[('task1', 'n/a')].fillna(0).tolist() == [0, 0, 3]
+    assert counts.sum().sum() == 9
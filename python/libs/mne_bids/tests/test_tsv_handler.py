@@ -4,12 +4,18 @@
 # License: BSD-3-Clause
 
 
+import os
+import os.path as op
+import threading
 from collections import OrderedDict as odict
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
 from mne_bids.tsv_handler import (_from_tsv, _to_tsv, _combine_rows, _drop,
-                                  _contains_row, _tsv_to_str)
+                                  _contains_row, _tsv_to_str, _tsv_header,
+                                  _find_row, _upsert_row, _tsv_lock,
+                                  _lock_fname, _remove_tsv_locks)
 
 
 def test_tsv_handler(tmp_path):
@@ -63,6 +69,108 @@ def test_tsv_handler(tmp_path):
     d = _from_tsv(d_path)
     assert d['a'] == ['1', '2', '3', '4']
 
+    # test reading typed columns by name
+    _to_tsv(odict(a=[1, 2], b=['1.5', 'n/a']), d_path)
+    d = _from_tsv(d_path, dtypes={'a': int})
+    assert d == odict(a=[1, 2], b=['1.5', 'n/a'])
+    assert _tsv_header(d_path) == ['a', 'b']
+
+    # test reading rows of different lengths raises an Error
+    d_path.write_text('a\tb\n1\t2\t3\n')
+    with pytest.raises(ValueError, match='number of columns'):
+        _from_tsv(d_path)
+
+
+def test_upsert_row(tmp_path):
+    """Test that rows are updated in place like _combine_rows would."""
+    d_path = tmp_path / 'participants.tsv'
+    d = odict(participant_id=['sub-01', 'sub-03'], age=['20', '30'])
+    _to_tsv(d, d_path)
+
+    rows = [dict(participant_id='sub-04', age=40),  # appended
+            dict(participant_id='sub-02'),  # inserted
+            dict(participant_id='sub-01', age=21),  # replaced
+            dict(participant_id='sub-00', age=0)]
+    for row in rows:
+        assert _upsert_row(d_path, row, 'participant_id')
+        d = _combine_rows(d, odict((key, [str(val)])
+                                   for key, val in row.items()),
+                          drop_column='participant_id')
+        assert _from_tsv(d_path) == d
+
+    assert _find_row(d_path, 'participant_id', 'sub-02') == \
+        dict(participant_id='sub-02', age='n/a')
+    assert _find_row(d_path, 'participant_id', 'sub-05') is None
+    assert _find_row(d_path, 'filename', 'sub-01') is None
+
+    # a row inserted replaces the file, a reader sees it whole or not at all
+    with open(d_path, 'r') as fid:
+        before = fid.read()
+        fid.seek(0)
+        assert _upsert_row(d_path, dict(participant_id='sub-015', age=15),
+                           'participant_id')
+        assert fid.read() == before
+    assert 'sub-015' in d_path.read_text()
+    assert os.listdir(tmp_path) == ['participants.tsv']
+
+    # new columns and unsorted files are left to _combine_rows
+    assert not _upsert_row(d_path, dict(participant_id='sub-05', hand='R'),
+                           'participant_id')
+    d_path.write_text('participant_id\tage\nsub-02\t2\nsub-01\t1\n')
+    assert not _upsert_row(d_path, dict(participant_id='sub-03'),
+                           'participant_id')
+    assert d_path.read_text() == 'participant_id\tage\nsub-02\t2\nsub-01\t1\n'
+
+
+def test_tsv_lock(tmp_path):
+    """Test concurrent row updates under the lock of the file."""
+    d_path = tmp_path / 'participants.tsv'
+    _to_tsv(odict(participant_id=['sub-000'], age=['n/a']), d_path)
+
+    def update(idx):
+        participant_id = f'sub-{idx:03d}'
+        with _tsv_lock(d_path):
+            assert _find_row(d_path, 'participant_id', participant_id) is None
+            assert _upsert_row(d_path, dict(participant_id=participant_id,
+                                            age=idx), 'participant_id')
+
+    # the lock file is removed while the updates wait for it
+    updated = threading.Event()
+
+    def remove_locks():
+        while not updated.is_set():
+            _remove_tsv_locks([tmp_path])
+
+    remover = threading.Thread(target=remove_locks)
+    remover.start()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(update, range(1, 101)))
+    updated.set()
+    remover.join()
+    d = _from_tsv(d_path)
+    assert d['participant_id'] == [f'sub-{idx:03d}' for idx in range(101)]
+    assert d['age'][1:] == [str(idx) for idx in range(1, 101)]
+
+    # the lock file is next to the tsv file, and is not removed while held
+    assert _lock_fname(d_path) == str(tmp_path / '.participants.tsv.lock')
+    with _tsv_lock(d_path):
+        assert op.isfile(_lock_fname(d_path))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(_remove_tsv_locks, [tmp_path]).result() \
+                == []
+    assert _remove_tsv_locks([tmp_path]) == [_lock_fname(d_path)]
+    assert os.listdir(tmp_path) == ['participants.tsv']
+
+    # the index of the keys does not hide the changes made without the lock
+    with _tsv_lock(d_path):
+        _find_row(d_path, 'participant_id', 'sub-000')
+    d_path.write_text('participant_id\tage\nsub-200\t1\n')
+    with _tsv_lock(d_path):
+        assert _find_row(d_path, 'participant_id', 'sub-000') is None
+        assert _upsert_row(d_path, dict(participant_id='sub-101'),
+                           'participant_id')
+    assert _from_tsv(d_path)['participant_id'] == ['sub-101', 'sub-200']
+
 
 def test_contains_row_different_types():
     """Test that _contains_row() can handle different dtypes without warning.
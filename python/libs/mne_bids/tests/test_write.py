@@ -20,6 +20,8 @@ import shutil as sh
 import json
 from pathlib import Path
 import codecs
+import filecmp
+import itertools
 import warnings
 
 from pkg_resources import parse_version
@@ -334,6 +336,83 @@ def test_make_dataset_description(tmp_path, monkeypatch):
         make_dataset_description(path=tmp_path, name='tst')
 
 
+def test_make_dataset_description_extra_fields(tmp_path):
+    """Test extra fields of a dataset_description.json."""
+    make_dataset_description(path=tmp_path, name='tst',
+                             extra_fields={'PreparedBy': 'me'})
+    make_dataset_description(path=tmp_path, name='tst2', overwrite=False,
+                             extra_fields={'Name': 'tst3', 'PreparedBy': 'us'})
+
+    with open(op.join(tmp_path, 'dataset_description.json'), 'r',
+              encoding='utf-8') as fid:
+        dataset_description_json = json.load(fid)
+    assert dataset_description_json['Name'] == 'tst3'
+    assert dataset_description_json['PreparedBy'] == 'us'
+    assert list(dataset_description_json)[0] == 'Name'
+
+
+@pytest.mark.filterwarnings(warning_str['channel_unit_changed'])
+def test_write_sidecar_metadata(tmp_path):
+    """Test passing metadata to the generated sidecars."""
+    pytest.importorskip('EDFlib')
+    info = mne.create_info(['LA1', 'LA2'], 256., 'seeg')
+    raw = mne.io.RawArray(
+        np.random.default_rng(0).normal(0, 1e-5, (2, 2560)), info)
+    edf_fname = tmp_path / 'test_raw.edf'
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        raw.export(edf_fname)
+    raw = _read_raw_edf(edf_fname)
+    raw.set_channel_types({'LA1': 'seeg', 'LA2': 'seeg'})
+
+    sidecar_metadata = {
+        'readme': False,
+        'dataset_description': {'Name': 'test', 'PreparedBy': 'me'},
+        'participants': {'age': '30', 'sex': 'M', 'site': 'MTL'},
+        'participants_json': {'site': {'Description': 'Site'}},
+        'sidecar': {'iEEGReference': 'Cz', 'InstitutionName': 'MNI'},
+    }
+    bids_root = tmp_path / 'bids'
+    bids_path = _bids_path.copy().update(root=bids_root)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        write_raw_bids(raw, bids_path, sidecar_metadata=sidecar_metadata)
+
+    assert not (bids_root / 'README').exists()
+
+    with open(bids_root / 'dataset_description.json', encoding='utf-8') as f:
+        dataset_description_json = json.load(f)
+    assert dataset_description_json['Name'] == 'test'
+    assert dataset_description_json['PreparedBy'] == 'me'
+
+    data = _from_tsv(bids_root / 'participants.tsv')
+    assert list(data) == ['participant_id', 'age', 'sex', 'hand', 'site']
+    assert data['age'] == ['30']
+    assert data['sex'] == ['M']
+    assert data['site'] == ['MTL']
+
+    with open(bids_root / 'participants.json', encoding='utf-8') as f:
+        participants_json = json.load(f)
+    assert participants_json['site'] == {'Description': 'Site'}
+
+    sidecar_fname = bids_path.copy().update(
+        datatype='ieeg', suffix='ieeg', extension='.json').fpath
+    with open(sidecar_fname, encoding='utf-8') as f:
+        sidecar_json = json.load(f)
+    assert sidecar_json['iEEGReference'] == 'Cz'
+    assert sidecar_json['InstitutionName'] == 'MNI'
+    assert sidecar_json['SEEGChannelCount'] == 2
+
+    # the same subject metadata can be written again for another run
+    bids_path.update(run='02')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        write_raw_bids(raw, bids_path, sidecar_metadata=sidecar_metadata)
+    data = _from_tsv(bids_root / 'participants.tsv')
+    assert data['participant_id'] == ['sub-01']
+    assert data['site'] == ['MTL']
+
+
 def test_stamp_to_dt():
     """Test conversions of meas_date to datetime objects."""
     meas_date = (1346981585, 835782)
@@ -3611,3 +3690,40 @@ def test_anonymize_dataset_daysback(tmpdir):
         rng=np.random.default_rng(),
         show_progress_thresh=20
     )
+
+
+@pytest.mark.filterwarnings(warning_str['edf_warning'])
+def test_anonymize_dataset_n_jobs(tmpdir):
+    """Test anonymizing EDF recordings from their header, in parallel."""
+    from mne_bids.write import _get_meas_info
+
+    data_path = Path(testing.data_path())
+    raw = _read_raw_edf(data_path / 'EDF' / 'test_reduced.edf')
+    bids_root = tmpdir / 'bids'
+    for subject, run in itertools.product(['01', '02'], ['01', '02']):
+        bids_path = _bids_path.copy().update(
+            root=bids_root, subject=subject, run=run, datatype='eeg'
+        )
+        write_raw_bids(raw, bids_path=bids_path, verbose=False)
+
+    # The header holds the measurement date read_raw_bids reads
+    bids_path.update(suffix='eeg', extension='.edf')
+    meas_date = read_raw_bids(bids_path).info['meas_date']
+    assert _get_meas_info(bids_path)['meas_date'] == meas_date
+
+    anonymize_dataset(bids_root, tmpdir / 'serial', random_state=0)
+    anonymize_dataset(bids_root, tmpdir / 'parallel', random_state=0,
+                      n_jobs=2)
+    fnames = sorted(
+        op.relpath(fname, tmpdir / 'serial')
+        for fname in glob(str(tmpdir / 'serial' / '**'), recursive=True)
+        if op.isfile(fname)
+    )
+    assert fnames == sorted(
+        op.relpath(fname, tmpdir / 'parallel')
+        for fname in glob(str(tmpdir / 'parallel' / '**'), recursive=True)
+        if op.isfile(fname)
+    )
+    for fname in fnames:
+        assert filecmp.cmp(tmpdir / 'serial' / fname,
+                           tmpdir / 'parallel' / fname, shallow=False), fname
@@ -1,8 +1,27 @@
 """Private functions to handle tabular data."""
+import codecs
+import os
+import os.path as op
+import random
+import threading
 import numpy as np
+from bisect import bisect_left
 from collections import OrderedDict
+from contextlib import contextmanager
 from copy import deepcopy
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# the tsv files locked by each thread, see _tsv_lock
+_locks = threading.local()
+# (tsv file, key column) -> index of the keys of the file, see _key_index
+_key_indexes = dict()
+
 
 def _combine_rows(data1, data2, drop_column=None):
     """Add two OrderedDict's together and optionally drop repeated data.
@@ -120,13 +139,15 @@ def _drop(data, values, column):
 def _from_tsv(fname, dtypes=None):
     """Read a tsv file into an OrderedDict.
 
+    The file is parsed in a single pass, one column list per header field.
+
     Parameters
     ----------
     fname : str
         Path to the file being loaded.
-    dtypes : list, optional
+    dtypes : list | dict, optional
         List of types to cast the values loaded as. This is specified column by
-        column.
+        column, or as a dict of the types of some of the columns.
         Defaults to None. In this case all the data is loaded as strings.
 
     Returns
@@ -135,20 +156,38 @@ def _from_tsv(fname, dtypes=None):
         Keys are the column names, and values are the column data.
 
     """
-    data = np.loadtxt(fname, dtype=str, delimiter='\t', ndmin=2,
-                      comments=None, encoding='utf-8-sig')
-    column_names = data[0, :]
-    info = data[1:, :]
-    data_dict = OrderedDict()
+    with open(fname, 'r', encoding='utf-8-sig', newline='') as fid:
+        lines = [line.rstrip('\r') for line in fid.read().split('\n')]
+    lines = [line for line in lines if line]
+    if not lines:
+        raise ValueError(f'{fname} has no header')
+
+    column_names = lines[0].split('\t')
+    n_columns = len(column_names)
+    rows = [line.split('\t') for line in lines[1:]]
+    for idx, row in enumerate(rows, start=2):
+        if len(row) != n_columns:
+            raise ValueError(f'the number of columns changed from '
+                             f'{n_columns} to {len(row)} at row {idx}')
+
     if dtypes is None:
-        dtypes = [str] * info.shape[1]
+        dtypes = [str] * n_columns
+    if isinstance(dtypes, dict):
+        dtypes = [dtypes.get(name, str) for name in column_names]
     if not isinstance(dtypes, (list, tuple)):
-        dtypes = [dtypes] * info.shape[1]
-    if not len(dtypes) == info.shape[1]:
+        dtypes = [dtypes] * n_columns
+    if not len(dtypes) == n_columns:
         raise ValueError('dtypes length mismatch. Provided: {0}, '
-                         'Expected: {1}'.format(len(dtypes), info.shape[1]))
-    for i, name in enumerate(column_names):
-        data_dict[name] = info[:, i].astype(dtypes[i]).tolist()
+                         'Expected: {1}'.format(len(dtypes), n_columns))
+
+    columns = list(zip(*rows)) if rows else [()] * n_columns
+    data_dict = OrderedDict()
+    for name, column, dtype in zip(column_names, columns, dtypes):
+        if dtype is str:
+            data_dict[name] = list(column)
+        else:
+            data_dict[name] = np.array(column, dtype=str).astype(
+                dtype).tolist()
     return data_dict
 
 
@@ -163,12 +202,392 @@ def _to_tsv(data, fname):
         Path to the file being written.
 
     """
-    n_rows = len(data[list(data.keys())[0]])
-    output = _tsv_to_str(data, n_rows)
-
+    _forget_key_index(fname)
     with open(fname, 'w', encoding='utf-8-sig') as f:
-        f.write(output)
+        f.write('\t'.join(data.keys()))
         f.write('\n')
+        for row in zip(*data.values()):
+            f.write('\t'.join(str(value) for value in row))
+            f.write('\n')
+
+
+def _lock_fname(fname):
+    """Get the path of the advisory lock file of a tsv file.
+
+    The lock file is a hidden file next to the tsv file (e.g.
+    ``.participants.tsv.lock``), so that it is shared by all the hosts writing
+    the dataset, see ``_remove_tsv_locks``.
+    """
+    return op.join(op.dirname(fname), '.' + op.basename(fname) + '.lock')
+
+
+def _lock_file(fid, blocking=True):
+    """Lock an open lock file.
+
+    Returns False, without waiting, if ``blocking`` is False and another
+    writer holds the lock.
+    """
+    if fcntl is not None:
+        try:
+            fcntl.flock(fid.fileno(),
+                        fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    while True:  # pragma: no cover
+        try:
+            fid.seek(0)
+            msvcrt.locking(fid.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            if not blocking:
+                return False
+
+
+def _unlock_file(fid):
+    if fcntl is not None:
+        fcntl.flock(fid.fileno(), fcntl.LOCK_UN)
+    else:  # pragma: no cover
+        fid.seek(0)
+        msvcrt.locking(fid.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _is_current(fid, lock_fname):
+    """Check that a locked file is still the lock file at its path.
+
+    It is not when ``_remove_tsv_locks`` removed it while waiting for it.
+    """
+    try:
+        return os.path.samestat(os.fstat(fid.fileno()), os.stat(lock_fname))
+    except OSError:
+        return False
+
+
+def _remove_tsv_locks(directories):
+    """Remove the lock files of the tsv files of directories.
+
+    The lock files no writer holds are removed, under their lock: a writer
+    waiting for one of them takes the lock of a new lock file then.
+
+    Parameters
+    ----------
+    directories : list of path-like
+        The directories of the tsv files, e.g. the root and a session
+        directory of a dataset.
+
+    Returns
+    -------
+    removed : list of str
+        The paths of the lock files removed.
+    """
+    removed = list()
+    for directory in directories:
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            if not (name.startswith('.') and name.endswith('.tsv.lock')):
+                continue
+            lock_fname = op.join(directory, name)
+            try:
+                fid = open(lock_fname, 'r+b')
+            except OSError:
+                continue
+            with fid:
+                if not _lock_file(fid, blocking=False):
+                    continue
+                try:
+                    if _is_current(fid, lock_fname):
+                        os.remove(lock_fname)
+                        removed.append(lock_fname)
+                except OSError:
+                    # e.g. an open file cannot be removed on Windows.
+                    pass
+                finally:
+                    _unlock_file(fid)
+    return removed
+
+
+def _replace_bytes(fname, content):
+    """Replace a file with content, through a temporary file.
+
+    The readers not taking the lock of the file (see ``_tsv_lock``) never see
+    it partially written, as with ``mne_bids.utils._replace_text``.
+    """
+    fname = str(fname)
+    dirname, basename = op.split(fname)
+    temp_fname = op.join(dirname, f'.{basename}.{os.getpid()}.'
+                                  f'{threading.get_ident()}.tmp')
+    try:
+        with open(temp_fname, 'wb') as fid:
+            fid.write(content)
+        os.replace(temp_fname, fname)
+    finally:
+        if op.exists(temp_fname):
+            os.remove(temp_fname)
+
+
+def _held_locks():
+    """Get the tsv files locked by this thread, with their lock session."""
+    if not hasattr(_locks, 'held'):
+        _locks.held = dict()
+    return _locks.held
+
+
+@contextmanager
+def _tsv_lock(fname):
+    """Hold an advisory lock on a tsv file, for a read-modify-write.
+
+    The lock is taken on a hidden file next to the tsv file (see
+    ``_lock_fname``), which is kept while the dataset is written: it also
+    serializes the creation of the tsv file and the writers replacing it.
+    The lock file counts the sessions that held it, see ``_key_index``; the
+    count of a new lock file starts at random, so the sessions of a removed
+    one are not taken for its own. The lock is reentrant within a thread.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the tsv file.
+
+    """
+    fname = op.abspath(str(fname))
+    held = _held_locks()
+    if fname in held:
+        yield
+        return
+
+    lock_fname = _lock_fname(fname)
+    while True:
+        fid = os.fdopen(os.open(lock_fname, os.O_RDWR | os.O_CREAT), 'r+b')
+        _lock_file(fid)
+        if _is_current(fid, lock_fname):
+            break
+        _unlock_file(fid)
+        fid.close()
+
+    with fid:
+        try:
+            try:
+                session = int(fid.read()) + 1
+            except ValueError:
+                session = random.getrandbits(48)
+            fid.seek(0)
+            fid.truncate()
+            fid.write(str(session).encode('ascii'))
+            fid.flush()
+            held[fname] = session
+            try:
+                yield
+            finally:
+                del held[fname]
+        finally:
+            _unlock_file(fid)
+
+
+def _stat_signature(fname):
+    stat = os.stat(fname)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _key_index(fname, column):
+    """Get the index of the keys of a locked tsv file, if still valid.
+
+    The index (the header, the sorted keys in ``column`` and the line
+    endings of the file) is recorded by ``_find_row`` and ``_upsert_row``
+    while the file is locked. It stays valid in the lock session it was
+    recorded in and in the next one, when no other session changed the file,
+    and as long as the file was not replaced or resized (e.g. edited by
+    hand).
+    """
+    fname = op.abspath(str(fname))
+    session = _held_locks().get(fname)
+    index = _key_indexes.get((fname, column))
+    if session is None or index is None or \
+            index['session'] not in (session, session - 1):
+        return None
+    try:
+        if _stat_signature(fname) != index['stat']:
+            return None
+    except OSError:
+        return None
+    return index
+
+
+def _set_key_index(fname, column, column_names, keys, crlf,
+                   trailing_newline):
+    fname = op.abspath(str(fname))
+    session = _held_locks().get(fname)
+    if session is None:
+        return
+    _key_indexes[(fname, column)] = dict(
+        session=session, stat=_stat_signature(fname),
+        column_names=column_names, keys=keys, crlf=crlf,
+        trailing_newline=trailing_newline)
+
+
+def _forget_key_index(fname):
+    fname = op.abspath(str(fname))
+    for key in [key for key in _key_indexes if key[0] == fname]:
+        del _key_indexes[key]
+
+
+def _tsv_header(fname):
+    """Read the column names of a tsv file, without reading its rows."""
+    with open(fname, 'r', encoding='utf-8-sig', newline='') as fid:
+        return fid.readline().rstrip('\r\n').split('\t')
+
+
+def _find_row(fname, column, value):
+    """Find the row of a tsv file holding ``value`` in ``column``.
+
+    When the file is locked (see ``_tsv_lock``) and sorted by ``column``, the
+    keys are indexed: the absence of a key is then known without reading the
+    file again.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the file being searched.
+    column : str
+        Name of the key column.
+    value : str
+        Value of the key column in the row.
+
+    Returns
+    -------
+    row : dict | None
+        The values of the last matching row keyed by column name, or None if
+        no row matches.
+
+    """
+    index = _key_index(fname, column)
+    if index is not None:
+        found = bisect_left(index['keys'], value)
+        if found == len(index['keys']) or index['keys'][found] != value:
+            return None
+
+    with open(fname, 'r', encoding='utf-8-sig', newline='') as fid:
+        header = fid.readline()
+        column_names = header.rstrip('\r\n').split('\t')
+        if column not in column_names:
+            return None
+        idx = column_names.index(column)
+        found, keys, trailing_newline, regular = None, list(), True, True
+        for line in fid:
+            trailing_newline = line.endswith('\n')
+            fields = line.rstrip('\r\n').split('\t')
+            if fields == ['']:
+                continue
+            regular = regular and len(fields) == len(column_names)
+            if len(fields) > idx:
+                keys.append(fields[idx])
+                if fields[idx] == value:
+                    found = fields
+    if regular and all(key < next_key
+                       for key, next_key in zip(keys, keys[1:])):
+        _set_key_index(fname, column, column_names, keys,
+                       header.endswith('\r\n'), trailing_newline)
+    if found is None:
+        return None
+    return OrderedDict(zip(column_names, found))
+
+
+def _upsert_row(fname, row, column):
+    """Insert or replace a row of a tsv file sorted by its key column.
+
+    This is the row by row equivalent of ``_combine_rows`` with
+    ``drop_column=column``: the row replaces the one with the same key, or is
+    inserted where it sorts, with ``'n/a'`` in the columns it does not have.
+    The other lines are not parsed beyond their key, and are written back as
+    they are; a row sorting last is appended to the file. Within a lock
+    session (see ``_tsv_lock``), a new row sorting last is appended from the
+    index of the keys, without reading the file.
+
+    Parameters
+    ----------
+    fname : str
+        Path to the file being updated.
+    row : dict
+        Values of the row keyed by column name, including ``column``.
+    column : str
+        Name of the key column.
+
+    Returns
+    -------
+    updated : bool
+        False, leaving the file untouched, when the row has columns that the
+        file does not have, or when the file is not sorted by unique keys
+        (e.g. edited by hand); the whole file must be combined then.
+
+    """
+    key = str(row[column])
+    index = _key_index(fname, column)
+    if index is not None and not set(row) - set(index['column_names']) and \
+            index['trailing_newline'] and \
+            (not index['keys'] or index['keys'][-1] < key):
+        line = '\t'.join(str(row.get(name, 'n/a'))
+                         for name in index['column_names'])
+        with open(fname, 'ab') as fid:
+            fid.write((line + ('\r\n' if index['crlf'] else '\n'))
+                      .encode('utf-8'))
+        index['keys'].append(key)
+        _set_key_index(fname, column, index['column_names'], index['keys'],
+                       index['crlf'], True)
+        return True
+
+    with open(fname, 'rb') as fid:
+        content = fid.read()
+    bom = codecs.BOM_UTF8 if content.startswith(codecs.BOM_UTF8) else b''
+    lines = content[len(bom):].decode('utf-8').split('\n')
+    trailing_newline = lines[-1] == ''
+    if trailing_newline:
+        lines.pop()
+
+    column_names = lines[0].rstrip('\r').split('\t')
+    if column not in column_names or set(row) - set(column_names):
+        return False
+    idx = column_names.index(column)
+
+    positions, keys = list(), list()
+    for position in range(1, len(lines)):
+        fields = lines[position].rstrip('\r').split('\t')
+        if fields == ['']:
+            continue
+        if len(fields) != len(column_names):
+            return False
+        positions.append(position)
+        keys.append(fields[idx])
+    if any(key >= next_key for key, next_key in zip(keys, keys[1:])):
+        return False
+
+    crlf = lines[0].endswith('\r')
+    line = '\t'.join(str(row.get(name, 'n/a')) for name in column_names)
+    if crlf:
+        line += '\r'
+    found = bisect_left(keys, key)
+    if found < len(keys) and keys[found] == key:
+        if lines[positions[found]] == line:
+            _set_key_index(fname, column, column_names, keys, crlf,
+                           trailing_newline)
+            return True
+        lines[positions[found]] = line
+    elif found == len(keys) and trailing_newline:
+        with open(fname, 'ab') as fid:
+            fid.write((line + '\n').encode('utf-8'))
+        _set_key_index(fname, column, column_names, keys + [key], crlf, True)
+        return True
+    else:
+        position = positions[found] if found < len(keys) else len(lines)
+        lines.insert(position, line)
+        keys.insert(found, key)
+
+    _replace_bytes(fname, bom + '\n'.join(lines).encode('utf-8') +
+                   (b'\n' if trailing_newline else b''))
+    _set_key_index(fname, column, column_names, keys, crlf, trailing_newline)
+    return True
 
 
 def _tsv_to_str(data, rows=5):
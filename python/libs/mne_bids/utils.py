@@ -10,10 +10,12 @@
 import json
 import os
 import re
+import threading
 from datetime import datetime, date, timedelta, timezone
 from os import path as op
 
 import numpy as np
+from mne import Info
 from mne.channels import make_standard_montage
 from mne.io.kit.kit import get_kit_info
 from mne.io.pick import pick_types
@@ -185,6 +187,25 @@ def _check_types(variables):
                              f"expected.")
 
 
+def _replace_text(fname, text, encoding):
+    """Replace a file with text, through a temporary file.
+
+    The file is never seen partially written, not even by the other processes
+    writing a dataset (see ``anonymize_dataset``).
+    """
+    fname = str(fname)
+    dirname, basename = op.split(fname)
+    temp_fname = op.join(dirname, f'.{basename}.{os.getpid()}.'
+                                  f'{threading.get_ident()}.tmp')
+    try:
+        with open(temp_fname, 'w', encoding=encoding) as fid:
+            fid.write(text)
+        os.replace(temp_fname, fname)
+    finally:
+        if op.exists(temp_fname):
+            os.remove(temp_fname)
+
+
 def _write_json(fname, dictionary, overwrite=False):
     """Write JSON to a file."""
     if op.exists(fname) and not overwrite:
@@ -192,9 +213,7 @@ def _write_json(fname, dictionary, overwrite=False):
                               'Please set overwrite to True.')
 
     json_output = json.dumps(dictionary, indent=4)
-    with open(fname, 'w', encoding='utf-8') as fid:
-        fid.write(json_output)
-        fid.write('\n')
+    _replace_text(fname, json_output + '\n', encoding='utf-8')
 
     logger.info(f"Writing '{fname}'...")
 
@@ -215,9 +234,7 @@ def _write_text(fname, text, overwrite=False):
     if op.exists(fname) and not overwrite:
         raise FileExistsError(f'"{fname}" already exists. '
                               'Please set overwrite to True.')
-    with open(fname, 'w', encoding='utf-8-sig') as fid:
-        fid.write(text)
-        fid.write('\n')
+    _replace_text(fname, text + '\n', encoding='utf-8-sig')
 
     logger.info(f"Writing '{fname}'...")
 
@@ -303,9 +320,13 @@ def _check_empty_room_basename(bids_path, on_invalid_er_task='raise'):
 
 
 def _check_anonymize(anonymize, raw, ext):
-    """Check the `anonymize` dict."""
+    """Check the `anonymize` dict.
+
+    ``raw`` may also be the ``mne.Info`` of the recording.
+    """
+    info = raw if isinstance(raw, Info) else raw.info
     # if info['meas_date'] None, then the dates are not stored
-    if raw.info['meas_date'] is None:
+    if info['meas_date'] is None:
         daysback = None
     else:
         if 'daysback' not in anonymize or anonymize['daysback'] is None:
@@ -333,8 +354,8 @@ def _get_anonymization_daysback(raw):
 
     Parameters
     ----------
-    raw : mne.io.Raw
-        Subject raw data.
+    raw : mne.io.Raw | mne.Info
+        Subject raw data, or its measurement info.
 
     Returns
     -------
@@ -343,7 +364,8 @@ def _get_anonymization_daysback(raw):
     daysback_max : int
         The maximum number of daysback that MNE can store.
     """
-    this_date = _stamp_to_dt(raw.info['meas_date']).date()
+    info = raw if isinstance(raw, Info) else raw.info
+    this_date = _stamp_to_dt(info['meas_date']).date()
     daysback_min = (this_date - date(year=1924, month=12, day=31)).days
     daysback_max = (this_date - datetime.fromtimestamp(0).date() +
                     timedelta(seconds=np.iinfo('>i4').max)).days
@@ -368,8 +390,9 @@ def get_anonymization_daysback(raws, verbose=None):
 
     Parameters
     ----------
-    raw : mne.io.Raw | list of mne.io.Raw
-        Subject raw data or list of raw data from several subjects.
+    raw : mne.io.Raw | mne.Info | list of mne.io.Raw | list of mne.Info
+        Subject raw data or list of raw data from several subjects. Their
+        measurement info is enough.
     %(verbose)s
 
     Returns
@@ -384,7 +407,8 @@ def get_anonymization_daysback(raws, verbose=None):
     daysback_min_list = list()
     daysback_max_list = list()
     for raw in raws:
-        if raw.info['meas_date'] is not None:
+        info = raw if isinstance(raw, Info) else raw.info
+        if info['meas_date'] is not None:
             daysback_min, daysback_max = _get_anonymization_daysback(raw)
             daysback_min_list.append(daysback_min)
             daysback_max_list.append(daysback_max)
@@ -17,6 +17,8 @@ from pathlib import Path
 from datetime import datetime, timezone, timedelta
 import shutil
 from collections import defaultdict, OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from pkg_resources import parse_version
 
@@ -33,6 +35,7 @@ from mne.utils import (check_version, has_nibabel, logger, warn, Bunch,
                        _validate_type, get_subjects_dir, verbose,
                        deprecated, ProgressBar)
 import mne.preprocessing
+from mne.parallel import check_n_jobs
 
 from mne_bids.pick import coil_type
 from mne_bids.dig import _write_dig_bids, _write_coordsystem_json
@@ -43,12 +46,15 @@ from mne_bids.utils import (_write_json, _write_tsv, _write_text,
 from mne_bids import (BIDSPath, read_raw_bids, get_anonymization_daysback,
                       get_bids_path_from_fname)
 from mne_bids.path import _parse_ext, _mkdir_p, _path_to_str
+from mne_bids._index import _update_index
 from mne_bids.copyfiles import (copyfile_brainvision, copyfile_eeglab,
                                 copyfile_ctf, copyfile_bti, copyfile_kit,
-                                copyfile_edf)
+                                copyfile_edf, _read_edf_info)
 from mne_bids.tsv_handler import (_from_tsv, _drop, _contains_row,
-                                  _combine_rows)
-from mne_bids.read import _find_matching_sidecar, _read_events
+                                  _combine_rows, _tsv_header, _find_row,
+                                  _upsert_row, _tsv_lock, _remove_tsv_locks)
+from mne_bids.read import (_find_matching_sidecar, _read_events,
+                           _read_acq_time)
 from mne_bids.sidecar_updates import update_sidecar_json
 
 from mne_bids.config import (ORIENTATION, UNITS, MANUFACTURERS,
@@ -320,7 +326,7 @@ def _readme(datatype, fname, overwrite=False):
     _write_text(fname, text, overwrite=True)
 
 
-def _participants_tsv(raw, subject_id, fname, overwrite=False):
+def _participants_tsv(raw, subject_id, fname, overwrite=False, extra=None):
     """Create a participants.tsv file and save it.
 
     This will append any new participant data to the current list if it
@@ -339,6 +345,9 @@ def _participants_tsv(raw, subject_id, fname, overwrite=False):
         Defaults to False.
         If there is already data for the given `subject_id` and overwrite is
         False, an error will be raised.
+    extra : dict | None
+        Column values of the participant, replacing the age, sex and hand
+        read from ``raw`` and adding any other column.
 
     """
     subject_age = "n/a"
@@ -371,62 +380,90 @@ def _participants_tsv(raw, subject_id, fname, overwrite=False):
         else:
             subject_age = "n/a"
 
+    extra = OrderedDict(extra or {})
+    subject_age = extra.pop('age', subject_age)
+    sex = extra.pop('sex', sex)
+    hand = extra.pop('hand', hand)
+
     subject_id = 'sub-' + subject_id
     data = OrderedDict(participant_id=[subject_id])
     data.update({'age': [subject_age], 'sex': [sex], 'hand': [hand]})
-
-    if os.path.exists(fname):
-        orig_data = _from_tsv(fname)
-        # whether the new data exists identically in the previous data
-        exact_included = _contains_row(orig_data,
-                                       {'participant_id': subject_id,
-                                        'age': subject_age,
-                                        'sex': sex,
-                                        'hand': hand})
-        # whether the subject id is in the previous data
-        sid_included = subject_id in orig_data['participant_id']
-        # if the subject data provided is different to the currently existing
-        # data and overwrite is not True raise an error
-        if (sid_included and not exact_included) and not overwrite:
-            raise FileExistsError(f'"{subject_id}" already exists in '  # noqa: E501 F821
-                                  f'the participant list. Please set '
-                                  f'overwrite to True.')
-
-        # Append any columns the original data did not have
-        # that mne-bids is trying to write. This handles
-        # the edge case where users write participants data for
-        # a subset of `hand`, `age` and `sex`.
-        for key in data.keys():
-            if key in orig_data:
-                continue
-
-            # add 'n/a' if any missing columns
-            orig_data[key] = ['n/a'] * len(next(iter(data.values())))
-
-        # Append any additional columns that original data had.
-        # Keep the original order of the data by looping over
-        # the original OrderedDict keys
-        col_name = 'participant_id'
-        for key in orig_data.keys():
-            if key in data:
-                continue
-
-            # add original value for any user-appended columns
-            # that were not handled by mne-bids
-            p_id = data[col_name][0]
-            if p_id in orig_data[col_name]:
-                row_idx = orig_data[col_name].index(p_id)
-                data[key] = [orig_data[key][row_idx]]
-
-        # otherwise add the new data as new row
-        data = _combine_rows(orig_data, data, 'participant_id')
-
-    # overwrite is forced to True as all issues with overwrite == False have
-    # been handled by this point
-    _write_tsv(fname, data, True)
-
-
-def _participants_json(fname, overwrite=False):
+    data.update({key: [val] for key, val in extra.items()})
+
+    # the file is locked from the lookup of the subject to the write, so that
+    # conversions into a shared root do not lose each other's rows
+    with _tsv_lock(fname):
+        if os.path.exists(fname) and \
+                set(data.keys()) <= set(_tsv_header(fname)):
+            # only the row of the subject is read and written
+            orig_row = _find_row(fname, 'participant_id', subject_id)
+            exact_included = orig_row is not None and all(
+                orig_row[key] == str(val) for key, val in
+                (('age', subject_age), ('sex', sex), ('hand', hand)))
+            if orig_row is not None and not exact_included and not overwrite:
+                raise FileExistsError(f'"{subject_id}" already exists in '  # noqa: E501 F821
+                                      f'the participant list. Please set '
+                                      f'overwrite to True.')
+
+            # keep the original value of any user-appended columns
+            row = OrderedDict(orig_row or {})
+            row.update({key: val[0] for key, val in data.items()})
+            if _upsert_row(fname, row, 'participant_id'):
+                logger.info(f"Writing '{fname}'...")
+                return
+
+        if os.path.exists(fname):
+            orig_data = _from_tsv(fname)
+            # whether the new data exists identically in the previous data
+            exact_included = _contains_row(orig_data,
+                                           {'participant_id': subject_id,
+                                            'age': subject_age,
+                                            'sex': sex,
+                                            'hand': hand})
+            # whether the subject id is in the previous data
+            sid_included = subject_id in orig_data['participant_id']
+            # if the subject data provided is different to the currently
+            # existing data and overwrite is not True raise an error
+            if (sid_included and not exact_included) and not overwrite:
+                raise FileExistsError(f'"{subject_id}" already exists in '  # noqa: E501 F821
+                                      f'the participant list. Please set '
+                                      f'overwrite to True.')
+
+            # Append any columns the original data did not have
+            # that mne-bids is trying to write. This handles
+            # the edge case where users write participants data for
+            # a subset of `hand`, `age` and `sex`.
+            for key in data.keys():
+                if key in orig_data:
+                    continue
+
+                # add 'n/a' if any missing columns
+                orig_data[key] = ['n/a'] * len(next(iter(data.values())))
+
+            # Append any additional columns that original data had.
+            # Keep the original order of the data by looping over
+            # the original OrderedDict keys
+            col_name = 'participant_id'
+            for key in orig_data.keys():
+                if key in data:
+                    continue
+
+                # add original value for any user-appended columns
+                # that were not handled by mne-bids
+                p_id = data[col_name][0]
+                if p_id in orig_data[col_name]:
+                    row_idx = orig_data[col_name].index(p_id)
+                    data[key] = [orig_data[key][row_idx]]
+
+            # otherwise add the new data as new row
+            data = _combine_rows(orig_data, data, 'participant_id')
+
+        # overwrite is forced to True as all issues with overwrite == False
+        # have been handled by this point
+        _write_tsv(fname, data, True)
+
+
+def _participants_json(fname, overwrite=False, extra=None):
     """Create participants.json for non-default columns in accompanying TSV.
 
     Parameters
@@ -438,6 +475,8 @@ def _participants_json(fname, overwrite=False):
         Whether to overwrite the existing data in the file.
         If there is already data for the given `fname` and overwrite is False,
         an error will be raised.
+    extra : dict | None
+        Column descriptions to add, replacing existing ones.
 
     """
     cols = OrderedDict()
@@ -459,6 +498,9 @@ def _participants_json(fname, overwrite=False):
             if key not in cols:
                 cols[key] = val
 
+    if extra is not None:
+        cols.update(extra)
+
     _write_json(fname, cols, overwrite)
 
 
@@ -531,27 +573,41 @@ def _scans_tsv(raw, raw_fname, fname, keep_source, overwrite=False):
         else:
             _write_json(sidecar_json_path, sidecar_json)
 
-    if os.path.exists(fname):
-        orig_data = _from_tsv(fname)
-        # if the file name is already in the file raise an error
-        if raw_fname in orig_data['filename'] and not overwrite:
-            raise FileExistsError(f'"{raw_fname}" already exists in '
-                                  f'the scans list. Please set '
-                                  f'overwrite to True.')
+    with _tsv_lock(fname):
+        if os.path.exists(fname) and len(raw_fnames) == 1 and \
+                set(data.keys()) <= set(_tsv_header(fname)):
+            # only the row of the file is read and written
+            if not overwrite and _find_row(fname, 'filename', raw_fname):
+                raise FileExistsError(f'"{raw_fname}" already exists in '
+                                      f'the scans list. Please set '
+                                      f'overwrite to True.')
+
+            row = OrderedDict((key, val[0]) for key, val in data.items())
+            if _upsert_row(fname, row, 'filename'):
+                logger.info(f"Writing '{fname}'...")
+                return
 
-        for key in data.keys():
-            if key in orig_data:
-                continue
+        if os.path.exists(fname):
+            orig_data = _from_tsv(fname)
+            # if the file name is already in the file raise an error
+            if raw_fname in orig_data['filename'] and not overwrite:
+                raise FileExistsError(f'"{raw_fname}" already exists in '
+                                      f'the scans list. Please set '
+                                      f'overwrite to True.')
 
-            # add 'n/a' if any missing columns
-            orig_data[key] = ['n/a'] * len(next(iter(data.values())))
+            for key in data.keys():
+                if key in orig_data:
+                    continue
 
-        # otherwise add the new data
-        data = _combine_rows(orig_data, data, 'filename')
+                # add 'n/a' if any missing columns
+                orig_data[key] = ['n/a'] * len(next(iter(data.values())))
 
-    # overwrite is forced to True as all issues with overwrite == False have
-    # been handled by this point
-    _write_tsv(fname, data, True)
+            # otherwise add the new data
+            data = _combine_rows(orig_data, data, 'filename')
+
+        # overwrite is forced to True as all issues with overwrite == False
+        # have been handled by this point
+        _write_tsv(fname, data, True)
 
 
 def _load_image(image, name='image'):
@@ -666,7 +722,7 @@ def _mri_scanner_ras_to_mri_voxels(ras_landmarks, img_mgh):
 
 
 def _sidecar_json(raw, task, manufacturer, fname, datatype,
-                  emptyroom_fname=None, overwrite=False):
+                  emptyroom_fname=None, overwrite=False, extra=None):
     """Create a sidecar json file depending on the suffix and save it.
 
     The sidecar json file provides meta data about the data
@@ -691,6 +747,8 @@ def _sidecar_json(raw, task, manufacturer, fname, datatype,
     overwrite : bool
         Whether to overwrite the existing file.
         Defaults to False.
+    extra : dict | None
+        Fields to add to the sidecar, replacing the generated ones.
 
     """
     sfreq = raw.info['sfreq']
@@ -877,6 +935,9 @@ def _sidecar_json(raw, task, manufacturer, fname, datatype,
     ch_info_json += ch_info_ch_counts
     ch_info_json = OrderedDict(ch_info_json)
 
+    if extra is not None:
+        ch_info_json.update(extra)
+
     _write_json(fname, ch_info_json, overwrite)
 
     return fname
@@ -1047,7 +1108,8 @@ def make_dataset_description(path, name, data_license=None,
                              how_to_acknowledge=None, funding=None,
                              references_and_links=None, doi=None,
                              dataset_type='raw',
-                             overwrite=False, verbose=None):
+                             overwrite=False, extra_fields=None,
+                             verbose=None):
     """Create json for a dataset description.
 
     BIDS datasets may have one or more fields, this function allows you to
@@ -1090,6 +1152,10 @@ def make_dataset_description(path, name, data_license=None,
         If overwrite is True, provided fields will overwrite previous data.
         If overwrite is False, no existing data will be overwritten or
         replaced.
+    extra_fields : dict | None
+        Additional fields of the description, e.g. to record the software
+        that prepared the dataset. They are always written, replacing the
+        fields above and previous data.
     %(verbose)s
 
     Notes
@@ -1140,7 +1206,10 @@ def make_dataset_description(path, name, data_license=None,
     pop_keys = [key for key, val in description.items() if val is None]
     for key in pop_keys:
         description.pop(key)
+    if extra_fields is not None:
+        description.update(extra_fields)
     _write_json(fname, description, overwrite=True)
+    _update_index(path, [fname])
 
 
 @verbose
@@ -1148,7 +1217,8 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
                    anonymize=None, format='auto', symlink=False,
                    empty_room=None, allow_preload=False,
                    montage=None, acpc_aligned=False,
-                   overwrite=False, verbose=None):
+                   overwrite=False, sidecar_metadata=None, stage=None,
+                   verbose=None):
     """Save raw data to a BIDS-compliant folder structure.
 
     .. warning:: * The original file is simply copied over if the original
@@ -1317,6 +1387,21 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
         and ``participants.tsv`` by a user will be retained.
         If ``False``, no existing data will be overwritten or
         replaced.
+    sidecar_metadata : dict | None
+        Metadata merged into the generated files, so that each of them is
+        written once with its final content. The keys
+        ``'dataset_description'``, ``'participants'``,
+        ``'participants_json'`` and ``'sidecar'`` map to dicts of fields
+        added to, or replacing the generated fields of,
+        ``dataset_description.json``, the row of the subject in
+        ``participants.tsv``, ``participants.json`` and the datatype sidecar
+        JSON. Set ``'readme'`` to ``False`` to not write the ``README``.
+        Defaults to ``None``.
+    stage : callable | None
+        Called with the name of each step of the writing (e.g.
+        ``'copyfile_edf'``, ``'_channels_tsv'``), returns the context manager
+        in which the step runs, e.g. to time the steps. Defaults to ``None``,
+        the steps are run as they are.
     %(verbose)s
 
     Returns
@@ -1592,17 +1677,29 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
     unit = UNITS.get(ext, 'n/a')
     manufacturer = MANUFACTURERS.get(ext, 'n/a')
 
+    if sidecar_metadata is None:
+        sidecar_metadata = dict()
+    if stage is None:
+        def stage(name):
+            return nullcontext()
+
     # save readme file unless it already exists
     # XXX: can include README overwrite in future if using a template API
     # XXX: see https://github.com/mne-tools/mne-bids/issues/551
-    _readme(bids_path.datatype, readme_fname, False)
+    if sidecar_metadata.get('readme', True):
+        with stage('_readme'):
+            _readme(bids_path.datatype, readme_fname, False)
 
     # save all participants meta data
-    _participants_tsv(
-        raw=raw, subject_id=bids_path.subject, fname=participants_tsv_fname,
-        overwrite=overwrite
-    )
-    _participants_json(participants_json_fname, True)
+    with stage('_participants_tsv'):
+        _participants_tsv(
+            raw=raw, subject_id=bids_path.subject,
+            fname=participants_tsv_fname, overwrite=overwrite,
+            extra=sidecar_metadata.get('participants')
+        )
+    with stage('_participants_json'):
+        _participants_json(participants_json_fname, True,
+                           extra=sidecar_metadata.get('participants_json'))
 
     # for MEG, we only write coordinate system
     if bids_path.datatype == 'meg' and not data_is_emptyroom:
@@ -1639,8 +1736,9 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
         # if we have an available DigMontage
         if montage is not None or \
                 (raw.info['dig'] is not None and raw.info['dig']):
-            _write_dig_bids(bids_path, raw, montage, acpc_aligned,
-                            overwrite)
+            with stage('_write_dig_bids'):
+                _write_dig_bids(bids_path, raw, montage, acpc_aligned,
+                                overwrite)
     else:
         logger.info(f'Writing of electrodes.tsv is not supported '
                     f'for data type "{bids_path.datatype}". Skipping ...')
@@ -1650,9 +1748,10 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
         events_array, event_dur, event_desc_id_map = _read_events(
             events_data, event_id, raw, bids_path=bids_path)
         if events_array.size != 0:
-            _events_tsv(events=events_array, durations=event_dur, raw=raw,
-                        fname=events_path.fpath, trial_type=event_desc_id_map,
-                        overwrite=overwrite)
+            with stage('_events_tsv'):
+                _events_tsv(events=events_array, durations=event_dur,
+                            raw=raw, fname=events_path.fpath,
+                            trial_type=event_desc_id_map, overwrite=overwrite)
         # Kepp events_array around for BrainVision writing below.
         del event_desc_id_map, events_data, event_id, event_dur
 
@@ -1660,12 +1759,18 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
     # already exist. Always set overwrite to False here. If users
     # want to edit their dataset_description, they can directly call
     # this function.
-    make_dataset_description(bids_path.root, name=" ", overwrite=False)
-
-    _sidecar_json(raw, task=bids_path.task, manufacturer=manufacturer,
-                  fname=sidecar_path.fpath, datatype=bids_path.datatype,
-                  emptyroom_fname=associated_er_path, overwrite=overwrite)
-    _channels_tsv(raw, channels_path.fpath, overwrite)
+    with stage('make_dataset_description'):
+        make_dataset_description(
+            bids_path.root, name=" ", overwrite=False,
+            extra_fields=sidecar_metadata.get('dataset_description'))
+
+    with stage('_sidecar_json'):
+        _sidecar_json(raw, task=bids_path.task, manufacturer=manufacturer,
+                      fname=sidecar_path.fpath, datatype=bids_path.datatype,
+                      emptyroom_fname=associated_er_path, overwrite=overwrite,
+                      extra=sidecar_metadata.get('sidecar'))
+    with stage('_channels_tsv'):
+        _channels_tsv(raw, channels_path.fpath, overwrite)
 
     # create parent directories if needed
     _mkdir_p(os.path.dirname(data_path))
@@ -1736,7 +1841,8 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
                       if ext == '.pdf' else bids_path.fpath))
         elif bids_path.datatype in ['eeg', 'ieeg'] and format == 'EDF':
             warn('Converting data files to EDF format')
-            _write_raw_edf(raw, bids_path.fpath, overwrite=overwrite)
+            with stage('_write_raw_edf'):
+                _write_raw_edf(raw, bids_path.fpath, overwrite=overwrite)
         else:
             warn('Converting data files to BrainVision format')
             bids_path.update(suffix=bids_path.datatype, extension='.vhdr')
@@ -1763,7 +1869,8 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
                  "supports 2-digit years. The date for that field will be "
                  "set to 85 (i.e., 1985), the earliest possible date. "
                  "The true anonymized date is stored in the scans.tsv file.")
-        copyfile_edf(raw_fname, bids_path, anonymize=anonymize)
+        with stage('copyfile_edf'):
+            copyfile_edf(raw_fname, bids_path, anonymize=anonymize)
     # EEGLAB .set might be accompanied by a .fdt - find out and copy it too
     elif ext == '.set':
         copyfile_eeglab(raw_fname, bids_path)
@@ -1780,12 +1887,19 @@ def write_raw_bids(raw, bids_path, events_data=None, event_id=None,
 
     # write to the scans.tsv file the output file written
     scan_relative_fpath = op.join(bids_path.datatype, bids_path.fpath.name)
-    _scans_tsv(raw, raw_fname=scan_relative_fpath,
-               fname=scans_path.fpath, keep_source=keep_source,
-               overwrite=overwrite)
+    with stage('_scans_tsv'):
+        _scans_tsv(raw, raw_fname=scan_relative_fpath,
+                   fname=scans_path.fpath, keep_source=keep_source,
+                   overwrite=overwrite)
     logger.info(f'Wrote {scans_path.fpath} entry with '
                 f'{scan_relative_fpath}.')
 
+    # the files written, in the index of the root if it is loaded
+    _update_index(bids_path.root, [
+        readme_fname, participants_tsv_fname, participants_json_fname,
+        sidecar_path.fpath, channels_path.fpath, events_path.fpath,
+        bids_path.fpath, scans_path.fpath])
+
     return bids_path
 
 
@@ -2055,6 +2169,8 @@ def write_anat(image, bids_path, landmarks=None, deface=False, overwrite=False,
                           f'`overwrite` is set to False. File: "{bids_path}"')
 
     nib.save(image_nii, bids_path.fpath)
+    _update_index(bids_path.root, [
+        bids_path.fpath, bids_path.copy().update(extension='.json').fpath])
 
     return bids_path
 
@@ -2280,6 +2396,7 @@ def write_meg_calibration(calibration, bids_path, verbose=None):
     out_path.mkdir()
     mne.preprocessing.write_fine_calibration(fname=str(out_path),
                                              calibration=calibration)
+    _update_index(out_path.root, [out_path.fpath])
 
 
 @verbose
@@ -2323,6 +2440,29 @@ def write_meg_crosstalk(fname, bids_path, verbose=None):
     logger.info(f'Writing crosstalk file to {out_path}')
     out_path.mkdir()
     shutil.copyfile(src=fname, dst=str(out_path))
+    _update_index(out_path.root, [out_path.fpath])
+
+
+def _get_meas_info(bids_path: BIDSPath) -> mne.Info:
+    """Get the measurement info of a recording, for its measurement date.
+
+    Only the header of EDF and BDF files is read: their measurement date is
+    the one :func:`mne_bids.read_raw_bids` would read.
+    """
+    if bids_path.extension not in ('.edf', '.bdf'):
+        return read_raw_bids(bids_path=bids_path, verbose='error').info
+
+    info = _read_edf_info(bids_path.fpath)
+    scans_fname = BIDSPath(
+        subject=bids_path.subject, session=bids_path.session,
+        suffix='scans', extension='.tsv', root=bids_path.root
+    ).fpath
+    if scans_fname.exists():
+        acq_time = _read_acq_time(scans_fname, bids_path)
+        if acq_time is not None:
+            with info._unlock():
+                info['meas_date'] = acq_time
+    return info
 
 
 def _get_daysback(
@@ -2375,19 +2515,17 @@ def _get_daysback(
         bids_paths_to_consider.extend(bids_path)
 
     if len(bids_paths_to_consider) >= show_progress_thresh:
-        raws = []
+        infos = []
         logger.info('\n')
         for bids_path in ProgressBar(
             iterable=bids_paths_to_consider, mesg='Determining daysback'
         ):
-            raw = read_raw_bids(bids_path=bids_path, verbose='error')
-            raws.append(raw)
+            infos.append(_get_meas_info(bids_path))
     else:
-        raws = [read_raw_bids(bids_path=bp, verbose='error')
-                for bp in bids_paths_to_consider]
+        infos = [_get_meas_info(bp) for bp in bids_paths_to_consider]
 
     daysback_min, daysback_max = get_anonymization_daysback(
-        raws=raws, verbose=False
+        raws=infos, verbose=False
     )
 
     # Pick one randomly
@@ -2418,10 +2556,150 @@ def _check_finecal_path(bids_path: BIDSPath) -> bool:
     return is_finecal_path
 
 
+def _anonymize_recording(bp_in, bp_out, bp_er_out, daysback):
+    """Write the anonymized copy of a recording and enrich its sidecars."""
+    if bp_in.datatype == 'anat':
+        bp_anat_json = bp_in.copy().update(extension='.json')
+        anat_json = json.loads(
+            bp_anat_json.fpath.read_text(encoding='utf-8')
+        )
+        landmarks = anat_json['AnatomicalLandmarkCoordinates']
+        landmarks_dig = mne.channels.make_dig_montage(
+            nasion=landmarks['NAS'],
+            lpa=landmarks['LPA'],
+            rpa=landmarks['RPA'],
+            coord_frame='mri_voxel'
+        )
+        write_anat(
+            image=bp_in.fpath,
+            bids_path=bp_out,
+            landmarks=landmarks_dig,
+            deface=True,
+            verbose='error'
+        )
+    elif _check_crosstalk_path(bp_in):
+        write_meg_crosstalk(
+            fname=bp_in.fpath,
+            bids_path=bp_out,
+            verbose='error'
+        )
+    elif _check_finecal_path(bp_in):
+        write_meg_calibration(
+            calibration=bp_in.fpath,
+            bids_path=bp_out,
+            verbose='error'
+        )
+    else:
+        raw = read_raw_bids(bids_path=bp_in, verbose='error')
+        write_raw_bids(
+            raw=raw,
+            bids_path=bp_out,
+            anonymize={
+                'daysback': daysback,
+                'keep_his': False,
+                'keep_source': False,
+            },
+            empty_room=bp_er_out,
+            verbose='error'
+        )
+
+    # Enrich sidecars
+    bp_in_json = bp_in.copy().update(extension='.json')
+    bp_out_json = bp_out.copy().update(extension='.json')
+    bp_in_events = bp_in.copy().update(suffix='events', extension='.tsv')
+    bp_out_events = bp_out.copy().update(suffix='events', extension='.tsv')
+
+    # Enrich the JSON file
+    if bp_in_json.fpath.exists():
+        json_in = json.loads(
+            bp_in_json.fpath.read_text(encoding='utf-8')
+        )
+    else:
+        json_in = dict()
+
+    if bp_out_json.fpath.exists():
+        json_out = json.loads(
+            bp_out_json.fpath.read_text(encoding='utf-8')
+        )
+    else:
+        json_out = dict()
+
+    # Only transfer data that we believe doesn't contain any personally
+    # identifiable information
+    json_updates = dict()
+    for key, value in json_in.items():
+        if key in ANONYMIZED_JSON_KEY_WHITELIST and key not in json_out:
+            json_updates[key] = value
+    del json_in, json_out
+
+    if json_updates:
+        bp_out_json.fpath.touch(exist_ok=True)
+        update_sidecar_json(
+            bids_path=bp_out_json,
+            entries=json_updates,
+            verbose='error'
+        )
+
+    # Transfer trigger codes from original *_events.tsv file
+    if bp_in_events.fpath.exists():
+        assert bp_out_events.fpath.exists()
+        events_tsv_in = _from_tsv(bp_in_events)
+        events_tsv_out = _from_tsv(bp_out_events)
+
+        assert events_tsv_in['trial_type'] == events_tsv_out['trial_type']
+        events_tsv_out['value'] = events_tsv_in['value']
+        _write_tsv(
+            fname=bp_out_events.fpath,
+            dictionary=events_tsv_out,
+            overwrite=True,
+            verbose='error'
+        )
+
+
+def _anonymize_recordings(recordings, daysback, n_jobs):
+    """Anonymize recordings, in parallel if n_jobs > 1.
+
+    Yields once per anonymized recording.
+    """
+    # The empty-room recordings come first, the experimental recordings refer
+    # to their anonymized copy. Anonymize them, and the first recording of
+    # each data type, before the others: the files that all recordings of a
+    # data type update (README, dataset_description.json, participants.json)
+    # then already exist, and are rewritten with the same content in
+    # parallel.
+    first, others = [], []
+    datatypes = set()
+    for recording in recordings:
+        bp_in = recording[0]
+        if ((bp_in.subject == 'emptyroom' and bp_in.task == 'noise') or
+                bp_in.datatype not in datatypes):
+            first.append(recording)
+            datatypes.add(bp_in.datatype)
+        else:
+            others.append(recording)
+
+    if n_jobs == 1 or len(others) < 2:
+        first, others = recordings, []
+    for bp_in, bp_out, bp_er_out in first:
+        _anonymize_recording(bp_in, bp_out, bp_er_out, daysback)
+        yield
+
+    if others:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [
+                executor.submit(_anonymize_recording, bp_in, bp_out,
+                                bp_er_out, daysback)
+                for bp_in, bp_out, bp_er_out in others
+            ]
+            for future in as_completed(futures):
+                future.result()
+                yield
+
+
 @verbose
 def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
                       subject_mapping='auto', datatypes=None,
-                      random_state=None, verbose=None):
+                      random_state=None, n_jobs=1, verbose=None):
     """Anonymize a BIDS dataset.
 
     This function creates a copy of a BIDS dataset, and tries to remove all
@@ -2450,6 +2728,11 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
     %(random_state)s
         The RNG will be used to derive ``daysback`` and ``subject_mapping`` if
         they are ``'auto'``.
+    n_jobs : int
+        The number of processes anonymizing the recordings in parallel
+        (default ``1``). If ``-1``, it is set to the number of CPU cores.
+
+        .. versionadded:: 0.11
     %(verbose)s
     """
     bids_root_in = Path(bids_root_in).expanduser()
@@ -2639,7 +2922,8 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
     del msg
 
     # Actual processing starts here
-    for bp_in in ProgressBar(iterable=bids_paths_in, mesg='Anonymizing'):
+    recordings = []
+    for bp_in in bids_paths_in:
         bp_out = (
             bp_in.copy().update(
                 subject=subject_mapping[bp_in.subject],
@@ -2688,102 +2972,14 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
                         root=bp_out.root
                     )
 
-        if bp_in.datatype == 'anat':
-            bp_anat_json = bp_in.copy().update(extension='.json')
-            anat_json = json.loads(
-                bp_anat_json.fpath.read_text(encoding='utf-8')
-            )
-            landmarks = anat_json['AnatomicalLandmarkCoordinates']
-            landmarks_dig = mne.channels.make_dig_montage(
-                nasion=landmarks['NAS'],
-                lpa=landmarks['LPA'],
-                rpa=landmarks['RPA'],
-                coord_frame='mri_voxel'
-            )
-            write_anat(
-                image=bp_in.fpath,
-                bids_path=bp_out,
-                landmarks=landmarks_dig,
-                deface=True,
-                verbose='error'
-            )
-        elif _check_crosstalk_path(bp_in):
-            write_meg_crosstalk(
-                fname=bp_in.fpath,
-                bids_path=bp_out,
-                verbose='error'
-            )
-        elif _check_finecal_path(bp_in):
-            write_meg_calibration(
-                calibration=bp_in.fpath,
-                bids_path=bp_out,
-                verbose='error'
-            )
-        else:
-            raw = read_raw_bids(bids_path=bp_in, verbose='error')
-            write_raw_bids(
-                raw=raw,
-                bids_path=bp_out,
-                anonymize={
-                    'daysback': daysback,
-                    'keep_his': False,
-                    'keep_source': False,
-                },
-                empty_room=bp_er_out,
-                verbose='error'
-            )
-
-        # Enrich sidecars
-        bp_in_json = bp_in.copy().update(extension='.json')
-        bp_out_json = bp_out.copy().update(extension='.json')
-        bp_in_events = bp_in.copy().update(suffix='events', extension='.tsv')
-        bp_out_events = bp_out.copy().update(suffix='events', extension='.tsv')
-
-        # Enrich the JSON file
-        if bp_in_json.fpath.exists():
-            json_in = json.loads(
-                bp_in_json.fpath.read_text(encoding='utf-8')
-            )
-        else:
-            json_in = dict()
+        recordings.append((bp_in, bp_out, bp_er_out))
 
-        if bp_out_json.fpath.exists():
-            json_out = json.loads(
-                bp_out_json.fpath.read_text(encoding='utf-8')
-            )
-        else:
-            json_out = dict()
-
-        # Only transfer data that we believe doesn't contain any personally
-        # identifiable information
-        json_updates = dict()
-        for key, value in json_in.items():
-            if key in ANONYMIZED_JSON_KEY_WHITELIST and key not in json_out:
-                json_updates[key] = value
-        del json_in, json_out
-
-        if json_updates:
-            bp_out_json.fpath.touch(exist_ok=True)
-            update_sidecar_json(
-                bids_path=bp_out_json,
-                entries=json_updates,
-                verbose='error'
-            )
-
-        # Transfer trigger codes from original *_events.tsv file
-        if bp_in_events.fpath.exists():
-            assert bp_out_events.fpath.exists()
-            events_tsv_in = _from_tsv(bp_in_events)
-            events_tsv_out = _from_tsv(bp_out_events)
-
-            assert events_tsv_in['trial_type'] == events_tsv_out['trial_type']
-            events_tsv_out['value'] = events_tsv_in['value']
-            _write_tsv(
-                fname=bp_out_events.fpath,
-                dictionary=events_tsv_out,
-                overwrite=True,
-                verbose='error'
-            )
+    n_jobs = check_n_jobs(n_jobs)
+    for _ in ProgressBar(
+        iterable=_anonymize_recordings(recordings, daysback, n_jobs),
+        max_value=len(recordings), mesg='Anonymizing'
+    ):
+        pass
 
     # Copy some additional files
     additional_files = (
@@ -2796,3 +2992,10 @@ def anonymize_dataset(bids_root_in, bids_root_out, daysback='auto',
         in_path = bids_root_in / fname
         if in_path.exists():
             shutil.copy(src=in_path, dst=bids_root_out)
+
+    # The lock files of the participants.tsv and scans.tsv files written
+    _remove_tsv_locks([bids_root_out] + sorted(set(
+        bp_out.directory.parent for _, bp_out, _ in recordings)))
+
+    # the recordings may have been written by other processes
+    _update_index(bids_root_out)
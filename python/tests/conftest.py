@@ -0,0 +1,14 @@
+# Tests of the eeg2bids service libraries.
+#
+# usage: python -m pytest python/tests (from the root of the repository)
+#
+# The libraries are imported as python.libs, and mne, mne_bids and bids_validator from python/libs,
+# as in the service. The synthetic recordings of the benchmarks (see python/benchmarks/synthetic.py)
+# are used as inputs.
+import os
+import sys
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+for path in [os.path.join(root, 'python', 'benchmarks'), os.path.join(root, 'python', 'libs'), root]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,93 @@
+import json
+import os
+
+from python.libs import BIDS
+from python.libs.BIDS import ContentValidate, Validate
+import synthetic
+
+
+def make_recording(directory, n_channels_tsv, sidecar):
+    # a recording of 4 channels at 256 Hz, with its channels.tsv and *_ieeg.json sidecar.
+    ieeg = os.path.join(str(directory), 'sub-01', 'ieeg')
+    os.makedirs(ieeg)
+    synthetic.make_recording(os.path.join(ieeg, 'sub-01_task-rest_ieeg.edf'), 'edf', nchan=4, n_records=2)
+    with open(os.path.join(ieeg, 'sub-01_task-rest_channels.tsv'), 'w') as fp:
+        fp.write('name\ttype\tunits\n')
+        for channel in range(n_channels_tsv):
+            fp.write('C%d\tSEEG\tuV\n' % channel)
+    with open(os.path.join(ieeg, 'sub-01_task-rest_ieeg.json'), 'w') as fp:
+        json.dump(sidecar, fp)
+
+
+def reports(bids_directory):
+    validation = ContentValidate(str(bids_directory)).run()
+    return {os.path.basename(report['file_path']): report for report in validation.reports}
+
+
+sidecar = {
+    'TaskName': 'rest',
+    'iEEGReference': 'n/a',
+    'SamplingFrequency': 256,
+    'PowerLineFrequency': 60,
+    'SoftwareFilters': 'n/a',
+    'SEEGChannelCount': 4,
+    # in the BIDS schema, not written by EEG2BIDS.
+    'ElectricalStimulation': False,
+}
+
+
+def test_content_validate(tmp_path):
+    make_recording(tmp_path, 4, sidecar)
+    for report in reports(tmp_path).values():
+        assert report['errors'] == [] and report['warnings'] == []
+
+
+def test_content_validate_errors(tmp_path):
+    invalid = dict(sidecar, SamplingFrequency=512, SEEGChannelCount='4', DCOffsetCorrection='n/a', Unknown=1)
+    del invalid['iEEGReference']
+    make_recording(tmp_path, 3, invalid)
+    found = reports(tmp_path)
+
+    assert found['sub-01_task-rest_ieeg.json']['errors'] == [
+        'Missing required field iEEGReference.',
+        'Field SEEGChannelCount must be an integer.',
+    ]
+    assert found['sub-01_task-rest_ieeg.json']['warnings'] == [
+        'Deprecated field DCOffsetCorrection.',
+        'Unknown field Unknown.',
+    ]
+    assert found['sub-01_task-rest_ieeg.edf']['errors'] == [
+        'The EDF header has 4 channels, sub-01_task-rest_channels.tsv lists 3.',
+        'The EDF header sampling frequency is 256 Hz, the sidecar has 512 Hz.',
+    ]
+
+
+def test_validation_cache(tmp_path, monkeypatch):
+    make_recording(tmp_path, 4, sidecar)
+    assert Validate(str(tmp_path)).run().result == [True, True, True]
+
+    validated = []
+    validate_chunk = BIDS.validate_chunk
+    monkeypatch.setattr(BIDS, 'validate_chunk', lambda file_paths: validated.extend(file_paths) or
+                        validate_chunk(file_paths))
+
+    # the outcomes only depend on the paths, a changed file is not validated again.
+    with open(tmp_path / 'sub-01' / 'ieeg' / 'sub-01_task-rest_ieeg.json', 'w') as fp:
+        json.dump(dict(sidecar, TaskName='other'), fp)
+    (tmp_path / 'sub-01' / 'ieeg' / 'sub-01_task-rest_events.tsv').write_text('onset\tduration\n')
+    (tmp_path / 'sub-01' / 'ieeg' / 'unknown.txt').write_text('')
+    validation = Validate(str(tmp_path)).run()
+    assert validated == ['/sub-01/ieeg/sub-01_task-rest_events.tsv', '/sub-01/ieeg/unknown.txt']
+    assert dict(zip(validation.file_paths, validation.result)) == {
+        '/sub-01/ieeg/sub-01_task-rest_channels.tsv': True,
+        '/sub-01/ieeg/sub-01_task-rest_events.tsv': True,
+        '/sub-01/ieeg/sub-01_task-rest_ieeg.edf': True,
+        '/sub-01/ieeg/sub-01_task-rest_ieeg.json': True,
+        '/sub-01/ieeg/unknown.txt': False,
+    }
+
+    # another rule set validates every file again.
+    validated.clear()
+    monkeypatch.setattr(BIDS, 'rules_version', lambda: 'other')
+    Validate(str(tmp_path)).run()
+    assert len(validated) == 5
@@ -0,0 +1,70 @@
+import csv
+import random
+
+from python.libs.Events import Events
+
+
+# Events whose runs record the rows they hold at once.
+class CountingEvents(Events):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buffered = {}
+
+    def iter_run(self, path, buffer_size=None):
+        rows = []
+        for onset, row in super().iter_run(path, buffer_size):
+            # the rows of a read are yielded before the next read.
+            rows.append(row)
+            if len(rows) == (buffer_size or self.chunk_size):
+                self.buffered[path] = max(self.buffered.get(path, 0), len(rows))
+                rows = []
+            yield onset, row
+        if rows:
+            self.buffered[path] = max(self.buffered.get(path, 0), len(rows))
+
+
+def write_events(path, rows):
+    with open(path, 'w', newline='') as fp:
+        writer = csv.writer(fp, delimiter='\t')
+        writer.writerow(['onset', 'duration', 'trial_type'])
+        writer.writerows(rows)
+
+
+def read_events(path):
+    with open(path, newline='') as fp:
+        return list(csv.reader(fp, delimiter='\t'))
+
+
+def test_merge_order(tmp_path):
+    rng = random.Random(0)
+    first = [['%.3f' % rng.uniform(0, 100), '0', 'first %d' % i] for i in range(500)]
+    second = [['%d' % i, '0', 'second'] for i in range(0, 100, 10)]
+    # equal onsets keep the order of the sources, then of the rows.
+    first += [['50', '0', 'first a'], ['50', '0', 'first b']]
+    write_events(str(tmp_path / 'first.tsv'), first)
+    write_events(str(tmp_path / 'second.tsv'), second)
+
+    destination = str(tmp_path / 'merged.tsv')
+    Events(chunk_size=64).merge([str(tmp_path / 'first.tsv'), str(tmp_path / 'second.tsv')], destination)
+
+    merged = read_events(destination)
+    assert merged[0] == Events.headers
+    expected = sorted(first + second, key=lambda row: float(row[0]))
+    assert merged[1:] == [row + ['n/a', 'n/a'] for row in expected]
+    assert [row[2] for row in merged if row[0] == '50'] == ['first a', 'first b', 'second']
+
+
+def test_merge_bounded_buffers(tmp_path):
+    rng = random.Random(1)
+    rows = [['%.3f' % rng.uniform(0, 1000), '0', 'event'] for _ in range(2000)]
+    write_events(str(tmp_path / 'events.tsv'), rows)
+
+    events = CountingEvents(chunk_size=100)
+    destination = str(tmp_path / 'merged.tsv')
+    events.merge([str(tmp_path / 'events.tsv')], destination)
+
+    onsets = [float(row[0]) for row in read_events(destination)[1:]]
+    assert onsets == sorted(float(row[0]) for row in rows)
+    # 20 unsorted chunks, 20 runs sharing a chunk of rows.
+    assert len(events.buffered) == 20
+    assert sum(events.buffered.values()) <= events.chunk_size
@@ -0,0 +1,75 @@
+import os
+import tarfile
+
+import pytest
+
+from python.libs import iEEG
+from python.libs.BIDS import Validate
+from python.libs.Journal import Journal
+from python.libs.Modifier import Modifier
+from pipeline_benchmark import conversion_request
+from python.tests.test_iEEG import make_splits
+
+
+def convert(data, journal):
+    iEEG.Converter(data, journal, Modifier.sidecar_metadata(data))
+    data['subject_id'] = iEEG.Converter.m_info['subject_id']
+    Modifier(data, journal)
+    journal.set_complete()
+
+
+def test_resume_failed_run(tmp_path, monkeypatch):
+    files = make_splits(tmp_path, 2)
+    bids_directory = str(tmp_path / 'bids')
+    os.makedirs(bids_directory)
+    data = conversion_request(bids_directory, files)
+
+    # the second run fails: the error is raised, and the run is not journaled as converted.
+    write_raw_bids = iEEG.write_raw_bids
+
+    def failing_write_raw_bids(raw, bids_path, **kwargs):
+        if int(bids_path.run) == 2:
+            raise RuntimeError('write failed')
+        return write_raw_bids(raw, bids_path, **kwargs)
+
+    monkeypatch.setattr(iEEG, 'write_raw_bids', failing_write_raw_bids)
+    journal = Journal.start(data)
+    with pytest.raises(RuntimeError, match='write failed'):
+        convert(data, journal)
+
+    journal = Journal.load(journal.bids_root)
+    assert not journal.state['complete']
+    assert list(journal.state['runs']) == ['0']
+
+    # the retry resumes the journal, and converts the failed run only.
+    monkeypatch.setattr(iEEG, 'write_raw_bids', write_raw_bids)
+    retry = conversion_request(bids_directory, files)
+    journal = Journal.start(retry)
+    assert journal.resumed
+    assert retry['output_time'] == data['output_time']
+    convert(retry, journal)
+
+    journal = Journal.load(journal.bids_root)
+    assert journal.state['complete']
+    assert sorted(journal.state['runs']) == ['0', '1']
+
+
+def test_journal_temp_file(tmp_path):
+    files = make_splits(tmp_path, 1)
+    bids_directory = str(tmp_path / 'bids')
+    os.makedirs(bids_directory)
+    data = conversion_request(bids_directory, files)
+    journal = Journal.start(data)
+
+    # a temporary file left by a save that did not complete is internal to EEG2BIDS.
+    temp_path = os.path.join(journal.bids_root, Journal.temp_filename)
+    with open(temp_path, 'w') as fp:
+        fp.write('{')
+    assert Validate.is_ignored(Journal.temp_filename)
+    iEEG.TarFile(journal.bids_root)
+    with tarfile.open(journal.bids_root + '.tar.gz') as tar:
+        assert not [name for name in tar.getnames() if name.endswith(Journal.temp_filename)]
+
+    # and removed when the conversion is resumed.
+    Journal.start(conversion_request(bids_directory, files))
+    assert not os.path.exists(temp_path)
@@ -0,0 +1,134 @@
+import pytest
+
+from python.libs.Metrics import Registry
+from python import eeg2bids
+
+
+def test_counter_gauge():
+    registry = Registry()
+    counter = registry.counter('events_total', 'Events.', ['event'])
+    counter.inc(event='a')
+    counter.inc(2, event='a')
+    counter.inc(event='b')
+    assert counter.values == {('a',): 3, ('b',): 1}
+    with pytest.raises(ValueError, match='Labels of eeg2bids_events_total are event'):
+        counter.inc(other='a')
+
+    gauge = registry.gauge('in_progress', 'In progress.')
+    gauge.set(5)
+    gauge.inc()
+    gauge.dec(3)
+    assert gauge.values == {(): 3}
+    with gauge.track():
+        assert gauge.values == {(): 4}
+    assert gauge.values == {(): 3}
+
+
+def test_histogram():
+    registry = Registry()
+    histogram = registry.histogram('seconds', 'Seconds.', ['stage'], buckets=[5, 1])
+    for value in (0.5, 3, 10):
+        histogram.observe(value, stage='read')
+    assert histogram.buckets == (1, 5)
+    assert histogram.values == {('read',): {'counts': [1, 2], 'sum': 13.5, 'count': 3}}
+
+    # the block is observed even when it raises.
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage='write'):
+            raise RuntimeError()
+    assert histogram.values[('write',)]['count'] == 1
+    assert histogram.values[('write',)]['counts'] == [1, 1]
+
+
+def test_render_snapshot():
+    registry = Registry()
+    registry.counter('files_total', 'Files.').inc(2)
+    registry.gauge('state', 'State.', ['name']).set(1.5, name='a "b"\n')
+    registry.histogram('seconds', 'Seconds.', buckets=[0.5, 1]).observe(0.75)
+
+    assert registry.render() == (
+        '# HELP eeg2bids_files_total Files.\n'
+        '# TYPE eeg2bids_files_total counter\n'
+        'eeg2bids_files_total 2\n'
+        '# HELP eeg2bids_state State.\n'
+        '# TYPE eeg2bids_state gauge\n'
+        'eeg2bids_state{name="a \\"b\\"\\n"} 1.5\n'
+        '# HELP eeg2bids_seconds Seconds.\n'
+        '# TYPE eeg2bids_seconds histogram\n'
+        'eeg2bids_seconds_bucket{le="0.5"} 0\n'
+        'eeg2bids_seconds_bucket{le="1"} 1\n'
+        'eeg2bids_seconds_bucket{le="+Inf"} 1\n'
+        'eeg2bids_seconds_sum 0.75\n'
+        'eeg2bids_seconds_count 1\n'
+    )
+    assert registry.snapshot() == {
+        'eeg2bids_files_total': {'type': 'counter', 'help': 'Files.', 'values': [{'labels': {}, 'value': 2}]},
+        'eeg2bids_state': {'type': 'gauge', 'help': 'State.',
+                           'values': [{'labels': {'name': 'a "b"\n'}, 'value': 1.5}]},
+        'eeg2bids_seconds': {'type': 'histogram', 'help': 'Seconds.', 'values': [
+            {'labels': {}, 'count': 1, 'sum': 0.75, 'buckets': {'0.5': 0, '1': 1}}]},
+    }
+
+
+def test_instrument():
+    class API:
+        def get(self, value):
+            if value is None:
+                raise ValueError()
+            return value
+
+    registry = Registry()
+    histogram = registry.histogram('request_seconds', 'Requests.', ['method'])
+    errors = registry.counter('errors_total', 'Errors.', ['method'])
+    api = API()
+    registry.instrument(api, ['get'], histogram, errors)
+    assert api.get(1) == 1
+    with pytest.raises(ValueError):
+        api.get(None)
+    assert histogram.values[('get',)]['count'] == 2
+    assert errors.values == {('get',): 1}
+
+
+def test_tpool_gauges(monkeypatch):
+    monkeypatch.setitem(eeg2bids.tpool_threads.values, (), 0)
+    gauges = []
+
+    def function(value):
+        gauges.append((eeg2bids.tpool_in_flight.values[()], eeg2bids.tpool_queued.values[()]))
+        return value
+
+    assert eeg2bids.execute(function, 1) == 1
+    assert list(eeg2bids.iterate(function(value) for value in (2, 3))) == [2, 3]
+    # each call and each item is in flight, and queued without a thread, while it runs.
+    assert gauges == [(1, 1)] * 3
+    assert eeg2bids.tpool_in_flight.values[()] == 0
+    assert eeg2bids.tpool_queued.values[()] == 0
+
+
+def test_tracked():
+    @eeg2bids.tracked
+    def handler(sid, data):
+        if data is None:
+            raise ValueError()
+        return data
+
+    assert handler('sid', 1) == 1
+    with pytest.raises(ValueError):
+        handler('sid', None)
+    assert eeg2bids.requests_total.values[('handler',)] == 2
+    assert eeg2bids.request_errors_total.values[('handler',)] == 1
+    assert eeg2bids.requests_in_progress.values[('handler',)] == 0
+    assert eeg2bids.request_seconds.values[('handler',)]['count'] == 2
+
+
+def test_metrics_app():
+    responses = []
+
+    def start_response(status, headers):
+        responses.append((status, dict(headers)))
+
+    assert eeg2bids.metrics_app({'PATH_INFO': '/other'}, start_response) == [b'Not Found']
+    body = b''.join(eeg2bids.metrics_app({'PATH_INFO': '/metrics'}, start_response))
+    assert [status for status, _ in responses] == ['404 Not Found', '200 OK']
+    assert responses[1][1]['Content-Length'] == str(len(body))
+    assert body.decode('utf-8') == eeg2bids.metrics.render()
@@ -0,0 +1,60 @@
+import os
+import re
+
+from python.libs import EDF, Recording
+import synthetic
+
+
+def make_splits(directory, starts, n_records=10):
+    # EDF+ splits of n_records 1 s data records, starting at the given seconds.
+    files = []
+    for split, second in enumerate(starts):
+        path = os.path.join(str(directory), 'split-%d.edf' % (split + 1))
+        synthetic.make_recording(path, 'edf+', nchan=2, n_records=n_records, start=(1, 1, 21, 10, 0, second),
+                                 seed=split)
+        files.append({'path': path, 'name': os.path.basename(path)})
+    return files
+
+
+def timekeeping_onsets(fname):
+    # the onset of the first TAL of every data record of the annotations channel.
+    reader = EDF.EDFReader(fname=fname)
+    meas_info, chan_info = reader.meas_info, reader.chan_info
+    reader.close()
+    n_samps = list(chan_info['n_samps'])
+    record_size = sum(n_samps) * meas_info['data_size']
+    start = sum(n_samps[:-1]) * meas_info['data_size']
+    with open(fname, 'rb') as fid:
+        fid.seek(meas_info['data_offset'])
+        data = fid.read()
+    return [
+        float(re.match(rb'[+-][0-9.]+', data[offset + start:offset + record_size]).group())
+        for offset in range(0, len(data), record_size)
+    ]
+
+
+def concatenate(files, tmp_path):
+    recording = Recording.Continuity(Recording.HeaderScan(files).run()).concatenate()
+    fname = str(tmp_path / 'joined.edf')
+    recording.write_edf(fname)
+    return recording, fname
+
+
+def test_continuous_onsets(tmp_path):
+    # the second split starts 1 s late by its header, within the tolerance of the start times.
+    recording, fname = concatenate(make_splits(tmp_path, [0, 11]), tmp_path)
+    assert recording.continuous
+    assert [segment[3] for segment in recording.segments] == [0, 10]
+    assert timekeeping_onsets(fname) == list(range(20))
+    with open(fname, 'rb') as fid:
+        assert fid.read(256)[192:197] == b'EDF+C'
+
+
+def test_discontinuous_onsets(tmp_path):
+    # a gap of 5 s is kept, from the header start times.
+    recording, fname = concatenate(make_splits(tmp_path, [0, 15]), tmp_path)
+    assert not recording.continuous
+    assert [segment[3] for segment in recording.segments] == [0, 15]
+    assert timekeeping_onsets(fname) == list(range(10)) + list(range(15, 25))
+    with open(fname, 'rb') as fid:
+        assert fid.read(256)[192:197] == b'EDF+D'
@@ -0,0 +1,37 @@
+import os
+
+import mne
+from mne_bids import BIDSPath, write_raw_bids, copyfiles
+from mne_bids import write as mne_bids_write
+
+from python.libs.Timing import Timing
+import synthetic
+
+
+def test_write_raw_bids_stages(tmp_path):
+    fname = str(tmp_path / 'recording.edf')
+    synthetic.make_recording(fname, 'edf', nchan=4, n_records=2)
+    raw = mne.io.read_raw_edf(fname, verbose=False)
+    raw.set_channel_types({name: 'seeg' for name in raw.ch_names})
+    bids_path = BIDSPath(subject='01', session='V01', task='rest', run=1, datatype='ieeg',
+                         root=str(tmp_path / 'bids'))
+
+    timing = Timing()
+    with timing.stage('write_raw_bids'):
+        write_raw_bids(raw, bids_path, stage=timing.stage, verbose=False)
+
+    assert [stage['name'] for stage in timing.stages] == ['write_raw_bids']
+    assert [stage['name'] for stage in timing.stages[0]['stages']] == [
+        '_readme',
+        '_participants_tsv',
+        '_participants_json',
+        'make_dataset_description',
+        '_sidecar_json',
+        '_channels_tsv',
+        'copyfile_edf',
+        '_scans_tsv',
+    ]
+    assert all('wall' in stage for stage in timing.stages[0]['stages'])
+    # the functions of mne_bids are left as they are for the other callers.
+    assert mne_bids_write.copyfile_edf is copyfiles.copyfile_edf
+    assert os.path.exists(str(bids_path.fpath))
@@ -0,0 +1,60 @@
+import csv
+import os
+
+from python.libs import EDF, iEEG
+from python.libs.Modifier import Modifier
+from pipeline_benchmark import conversion_request
+import synthetic
+
+
+def make_splits(directory, n_splits, n_records=10):
+    # contiguous splits of a recording, n_records 1 s data records each.
+    files = []
+    for split in range(n_splits):
+        path = os.path.join(str(directory), 'split-%d.edf' % (split + 1))
+        synthetic.make_recording(path, 'edf', nchan=4, n_records=n_records,
+                                 start=(1, 1, 21, 10, 0, split * n_records), seed=split)
+        files.append(path)
+    return files
+
+
+def read_tsv(path):
+    with open(path, newline='') as fp:
+        return list(csv.DictReader(fp, delimiter='\t'))
+
+
+def test_convert_concatenated_splits(tmp_path):
+    files = make_splits(tmp_path, 2)
+    events = str(tmp_path / 'events.tsv')
+    with open(events, 'w') as fp:
+        fp.write('onset\tduration\ttrial_type\n1.5\t0\tstart\n12\t0\tstop\n')
+
+    bids_directory = str(tmp_path / 'bids')
+    os.makedirs(bids_directory)
+    data = conversion_request(bids_directory, files)
+    data['concatenate_splits'] = True
+    data['eegRuns'][0]['eventFile'] = events
+
+    iEEG.Converter(data, None, Modifier.sidecar_metadata(data))
+    data['subject_id'] = iEEG.Converter.m_info['subject_id']
+    Modifier(data, None)
+
+    # a single run, from the first split, without the joined copy.
+    output = os.path.join(bids_directory, data['output_time'])
+    assert [eegRun['edfFile'] for eegRun in data['eegRuns']] == [files[0]]
+    assert not os.path.exists(os.path.join(output, '.concatenated_splits.edf'))
+    # the lock files of participants.tsv and scans.tsv are removed once converted.
+    assert not [name for _, _, names in os.walk(output) for name in names if name.endswith('.lock')]
+
+    ieeg_path = os.path.join(output, 'sub-BEN0001', 'ses-V1', 'ieeg')
+    basename = data['eegRuns'][0]['edfBIDSBasename']
+    assert 'run-' not in basename
+    edfs = [f for f in os.listdir(ieeg_path) if f.endswith('.edf')]
+    assert edfs == [basename + '_ieeg.edf']
+
+    assert EDF.EDFReader(fname=os.path.join(ieeg_path, edfs[0])).meas_info['n_records'] == 20
+
+    # the samples of the events are computed from the timing of the recording.
+    rows = read_tsv(os.path.join(ieeg_path, basename + '_events.tsv'))
+    assert [(row['onset'], row['trial_type'], row['sample']) for row in rows] == [
+        ('1.5', 'start', '384'), ('12', 'stop', '3072')]
@@ -47,6 +47,7 @@ const Configuration = (props) => {
   const initialState = {
     eegRuns: null,
     edfData: [],
+    edfHeaders: [],
     edfFiles: [],
     modality: 'ieeg',
     eventFiles: [],
@@ -57,6 +58,7 @@ const Configuration = (props) => {
     invalidAnnotationsJSON: [],
     bidsDirectory: null,
     LORIScompliant: true,
+    concatenateSplits: false,
     siteID: 'n/a',
     siteOptions: [],
     siteUseAPI: false,
@@ -174,6 +176,8 @@ const Configuration = (props) => {
         line_freq: appContext.getFromTask('lineFreq') || 'n/a',
         recording_type: appContext.getFromTask('recordingType') ?? 'n/a',
         taskName: appContext.getFromTask('taskName') ?? '',
+        concatenate_splits: (appContext.getFromTask('concatenateSplits') &&
+          appContext.getFromTask('edfData')?.['concatenable']) ?? false,
         reference: appContext.getFromTask('reference') ?? '',
         subject_id: appContext.getFromTask('subject_id') ?? '',
       });
@@ -379,6 +383,23 @@ const Configuration = (props) => {
             (edfFile) => edfFile['name'],
         ).join(', '),
       );
+      if (state.edfData.get.warnings?.length > 0) {
+        edfDataStatus = (
+          <>
+            {edfDataStatus}
+            {state.edfData.get.warnings.map((warning, i) =>
+              <div key={i}>{formatWarning(warning)}</div>,
+            )}
+          </>
+        );
+      }
+    } else if (
+      state.edfHeaders.get.length > 0 &&
+      state.edfHeaders.get.length < state.edfHeaders.get[0].total
+    ) {
+      edfDataStatus = formatWarning('Reading the EDF headers: ' +
+        state.edfHeaders.get.length + '/' + state.edfHeaders.get[0].total,
+      );
     } else {
       edfDataStatus = formatError('No EDF file selected');
     }
@@ -1024,6 +1045,7 @@ const Configuration = (props) => {
 
   useEffect(() => {
     if (socketContext) {
+      state.edfHeaders.set([]);
       socketContext.emit('get_edf_data', {
         files: state.edfFiles.get.map((edfFile) =>
           ({
@@ -1090,6 +1112,10 @@ const Configuration = (props) => {
         state.sessionOptions.set(visitOpts);
       });
 
+      socketContext.on('edf_header', (message) => {
+        state.edfHeaders.set((prevState) => [...prevState, message]);
+      });
+
       socketContext.on('edf_data', (message) => {
         if (message['error']) {
           console.error(message['error']);
@@ -1181,6 +1207,10 @@ const Configuration = (props) => {
         value = value === 'yes';
         state.LORIScompliant.set(value);
         break;
+      case 'concatenateSplits':
+        value = value === 'yes';
+        state.concatenateSplits.set(value);
+        break;
       case 'recordingID':
         state.edfData.set((prevState) => {
           return {...prevState, [name]: value};
@@ -1360,6 +1390,22 @@ const Configuration = (props) => {
               </small>
             </div>
           </div>
+          {state.edfData.get?.concatenable &&
+            <div className='small-pad'>
+              <RadioInput id='concatenateSplits'
+                name='concatenateSplits'
+                label='Convert the EDF files as a single run?'
+                onUserInput={onUserInput}
+                options={{
+                  yes: 'Yes',
+                  no: 'No',
+                }}
+                checked={state.concatenateSplits.get ? 'yes' : 'no'}
+                help='The EDF files are joined into one continuous
+                recording (EDF+D if there are gaps between them)'
+              />
+            </div>
+          }
           <div className='small-pad'>
             <DirectoryInput id='bidsDirectory'
               name='bidsDirectory'
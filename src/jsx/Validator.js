@@ -94,6 +94,7 @@ const Validator = (props) => {
 
     const bidsDirectory = getBIDSDir();
     if (bidsDirectory) {
+      setValidator({});
       socketContext.emit('validate_bids', bidsDirectory);
     }
   };
@@ -183,6 +184,25 @@ const Validator = (props) => {
     }
   };
 
+  /**
+   * onValidationProgress - received partial validation results from python.
+   * @param {object} message - file_paths and result of a validated chunk
+   */
+  const onValidationProgress = (message) => {
+    setValidator((prevState) => {
+      return {
+        file_paths: [
+          ...(prevState['file_paths'] ?? []),
+          ...message['file_paths'],
+        ],
+        result: [
+          ...(prevState['result'] ?? []),
+          ...message['result'],
+        ],
+      };
+    });
+  };
+
   return props.visible ? (
     <>
       <span className='header'>
@@ -259,6 +279,7 @@ const Validator = (props) => {
         {modalText.message[modalText.mode]}
       </Modal>
       <Event event='response' handler={onMessage} />
+      <Event event='validation_progress' handler={onValidationProgress} />
     </>
   ) : null;
 };